@@ -1,9 +1,18 @@
 import os
+import re
 import json
+import time
+import uuid
 import logging
+import zipfile
+import tempfile
+import threading
 from flask import Blueprint, render_template, request, redirect, url_for, jsonify, session, flash
 from werkzeug.utils import secure_filename
 from werkzeug.security import generate_password_hash, check_password_hash
+from translator.catalog_db import open_catalog
+from translator.catalog_import import CatalogImporter, ZipSource
+from translator.catalog_jobs import JobRunner
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -16,12 +25,46 @@ ADMIN_PASSWORD_HASH = generate_password_hash(ADMIN_PASSWORD)
 # Reference language configuration - MUST MATCH YOUR JSON KEY
 REFERENCE_LANGUAGE = 'English'  # Must match the key in your languages.json
 
+# Language codes name files and directories, so they are limited to these characters
+LANGUAGE_CODE_PATTERN = re.compile(r'^[A-Za-z0-9_-]+$')
+
 # Paths - will be set when initialized
 LOCAL_DATA_DIR = None
 SENTENCES_DIR = None
 LANGUAGES_FILE = None
 INDEX_PATH_FILE = None
 
+# Threads copying files during a bulk import, and how long a finished import's
+# report stays available to the dashboard
+IMPORT_WORKERS = int(os.environ.get('IMPORT_WORKERS', 4))
+IMPORT_RETENTION = float(os.environ.get('IMPORT_RETENTION', 3600))
+
+# Bulk imports run on background threads; id -> status, updated as files are written
+imports = {}
+imports_lock = threading.Lock()
+
+# Background jobs for per-sentence file work (adding or deleting a language):
+# sentences per batch, and seconds without a checkpoint before another worker
+# takes over a running job
+JOB_BATCH_SIZE = int(os.environ.get('JOB_BATCH_SIZE', 200))
+JOB_LEASE_SECONDS = float(os.environ.get('JOB_LEASE_SECONDS', 60))
+jobs = None
+
+# Dashboard pagination
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# SQLite catalog (sentences, languages, texts, audio metadata); languages.json and
+# index_path.json are exported from it after every change for the recognizer
+CATALOG_DB = os.environ.get('CATALOG_DB')
+catalog_db = None
+
+# Suffix of files written by a sentence update, renamed over the old ones after commit
+STAGED_SUFFIX = '.admin-tmp'
+
+# Shared in-memory content store, if the host app provides one
+content_store = None
+
 # Get the directory of the current file (admin.py)
 CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
 # Calculate the absolute path to templates/admin
@@ -29,11 +72,12 @@ TEMPLATES_DIR = os.path.abspath(os.path.join(CURRENT_DIR, '..', '..', 'templates
 
 admin_bp = Blueprint('admin', __name__, template_folder=TEMPLATES_DIR)
 
-def init_admin(local_data_dir):
+def init_admin(local_data_dir, store=None, db=None):
     """Initialize admin module with proper paths"""
-    global LOCAL_DATA_DIR, SENTENCES_DIR, LANGUAGES_FILE, INDEX_PATH_FILE
+    global LOCAL_DATA_DIR, SENTENCES_DIR, LANGUAGES_FILE, INDEX_PATH_FILE, content_store, catalog_db, jobs
     
     LOCAL_DATA_DIR = local_data_dir
+    content_store = store
     SENTENCES_DIR = os.path.join(LOCAL_DATA_DIR, 'sentences')
     LANGUAGES_FILE = os.path.join(LOCAL_DATA_DIR, 'languages.json')
     INDEX_PATH_FILE = os.path.join(LOCAL_DATA_DIR, 'index_path.json')
@@ -50,49 +94,66 @@ def init_admin(local_data_dir):
         with open(INDEX_PATH_FILE, 'w', encoding='utf-8') as f:
             json.dump({"sentences": []}, f, indent=2)
     
+    # Imports the JSON/directory layout on first run, or after it changed outside the admin
+    catalog_db = db or open_catalog(LOCAL_DATA_DIR, CATALOG_DB)
+    
+    # Runs queued language file jobs, including any interrupted by a restart
+    if jobs is not None:
+        jobs.stop()
+    jobs = JobRunner(catalog_db, JOB_BATCH_SIZE, lease_seconds=JOB_LEASE_SECONDS)
+    jobs.register('language_files', language_files_job)
+    jobs.start()
+    
     logger.info(f"Admin module initialized with local_data directory: {LOCAL_DATA_DIR}")
     return admin_bp
 
 def load_languages():
-    """Load languages from languages.json"""
+    """Load languages from the catalog database"""
     try:
-        with open(LANGUAGES_FILE, 'r', encoding='utf-8') as f:
-            languages = json.load(f)
-        return languages
+        return catalog_db.languages()
     except Exception as e:
         logger.error(f"Error loading languages: {e}")
         return {}
 
 def save_languages(languages):
-    """Save languages to languages.json"""
+    """Replace the languages in the catalog database and export languages.json"""
     try:
-        with open(LANGUAGES_FILE, 'w', encoding='utf-8') as f:
-            json.dump(languages, f, indent=2, ensure_ascii=False)
+        with catalog_db.transaction():
+            catalog_db.replace_languages(languages)
+            export_index()
         return True
     except Exception as e:
         logger.error(f"Error saving languages: {e}")
         return False
 
 def load_sentences():
-    """Load sentences from index_path.json"""
+    """Load sentence ids from the catalog database"""
     try:
-        with open(INDEX_PATH_FILE, 'r', encoding='utf-8') as f:
-            index_data = json.load(f)
-            return index_data.get('sentences', [])
+        return catalog_db.sentence_ids()
     except Exception as e:
         logger.error(f"Error loading sentences: {e}")
         return []
 
 def save_sentences(sentences):
-    """Save sentences to index_path.json"""
+    """Replace the sentence list in the catalog database and export index_path.json"""
     try:
-        with open(INDEX_PATH_FILE, 'w', encoding='utf-8') as f:
-            json.dump({"sentences": sentences}, f, indent=2, ensure_ascii=False)
+        with catalog_db.transaction():
+            catalog_db.replace_sentences(sentences)
+            export_index()
         return True
     except Exception as e:
         logger.error(f"Error saving sentences: {e}")
         return False
 
+def export_index():
+    """Atomically rewrite languages.json and index_path.json from the database"""
+    catalog_db.export_files(LOCAL_DATA_DIR)
+
+def invalidate_content(sentence_id=None, language=None):
+    """Drop cached content after a write so readers see it immediately"""
+    if content_store is not None:
+        content_store.invalidate(sentence_id, language)
+
 def get_sentence_path(sentence_id):
     """Get the path for a sentence directory"""
     return os.path.join(SENTENCES_DIR, sentence_id)
@@ -140,6 +201,7 @@ def delete_sentence_directories(sentence_id):
         os.rmdir(os.path.join(sentence_path, 'audio'))
         os.rmdir(sentence_path)
     
+    invalidate_content(sentence_id)
     return not os.path.exists(sentence_path)
 
 def create_language_files(language, sentence_id, text_content, audio_file=None):
@@ -153,72 +215,112 @@ def create_language_files(language, sentence_id, text_content, audio_file=None):
     # Save text file
     with open(paths['text_path'], 'w', encoding='utf-8') as f:
         f.write(text_content)
+    catalog_db.set_translation(sentence_id, language, text_content)
     
     # Save audio file if provided
     if audio_file:
         audio_file.save(paths['audio_path'])
+        st = os.stat(paths['audio_path'])
+        catalog_db.set_audio(sentence_id, language, st.st_size, st.st_mtime_ns)
     
+    invalidate_content(sentence_id, language)
     return True
 
+def stage_language_files(staged, language, sentence_id, text_content, audio_file=None):
+    """Write a language's text and audio beside their targets and record them in the database
+
+    Appends (temporary path, target) pairs to staged; move_staged_files puts them
+    in place once the transaction has committed, discard_staged_files if it fails.
+    """
+    paths = get_language_files(sentence_id, language)
+    os.makedirs(paths['text_dir'], exist_ok=True)
+    os.makedirs(paths['audio_dir'], exist_ok=True)
+    
+    tmp_path = paths['text_path'] + STAGED_SUFFIX
+    staged.append((tmp_path, paths['text_path']))
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text_content)
+    catalog_db.set_translation(sentence_id, language, text_content)
+    
+    if audio_file:
+        tmp_path = paths['audio_path'] + STAGED_SUFFIX
+        staged.append((tmp_path, paths['audio_path']))
+        audio_file.save(tmp_path)
+        # The rename keeps the modification time recorded here
+        st = os.stat(tmp_path)
+        catalog_db.set_audio(sentence_id, language, st.st_size, st.st_mtime_ns)
+
+def move_staged_files(staged):
+    """Move committed files into place"""
+    for tmp_path, target in staged:
+        os.replace(tmp_path, target)
+
+def discard_staged_files(staged):
+    """Remove the files of a rolled back transaction"""
+    for tmp_path, _ in staged:
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+
+def language_files_job(params, cursor, limit):
+    """One batch of a language's file fan-out: create empty texts, or remove texts and audio
+
+    Runs inside the job's transaction, so sentences cannot be added or deleted
+    mid-batch. Each step is a no-op when already done, so repeating a batch is
+    safe. The job stops early if the language was deleted (or re-added) since.
+    """
+    language = params['language']
+    create = params['action'] == 'create'
+    if (language in catalog_db.languages()) != create:
+        return 0, None
+    
+    sentence_ids = catalog_db.sentence_ids_after(cursor, limit)
+    for sentence_id in sentence_ids:
+        paths = get_language_files(sentence_id, language)
+        if create:
+            os.makedirs(paths['text_dir'], exist_ok=True)
+            os.makedirs(paths['audio_dir'], exist_ok=True)
+            # Create an empty text file unless one exists
+            try:
+                with open(paths['text_path'], 'x', encoding='utf-8'):
+                    pass
+            except FileExistsError:
+                pass
+        else:
+            for path in (paths['text_path'], paths['audio_path']):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+    
+    invalidate_content(language=language)
+    return len(sentence_ids), (sentence_ids[-1] if len(sentence_ids) == limit else None)
+
+def submit_language_job(language, action):
+    """Queue the file work for a language added or deleted in the current transaction"""
+    return jobs.submit('language_files', {'language': language, 'action': action},
+                       total=len(catalog_db.sentence_ids()))
+
 def get_sentence_data(sentence_id):
     """Get all data for a sentence"""
-    sentences = load_sentences()
-    if sentence_id not in sentences:
+    translations = catalog_db.translations(sentence_id)
+    if translations is None:
         return None
     
-    languages = load_languages()
-    sentence_data = {
+    return {
         'id': sentence_id,
-        'translations': {}
+        'translations': translations
     }
-    
-    for lang_code in languages.keys():
-        paths = get_language_files(sentence_id, lang_code)
-        
-        # Get text content
-        text_content = ""
-        if os.path.exists(paths['text_path']):
-            try:
-                with open(paths['text_path'], 'r', encoding='utf-8') as f:
-                    text_content = f.read()
-            except Exception as e:
-                logger.error(f"Error reading text file for {sentence_id} in {lang_code}: {e}")
-        
-        # Check if audio exists
-        audio_exists = os.path.exists(paths['audio_path'])
-        
-        sentence_data['translations'][lang_code] = {
-            'text': text_content,
-            'has_audio': audio_exists
-        }
-    
-    return sentence_data
 
 def get_all_sentence_data():
     """Get data for all sentences"""
-    sentences = load_sentences()
-    all_data = []
-    
-    for sentence_id in sentences:
-        sentence_data = get_sentence_data(sentence_id)
-        if sentence_data:
-            all_data.append(sentence_data)
-    
+    _, all_data = catalog_db.sentence_page()
     return all_data
 
 def validate_language_files(language):
     """Validate that all sentences have files for this language"""
-    sentences = load_sentences()
-    languages = load_languages()
-    
-    missing_sentences = []
-    
-    for sentence_id in sentences:
-        paths = get_language_files(sentence_id, language)
-        
-        if not os.path.exists(paths['text_path']):
-            missing_sentences.append(sentence_id)
-    
+    missing_sentences = catalog_db.missing_translations(language)
     return len(missing_sentences) == 0, missing_sentences
 
 # Admin Routes
@@ -283,38 +385,29 @@ def api_add_language():
     if not language_code or not language_name:
         return jsonify({'error': 'Language code and name are required'}), 400
     
-    languages = load_languages()
-    
-    if language_code in languages:
-        return jsonify({'error': 'Language code already exists'}), 400
+    if not LANGUAGE_CODE_PATTERN.match(language_code):
+        return jsonify({'error': 'Invalid language code format'}), 400
     
-    # Add to languages.json
-    languages[language_code] = language_name
-    if not save_languages(languages):
+    # Add the language, with empty translations for every sentence, and export languages.json;
+    # the empty files are created by a background job queued in the same transaction
+    try:
+        with catalog_db.transaction():
+            missing_sentences = catalog_db.add_language(language_code, language_name)
+            if missing_sentences is None:
+                return jsonify({'error': 'Language code already exists'}), 400
+            job_id = submit_language_job(language_code, 'create')
+            export_index()
+    except Exception as e:
+        logger.error(f"Error saving language: {e}")
         return jsonify({'error': 'Failed to save language'}), 500
     
-    # Check if all sentences have this language
-    sentences = load_sentences()
-    missing_sentences = []
-    
-    for sentence_id in sentences:
-        paths = get_language_files(sentence_id, language_code)
-        
-        # Create empty text file if it doesn't exist
-        if not os.path.exists(paths['text_path']):
-            missing_sentences.append(sentence_id)
-            os.makedirs(paths['text_dir'], exist_ok=True)
-            with open(paths['text_path'], 'w', encoding='utf-8') as f:
-                f.write("")
-        
-        # Create empty audio directory if it doesn't exist
-        os.makedirs(paths['audio_dir'], exist_ok=True)
-    
+    invalidate_content(language=language_code)
     return jsonify({
         'success': True,
         'language': {language_code: language_name},
-        'missing_sentences': missing_sentences
-    })
+        'missing_sentences': missing_sentences,
+        'job': catalog_db.job(job_id)
+    }), 202
 
 @admin_bp.route('/admin/api/languages/<language_code>', methods=['PUT'])
 def api_update_language(language_code):
@@ -327,14 +420,13 @@ def api_update_language(language_code):
     if not new_name:
         return jsonify({'error': 'Language name is required'}), 400
     
-    languages = load_languages()
-    
-    if language_code not in languages:
-        return jsonify({'error': 'Language not found'}), 404
-    
-    # Update in languages.json
-    languages[language_code] = new_name
-    if not save_languages(languages):
+    try:
+        with catalog_db.transaction():
+            if not catalog_db.rename_language(language_code, new_name):
+                return jsonify({'error': 'Language not found'}), 404
+            export_index()
+    except Exception as e:
+        logger.error(f"Error saving language: {e}")
         return jsonify({'error': 'Failed to save language'}), 500
     
     return jsonify({'success': True, 'language': {language_code: new_name}})
@@ -345,34 +437,56 @@ def api_delete_language(language_code):
     if not session.get('is_admin'):
         return jsonify({'error': 'Unauthorized'}), 401
     
-    languages = load_languages()
-    
-    if language_code not in languages:
-        return jsonify({'error': 'Language not found'}), 404
-    
     # Don't allow deleting the reference language
-    if language_code == REFERENCE_LANGUAGE:
+    if language_code == REFERENCE_LANGUAGE and language_code in load_languages():
         return jsonify({'error': 'Cannot delete the reference language'}), 400
     
-    # Remove from languages.json
-    del languages[language_code]
-    if not save_languages(languages):
+    # Remove the language and its translations, and export languages.json;
+    # its files are removed by a background job queued in the same transaction
+    try:
+        with catalog_db.transaction():
+            if not catalog_db.delete_language(language_code):
+                return jsonify({'error': 'Language not found'}), 404
+            job_id = submit_language_job(language_code, 'delete')
+            export_index()
+    except Exception as e:
+        logger.error(f"Error saving language: {e}")
         return jsonify({'error': 'Failed to save language'}), 500
     
-    # Remove language files from all sentences
-    sentences = load_sentences()
-    for sentence_id in sentences:
-        paths = get_language_files(sentence_id, language_code)
-        
-        # Remove text file if it exists
-        if os.path.exists(paths['text_path']):
-            os.remove(paths['text_path'])
-        
-        # Remove audio file if it exists
-        if os.path.exists(paths['audio_path']):
-            os.remove(paths['audio_path'])
+    invalidate_content(language=language_code)
+    return jsonify({'success': True, 'job': catalog_db.job(job_id)}), 202
+
+@admin_bp.route('/admin/api/jobs', methods=['GET'])
+def api_get_jobs():
+    """List recent background jobs, newest first"""
+    if not session.get('is_admin'):
+        return jsonify({'error': 'Unauthorized'}), 401
     
-    return jsonify({'success': True})
+    return jsonify({'jobs': catalog_db.jobs()})
+
+@admin_bp.route('/admin/api/jobs/<int:job_id>', methods=['GET'])
+def api_get_job(job_id):
+    """Get the state and progress of a background job"""
+    if not session.get('is_admin'):
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    job = catalog_db.job(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job)
+
+@admin_bp.route('/admin/api/jobs/<int:job_id>/retry', methods=['POST'])
+def api_retry_job(job_id):
+    """Queue a failed job again; it resumes after its last completed batch"""
+    if not session.get('is_admin'):
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    if catalog_db.job(job_id) is None:
+        return jsonify({'error': 'Job not found'}), 404
+    if not catalog_db.retry_job(job_id):
+        return jsonify({'error': 'Only failed jobs can be retried'}), 409
+    jobs.wake()
+    return jsonify(catalog_db.job(job_id))
 
 @admin_bp.route('/admin/api/sentences', methods=['GET'])
 def api_get_sentences():
@@ -383,6 +497,121 @@ def api_get_sentences():
     sentences = load_sentences()
     return jsonify({'sentences': sentences})
 
+@admin_bp.route('/admin/api/sentences/data', methods=['GET'])
+def api_get_sentence_page():
+    """Get a page of sentences with their translations, optionally filtered"""
+    if not session.get('is_admin'):
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    try:
+        offset = max(0, int(request.args.get('offset', 0)))
+        limit = min(MAX_PAGE_SIZE, max(1, int(request.args.get('limit', DEFAULT_PAGE_SIZE))))
+    except ValueError:
+        return jsonify({'error': 'offset and limit must be integers'}), 400
+    
+    language = request.args.get('language') or None
+    if language is not None and language not in load_languages():
+        return jsonify({'error': 'Language not found'}), 404
+    
+    total, sentences = catalog_db.sentence_page(
+        offset, limit, language,
+        missing_audio=request.args.get('missing_audio') == '1',
+        empty_text=request.args.get('empty_text') == '1'
+    )
+    return jsonify({
+        'total': total,
+        'offset': offset,
+        'limit': limit,
+        'sentences': sentences
+    })
+
+@admin_bp.route('/admin/api/catalog/rescan', methods=['POST'])
+def api_rescan_catalog():
+    """Re-import the catalog from local_data after files were changed outside the admin"""
+    if not session.get('is_admin'):
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    catalog_db.import_files(LOCAL_DATA_DIR)
+    invalidate_content()
+    return jsonify({'success': True, 'sentences': len(catalog_db.sentence_ids())})
+
+@admin_bp.route('/admin/api/import', methods=['POST'])
+def api_import():
+    """Bulk import sentences, translations and audio from a ZIP archive"""
+    if not session.get('is_admin'):
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    archive = request.files.get('archive')
+    if not archive or not archive.filename:
+        return jsonify({'error': 'No archive uploaded'}), 400
+    
+    # Kept on disk for the import thread, since the upload is gone once the request ends
+    fd, path = tempfile.mkstemp(suffix='.zip')
+    os.close(fd)
+    try:
+        archive.save(path)
+        if not zipfile.is_zipfile(path):
+            os.remove(path)
+            return jsonify({'error': 'Upload a ZIP archive'}), 400
+    except OSError as e:
+        logger.error(f"Error saving import archive {archive.filename}: {e}")
+        os.remove(path)
+        return jsonify({'error': f'Error saving archive: {e}'}), 500
+    
+    task = start_import(archive.filename, path, request.form.get('add_languages') == '1')
+    return jsonify({
+        'success': True,
+        'import': task,
+        'status_url': url_for('admin.api_import_status', import_id=task['id'])
+    }), 202
+
+@admin_bp.route('/admin/api/import/<import_id>')
+def api_import_status(import_id):
+    """Progress of a bulk import, and its report once finished"""
+    if not session.get('is_admin'):
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    task = imports.get(import_id)
+    if task is None:
+        return jsonify({'error': 'Import not found'}), 404
+    return jsonify(task)
+
+def start_import(filename, path, add_languages):
+    """Import the archive at path on a background thread; returns its status dict"""
+    task = {
+        'id': uuid.uuid4().hex,
+        'filename': filename,
+        'state': 'running',
+        'error': None,
+        'created_at': time.time(),
+        'finished_at': None,
+        'report': None
+    }
+    importer = CatalogImporter(catalog_db, LOCAL_DATA_DIR, workers=IMPORT_WORKERS, add_languages=add_languages,
+                               on_progress=lambda report: task.update(report=report.to_dict()))
+    task['report'] = importer.report.to_dict()
+    with imports_lock:
+        cutoff = time.time() - IMPORT_RETENTION
+        for import_id in [key for key, other in imports.items() if other['finished_at'] and other['finished_at'] < cutoff]:
+            del imports[import_id]
+        imports[task['id']] = task
+    
+    def run():
+        state, error = 'done', None
+        try:
+            importer.run(ZipSource(path))
+        except Exception as e:
+            logger.error(f"Import of {filename} failed: {e}")
+            state, error = 'failed', f'Import failed: {e}'
+        finally:
+            invalidate_content()
+            os.remove(path)
+        task.update(state=state, error=error, report=importer.report.to_dict(), finished_at=time.time())
+    
+    threading.Thread(target=run, name=f"catalog-import-{task['id'][:8]}", daemon=True).start()
+    logger.info(f"Started import {task['id']} of {filename}")
+    return task
+
 @admin_bp.route('/admin/api/sentences', methods=['POST'])
 def api_add_sentence():
     """Add a new sentence"""
@@ -398,27 +627,25 @@ def api_add_sentence():
     if not sentence_id.replace('_', '').isalnum():
         return jsonify({'error': 'Invalid sentence ID format'}), 400
     
-    sentences = load_sentences()
-    
-    if sentence_id in sentences:
+    if catalog_db.has_sentence(sentence_id):
         return jsonify({'error': 'Sentence ID already exists'}), 400
     
-    # Create directories for the new sentence
-    dirs = create_sentence_directories(sentence_id)
-    
-    # Add to index_path.json
-    sentences.append(sentence_id)
-    if not save_sentences(sentences):
-        # Roll back directory creation if JSON save fails
-        if os.path.exists(dirs['sentence_path']):
+    # Add the sentence with empty files for all existing languages in one transaction,
+    # rolled back along with the directories if any step fails
+    try:
+        with catalog_db.transaction():
+            if not catalog_db.add_sentence(sentence_id):
+                return jsonify({'error': 'Sentence ID already exists'}), 400
+            create_sentence_directories(sentence_id)
+            for lang_code in load_languages().keys():
+                create_language_files(lang_code, sentence_id, "")
+            export_index()
+    except Exception as e:
+        logger.error(f"Error saving sentence {sentence_id}: {e}")
+        if os.path.exists(get_sentence_path(sentence_id)):
             delete_sentence_directories(sentence_id)
         return jsonify({'error': 'Failed to save sentence'}), 500
     
-    # Add empty files for all existing languages
-    languages = load_languages()
-    for lang_code in languages.keys():
-        create_language_files(lang_code, sentence_id, "")
-    
     return jsonify({'success': True, 'sentence_id': sentence_id})
 
 @admin_bp.route('/admin/api/sentences/<sentence_id>', methods=['PUT'])
@@ -429,23 +656,37 @@ def api_update_sentence(sentence_id):
     
     # In our system, sentence_id is the identifier and shouldn't be changed
     # This endpoint is for updating the content for each language
-    languages = load_languages()
+    if not catalog_db.has_sentence(sentence_id):
+        return jsonify({'error': 'Sentence not found'}), 404
     
-    # Process text updates
-    for lang_code in languages.keys():
-        text_content = request.form.get(f'text_{lang_code}', '')
-        create_language_files(lang_code, sentence_id, text_content)
+    languages = load_languages()
     
-    # Process audio updates
-    for lang_code in languages.keys():
-        if f'audio_{lang_code}' in request.files:
-            audio_file = request.files[f'audio_{lang_code}']
-            if audio_file.filename:
+    # All languages' updates are recorded in one transaction; the new files are
+    # written beside the old ones and only replace them once it has committed
+    staged = []
+    try:
+        with catalog_db.transaction():
+            for lang_code in languages.keys():
+                text_content = request.form.get(f'text_{lang_code}', '')
+                audio_file = request.files.get(f'audio_{lang_code}')
                 # Verify it's an audio file
-                if audio_file.filename.lower().endswith(('.mp3', '.wav')):
-                    create_language_files(lang_code, sentence_id, 
-                                         get_sentence_data(sentence_id)['translations'][lang_code]['text'], 
-                                         audio_file)
+                if not (audio_file and audio_file.filename
+                        and audio_file.filename.lower().endswith(('.mp3', '.wav'))):
+                    audio_file = None
+                stage_language_files(staged, lang_code, sentence_id, text_content, audio_file)
+    except Exception as e:
+        logger.error(f"Error updating sentence {sentence_id}: {e}")
+        discard_staged_files(staged)
+        return jsonify({'error': 'Failed to update sentence'}), 500
+    
+    try:
+        move_staged_files(staged)
+    except OSError as e:
+        logger.error(f"Error moving files of sentence {sentence_id} into place: {e}")
+        discard_staged_files(staged)
+        return jsonify({'error': 'Failed to update sentence files'}), 500
+    finally:
+        invalidate_content(sentence_id)
     
     return jsonify({'success': True, 'sentence_id': sentence_id})
 
@@ -455,22 +696,23 @@ def api_delete_sentence(sentence_id):
     if not session.get('is_admin'):
         return jsonify({'error': 'Unauthorized'}), 401
     
-    sentences = load_sentences()
-    
-    if sentence_id not in sentences:
-        return jsonify({'error': 'Sentence not found'}), 404
+    # The directories are removed once the deletion has committed; leftovers are
+    # not in index_path.json any more, so a rescan ignores them
+    try:
+        with catalog_db.transaction():
+            if not catalog_db.delete_sentence(sentence_id):
+                return jsonify({'error': 'Sentence not found'}), 404
+            export_index()
+    except Exception as e:
+        logger.error(f"Error deleting sentence {sentence_id}: {e}")
+        return jsonify({'error': 'Failed to delete sentence'}), 500
     
-    # Remove from index_path.json
-    sentences.remove(sentence_id)
-    if not save_sentences(sentences):
-        return jsonify({'error': 'Failed to save sentence list'}), 500
-    
-    # Remove sentence directories
-    if not delete_sentence_directories(sentence_id):
-        # Try to recover by adding back to JSON
-        sentences.append(sentence_id)
-        save_sentences(sentences)
-        return jsonify({'error': 'Failed to delete sentence directories'}), 500
+    try:
+        if not delete_sentence_directories(sentence_id):
+            logger.warning(f"{get_sentence_path(sentence_id)} still exists after deleting sentence {sentence_id}")
+    except OSError as e:
+        logger.warning(f"Error removing directories of deleted sentence {sentence_id}: {e}")
+        invalidate_content(sentence_id)
     
     return jsonify({'success': True})
 
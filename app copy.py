@@ -1,8 +1,13 @@
 import os
 import json
 import re
+import gzip
 import logging
-from flask import Flask, render_template, request, jsonify, send_from_directory, url_for, session, redirect
+from flask import Flask, Response, render_template, request, jsonify, url_for, session, redirect
+from translator.content import ContentStore
+from translator.bundle import BUNDLE_NAME, BundledContentStore
+from translator.audio_http import AudioFileCache, audio_version, send_audio
+from translator.catalog_db import open_catalog
 
 # Set up logging
 logging.basicConfig(level=logging.DEBUG)
@@ -15,11 +20,26 @@ SENTENCES_DIR = os.path.join(LOCAL_DATA_DIR, 'sentences')
 LANGUAGES_FILE = os.path.join(LOCAL_DATA_DIR, 'languages.json')
 INDEX_PATH_FILE = os.path.join(LOCAL_DATA_DIR, 'index_path.json')
 
+# SQLite catalog shared with the admin panel, imported from the files above on first run
+CATALOG_DB = os.environ.get('CATALOG_DB')
+
 # Reference language configuration - MUST MATCH YOUR JSON KEY
 # Since your JSON uses "English" as the key, we need to use that
 REFERENCE_LANGUAGE = 'English'  # Must match the key in your languages.json
 REFERENCE_LANGUAGE_NAME = 'English'
 
+# Seconds between mtime checks of cached translation texts and audio
+CONTENT_POLL_INTERVAL = float(os.environ.get('CONTENT_POLL_INTERVAL', 10))
+
+# Packed content bundle built by build_bundle.py; while the file exists, texts and
+# audio are served from it, otherwise from the sentence directories (empty disables)
+CONTENT_BUNDLE = os.environ.get('CONTENT_BUNDLE', os.path.join(LOCAL_DATA_DIR, BUNDLE_NAME))
+
+# Audio serving - stat cache lifetime, and an optional nginx internal location
+# (X-Accel-Redirect) that maps onto SENTENCES_DIR so nginx sends the bytes
+AUDIO_STAT_TTL = float(os.environ.get('AUDIO_STAT_TTL', 5))
+AUDIO_ACCEL_PREFIX = os.environ.get('AUDIO_ACCEL_PREFIX')
+
 # Initialize Flask app
 app = Flask(__name__)
 app.secret_key = os.environ.get('SECRET_KEY', 'your-secret-key-here')  # Change this in production!
@@ -29,14 +49,9 @@ def is_valid_path_component(component):
     return bool(re.match(r'^[a-zA-Z0-9_\-]+$', component))
 
 def load_languages():
-    """Load languages from languages.json"""
-    if not os.path.exists(LANGUAGES_FILE):
-        logger.error(f"Languages file not found at {LANGUAGES_FILE}")
-        return {}
-    
+    """Load languages from the catalog database"""
     try:
-        with open(LANGUAGES_FILE, 'r', encoding='utf-8') as f:
-            languages = json.load(f)
+        languages = catalog_db.languages()
         logger.debug(f"Loaded {len(languages)} languages: {languages}")
         return languages
     except Exception as e:
@@ -44,20 +59,39 @@ def load_languages():
         return {}
 
 def load_sentences():
-    """Load sentences from index_path.json"""
-    if not os.path.exists(INDEX_PATH_FILE):
-        logger.error(f"Index file not found at {INDEX_PATH_FILE}")
-        return []
+    """Load sentence ids from the catalog database"""
     try:
-        with open(INDEX_PATH_FILE, 'r', encoding='utf-8') as f:
-            index_data = json.load(f)
-            sentences = index_data.get('sentences', [])
+        sentences = catalog_db.sentence_ids()
         logger.debug(f"Loaded {len(sentences)} sentences: {sentences}")
         return sentences
     except Exception as e:
         logger.error(f"Error loading sentences: {e}")
         return []
 
+def sentence_text_path(sentence, language):
+    return os.path.join(SENTENCES_DIR, sentence, 'text', f"{language}.txt")
+
+def sentence_audio_path(sentence, language):
+    return os.path.join(SENTENCES_DIR, sentence, 'audio', f"{language}.mp3")
+
+os.makedirs(LOCAL_DATA_DIR, exist_ok=True)
+catalog_db = open_catalog(LOCAL_DATA_DIR, CATALOG_DB)
+
+# Translation texts and audio availability, served from memory
+content_store = ContentStore(
+    text_path=sentence_text_path,
+    audio_path=sentence_audio_path,
+    list_sentences=load_sentences,
+    list_languages=lambda: load_languages().keys()
+)
+if CONTENT_BUNDLE:
+    content_store = BundledContentStore(CONTENT_BUNDLE, content_store)
+
+audio_files = AudioFileCache(ttl=AUDIO_STAT_TTL)
+
+# Latest complete /api/catalog payload per language: (version, JSON, gzipped JSON)
+catalog_payloads = {}
+
 @app.route('/')
 def index():
     logger.debug("Serving index page")
@@ -96,27 +130,112 @@ def get_sentences_for_language(language):
     if language not in languages:
         return jsonify({'error': 'Language not found'}), 404
     
-    sentences = load_sentences()
-    
-    # Filter sentences that have text for the selected language
-    available_sentences = []
-    for sentence in sentences:
-        text_path = os.path.join(SENTENCES_DIR, sentence, 'text', f"{language}.txt")
-        if os.path.exists(text_path):
-            # Read the sentence text in the selected language
-            try:
-                with open(text_path, 'r', encoding='utf-8') as f:
-                    sentence_text = f.read().strip()
-                available_sentences.append({
-                    'id': sentence,
-                    'text': sentence_text
-                })
-            except Exception as e:
-                logger.error(f"Error reading sentence text for {sentence} in {language}: {e}")
+    # Sentences that have text for the selected language, in one indexed query
+    available_sentences = [
+        {'id': sentence, 'text': sentence_text.strip()}
+        for sentence, sentence_text in catalog_db.texts(language)
+    ]
     
     logger.debug(f"API/sentences/{language} returning: {available_sentences}")
     return jsonify({'sentences': available_sentences})
 
+def bundled_audio(sentence, language):
+    """(AudioFileInfo, memoryview) if the content store holds the pair's audio in memory, else None"""
+    audio = getattr(content_store, 'audio', None)
+    return audio(sentence, language) if audio is not None else None
+
+def audio_info(sentence, language, mtime_ns=None):
+    """Size, ETag and version of a pair's audio, from the content bundle or its file
+
+    mtime_ns, when known from the catalog, bypasses a stat cached before the file changed.
+    """
+    bundled = bundled_audio(sentence, language)
+    if bundled is not None:
+        return bundled[0]
+    audio_path = sentence_audio_path(sentence, language)
+    info = audio_files.get(audio_path)
+    if info is not None and mtime_ns is not None and info.mtime_ns != mtime_ns:
+        audio_files.invalidate(audio_path)
+        info = audio_files.get(audio_path)
+    return info
+
+def catalog_payload(language, since=None):
+    """(version, JSON, gzipped JSON) for a language's catalog, or its changes after since
+
+    Complete catalogs are built and compressed once per version.
+    """
+    cached = catalog_payloads.get(language)
+    if cached is not None and since is None and cached[0] == catalog_db.language_version(language):
+        return cached
+    
+    version, complete, rows, removed = catalog_db.language_entries(language, since)
+    if complete and cached is not None and cached[0] == version:
+        return cached
+    
+    sentences = []
+    for sentence, text, audio_size, audio_mtime in rows:
+        entry = {'id': sentence, 'text': text, 'audio_url': None, 'audio_size': None, 'audio_hash': None}
+        info = audio_info(sentence, language, audio_mtime) if audio_size is not None else None
+        if info is not None:
+            entry.update(audio_url=url_for('serve_audio', sentence=sentence, language=language, v=info.version),
+                         audio_size=info.size, audio_hash=info.etag)
+        sentences.append(entry)
+    
+    body = json.dumps({
+        'language': language,
+        'version': version,
+        'since': None if complete else since,
+        'complete': complete,
+        'sentences': sentences,
+        'removed': removed
+    }, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    payload = (version, body, gzip.compress(body))
+    if complete:
+        catalog_payloads[language] = payload
+    return payload
+
+@app.route('/api/catalog/<language>')
+def get_catalog(language):
+    """Every sentence of a language with its text and audio URL, size and hash, for prefetching
+
+    With ?since=<version> only sentences changed after that version are sent,
+    plus the ids of removed ones; a version the change log no longer reaches
+    back to gets the complete catalog ("complete": true). Responses are
+    gzipped when accepted and revalidated by ETag.
+    """
+    if not is_valid_path_component(language):
+        return jsonify({'error': 'Invalid language format'}), 400
+    if language not in load_languages():
+        return jsonify({'error': 'Language not found'}), 404
+    
+    since = request.args.get('since')
+    if since is not None:
+        try:
+            since = int(since)
+        except ValueError:
+            return jsonify({'error': 'since must be an integer version'}), 400
+    
+    compressed = 'gzip' in request.accept_encodings
+    def etag(version):
+        tag = f"{language}-{version}" if since is None else f"{language}-{since}-{version}"
+        return f"{tag}-gz" if compressed else tag
+    
+    # Revalidation costs one indexed query
+    current = etag(catalog_db.language_version(language))
+    if request.if_none_match.contains(current):
+        response = Response(status=304)
+        response.set_etag(current)
+    else:
+        version, body, gzipped = catalog_payload(language, since)
+        response = Response(gzipped if compressed else body, mimetype='application/json')
+        if compressed:
+            response.headers['Content-Encoding'] = 'gzip'
+        response.set_etag(etag(version))
+    
+    response.headers['Cache-Control'] = 'no-cache'
+    response.vary.add('Accept-Encoding')
+    return response
+
 @app.route('/api/content/<sentence>/<language>')
 def get_content(sentence, language):
     """Return text and audio paths for a sentence in a language"""
@@ -124,22 +243,15 @@ def get_content(sentence, language):
     if not is_valid_path_component(sentence) or not is_valid_path_component(language):
         return jsonify({'error': 'Invalid path format'}), 400
     
-    text_path = os.path.join(SENTENCES_DIR, sentence, 'text', f"{language}.txt")
-    audio_path = os.path.join(SENTENCES_DIR, sentence, 'audio', f"{language}.mp3")
-    
-    text_content = None
-    if os.path.exists(text_path):
-        try:
-            with open(text_path, 'r', encoding='utf-8') as f:
-                text_content = f.read()
-        except Exception as e:
-            logger.error(f"Error reading text file: {e}")
+    entry = content_store.get(sentence, language)
+    text_content = entry.text
     
     audio_url = None
-    if os.path.exists(audio_path):
+    if entry.has_audio:
         audio_url = url_for('serve_audio', 
                            sentence=sentence, 
                            language=language, 
+                           v=audio_version(entry.audio_mtime),
                            _external=True)
     
     return jsonify({
@@ -154,16 +266,24 @@ def serve_audio(sentence, language):
     if not is_valid_path_component(sentence) or not is_valid_path_component(language):
         return jsonify({'error': 'Invalid path format'}), 400
     
-    audio_path = os.path.join(SENTENCES_DIR, sentence, 'audio', f"{language}.mp3")
-    audio_dir = os.path.dirname(audio_path)
-    audio_filename = os.path.basename(audio_path)
+    # Zero-copy slice of the memory-mapped bundle, unless the audio changed since it was built
+    bundled = bundled_audio(sentence, language)
+    if bundled is not None:
+        info, body = bundled
+        return send_audio(None, info, body=body)
     
-    if not os.path.exists(audio_path):
+    audio_path = sentence_audio_path(sentence, language)
+    info = audio_files.get(audio_path)
+    
+    if info is None:
         logger.warning(f"Audio file not found: {audio_path}")
         return jsonify({'error': 'Audio file not found'}), 404
     
-    logger.debug(f"Serving audio file: {audio_filename} from {audio_dir}")
-    return send_from_directory(audio_dir, audio_filename, mimetype='audio/mpeg')
+    logger.debug(f"Serving audio file: {audio_path}")
+    accel_path = None
+    if AUDIO_ACCEL_PREFIX:
+        accel_path = f"{AUDIO_ACCEL_PREFIX.rstrip('/')}/{sentence}/audio/{language}.mp3"
+    return send_audio(audio_path, info, accel_path)
 
 @app.route('/admin')
 def admin_index():
@@ -203,9 +323,14 @@ if __name__ == '__main__':
     from admin import admin
     
     # Register admin blueprint
-    admin_bp = admin.init_admin(LOCAL_DATA_DIR)
+    admin_bp = admin.init_admin(LOCAL_DATA_DIR, store=content_store, db=catalog_db)
     app.register_blueprint(admin_bp)
     
+    # Load all translations into memory and watch for changes made outside the admin panel
+    content_store.load_all()
+    if CONTENT_POLL_INTERVAL > 0:
+        content_store.start_polling(CONTENT_POLL_INTERVAL)
+    
     logger.info("Starting server on http://0.0.0.0:5000")
     app.run(
         host='0.0.0.0',
@@ -1,13 +1,27 @@
 import eventlet
 eventlet.monkey_patch()
+from eventlet import tpool
 
 import os
-import json
+import re
+import time
 import logging
-from flask import Flask, render_template, request, jsonify, send_from_directory, url_for
+from flask import Flask, render_template, request, jsonify, url_for, Response
 from flask_socketio import SocketIO
 from flask_cors import CORS
-from vosk import Model, KaldiRecognizer
+from translator.sessions import SessionManager
+from translator.decoder import ThreadDecoder
+from translator.workers import ProcessDecoder
+from translator.vad import VoiceActivityGate
+from translator.audio_format import AudioFormat, SampleConverter
+from translator.matcher import longest_match, tokenize
+from translator.grammar import CatalogGrammar
+from translator.content import ContentLayout, ContentStore
+from translator.audio_http import AudioFileCache, audio_version, send_audio
+from translator.capture import SessionCapture, capture_path
+from translator.startup import Startup, warm_up
+from translator.models import ModelRegistry, ModelBudgetExceeded
+from translator.metrics import REGISTRY, CONTENT_TYPE, Counter, CounterFunction, Gauge, Histogram
 
 # Set up logging
 logging.basicConfig(level=logging.DEBUG)
@@ -29,126 +43,541 @@ socketio = SocketIO(
 
 # Configuration
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
 audio_directory = os.path.join(BASE_DIR, "audio")
 sentences_directory = os.path.join(BASE_DIR, "sentences")
 
-# Load Vosk model
-try:
-    model_path = os.path.join(BASE_DIR, "vosk-model-small-en-us-0.15")
-    if not os.path.exists(model_path):
-        raise FileNotFoundError(f"Model not found at {model_path}")
-    model = Model(model_path)
-    logger.info("Vosk model loaded successfully")
-except Exception as e:
-    logger.error(f"Error loading model: {e}")
-    exit(1)
-
-# Predefined sentences
+# Sentence catalog the recognizer grammar is built from, shared with the admin panel;
+# translation texts and audio are read from the same sentence directories, falling
+# back to the audio/ and sentences/ directories above for deployments that predate it
+LOCAL_DATA_DIR = os.environ.get('LOCAL_DATA', os.path.join(BASE_DIR, 'local_data'))
+SENTENCES_DIR = os.path.join(LOCAL_DATA_DIR, 'sentences')
+REFERENCE_LANGUAGE = 'English'  # Must match the key in languages.json
+CATALOG_POLL_INTERVAL = float(os.environ.get('CATALOG_POLL_INTERVAL', 5))
+
+# Socket.IO protocol - version 2 clients get translation text and audio URL
+# inside the transcription event instead of fetching them afterwards
+PROTOCOL_VERSION = 2
+
+# Seconds between mtime checks of cached translation texts and audio
+CONTENT_POLL_INTERVAL = float(os.environ.get('CONTENT_POLL_INTERVAL', 10))
+
+# Audio serving - stat cache lifetime, and optional nginx internal locations
+# (X-Accel-Redirect) that map onto audio_directory and SENTENCES_DIR so nginx sends the bytes
+AUDIO_STAT_TTL = float(os.environ.get('AUDIO_STAT_TTL', 5))
+AUDIO_ACCEL_PREFIX = os.environ.get('AUDIO_ACCEL_PREFIX')
+CATALOG_AUDIO_ACCEL_PREFIX = os.environ.get('CATALOG_AUDIO_ACCEL_PREFIX')
+
+# Opt-in capture of each session's raw audio with arrival times, for replay.py;
+# unset disables capturing
+CAPTURE_DIR = os.environ.get('CAPTURE_DIR')
+CAPTURE_FLUSH_BYTES = int(os.environ.get('CAPTURE_FLUSH_BYTES', 256 * 1024))
+
+# Recognizer pool sizing - each concurrent speaker holds one recognizer
+RECOGNIZER_POOL_SIZE = int(os.environ.get('RECOGNIZER_POOL_SIZE', 2))
+RECOGNIZER_POOL_MAX = int(os.environ.get('RECOGNIZER_POOL_MAX', 16))
+RECOGNIZER_LEASE_TIMEOUT = float(os.environ.get('RECOGNIZER_LEASE_TIMEOUT', 5))
+
+# Decoding backend - 'thread' runs Vosk on native threads in this process,
+# 'process' forks DECODE_PROCESSES workers that share the loaded model
+DECODE_BACKEND = os.environ.get('DECODE_BACKEND', 'thread')
+DECODE_WORKERS = int(os.environ.get('DECODE_WORKERS', os.cpu_count() or 1))
+DECODE_PROCESSES = int(os.environ.get('DECODE_PROCESSES', os.cpu_count() or 1))
+
+# Audio ingest - 16 kHz int16 mono, decoded in 4000 byte chunks; clients declaring
+# another rate or encoding (float32, mulaw) are converted and resampled on arrival
+SAMPLE_RATE = 16000
+CHUNK_SIZE = 4000
+AUDIO_BUFFER_SECONDS = float(os.environ.get('AUDIO_BUFFER_SECONDS', 10))
+AUDIO_LAG_RATIO = float(os.environ.get('AUDIO_LAG_RATIO', 0.5))
+
+# Voice activity gate - silence beyond VAD_HANGOVER_MS is not decoded
+VAD_ENABLED = os.environ.get('VAD_ENABLED', '1') == '1'
+VAD_THRESHOLD_DB = float(os.environ.get('VAD_THRESHOLD_DB', -45))
+VAD_HANGOVER_MS = int(os.environ.get('VAD_HANGOVER_MS', 1000))
+
+# Vosk model, loaded in the background after the server starts listening; a
+# WARMUP_SECONDS synthetic decode runs before the server reports ready (0 skips it)
+MODEL_PATH = os.path.join(BASE_DIR, "vosk-model-small-en-us-0.15")
+WARMUP_SECONDS = float(os.environ.get('WARMUP_SECONDS', 2))
+
+# Further models clients can pick on connect, one directory per model id under
+# MODELS_DIR, loaded on first use; idle ones are evicted least recently used
+# first to keep loaded models under MODEL_MEMORY_BUDGET_MB (0 for no limit)
+MODELS_DIR = os.environ.get('MODELS_DIR', os.path.join(BASE_DIR, 'models'))
+DEFAULT_MODEL = os.environ.get('DEFAULT_MODEL', os.path.basename(MODEL_PATH))
+MODEL_MEMORY_BUDGET = int(float(os.environ.get('MODEL_MEMORY_BUDGET_MB', 0)) * 2**20)
+
+# Minimum seconds between partial_transcription events per session
+PARTIAL_RESULT_INTERVAL = float(os.environ.get('PARTIAL_RESULT_INTERVAL', 0.25))
+
+# Metrics served at /metrics; values computed from live state are wired up below
+ACTIVE_SESSIONS = Gauge('translator_active_sessions', 'Connected clients holding a recognizer')
+LAGGING_SESSIONS = Gauge('translator_lagging_sessions', 'Sessions whose audio buffer is over AUDIO_LAG_RATIO')
+BUFFERED_BYTES = Gauge('translator_audio_buffered_bytes', 'Audio waiting in session buffers to be decoded')
+RECEIVED_BYTES = Counter('translator_audio_received_bytes_total', 'Audio bytes received over audio_stream')
+DROPPED_BYTES = Counter('translator_audio_dropped_bytes_total', 'Audio bytes dropped because a session buffer was full')
+DECODED_BYTES = Counter('translator_audio_decoded_bytes_total', 'Audio bytes passed to the recognizer after the VAD')
+MATCH_SECONDS = Histogram('translator_match_seconds', 'Time to match a transcription against the catalog')
+EMIT_SECONDS = Histogram('translator_emit_seconds', 'Time to emit a Socket.IO event', ['event'])
+CONTENT_LOOKUPS = CounterFunction('translator_content_lookups_total', 'Content store lookups', ['result'])
+AUDIO_REQUEST_SECONDS = Histogram('translator_audio_request_seconds', 'Time to answer an /audio request', ['status'])
+READY = Gauge('translator_ready', 'Whether the model is loaded and warmed up')
+LOADED_MODELS = Gauge('translator_models_loaded', 'Vosk models currently loaded')
+MODEL_MEMORY = Gauge('translator_model_memory_bytes', 'Estimated memory held by loaded models')
+MODEL_EVICTIONS = CounterFunction('translator_model_evictions_total', 'Idle models evicted to stay under the memory budget')
+
+# Model, recognizer pool and decoder are created by start_decoding() in the background
+startup = Startup()
+model = None
+recognizer_pool = None
+decoder = None
+
+# Built-in sentences, used only if the catalog is empty
 predefined_sentences = [
     "hello", "goodbye", "how are you", "good wishes",
     "i will drink water", "i will have food", "my name is",
     "thank you", "will you drink water", "will you have food"
 ]
 
-# Initialize recognizer
-recognizer = KaldiRecognizer(
-    model, 16000,
-    '["[unk]", ' + ','.join(f'"{word}"' for word in predefined_sentences) + ']'
-)
+# Grammar and precompiled phrase matcher for the current catalog version
+catalog_grammar = CatalogGrammar(LOCAL_DATA_DIR, REFERENCE_LANGUAGE, fallback_phrases=predefined_sentences)
+catalog = catalog_grammar.load()
+
+# Languages served before the catalog, named as in the audio/ and sentences/ layout
+LEGACY_LANGUAGES = ["Apatani", "Bhutanese", "French", "Hindi", "Monpa"]
 
 # Global variables
-languages = {
-    "Apatani": "Apatani",
-    "Bhutanese": "Bhutanese",
-    "French": "French",
-    "Hindi": "Hindi",
-    "Monpa": "Monpa"
-}
 selected_language = None
 latest_transcription = ""
 text_content = ""
-audio_buffer = bytearray()
+
+# Catalog languages and files, with the legacy layout and language names still accepted
+content_layout = ContentLayout(SENTENCES_DIR, lambda: catalog.languages,
+                               legacy_dir=BASE_DIR, legacy_languages=LEGACY_LANGUAGES)
+
+# Translation texts and audio availability, served from memory, keyed by the
+# catalog's sentence ids and language codes
+content_store = ContentStore(
+    text_path=content_layout.text_path,
+    audio_path=content_layout.audio_path,
+    list_sentences=lambda: set(catalog.phrases.values()),
+    list_languages=lambda: content_layout.languages().keys()
+)
+content_store.load_all()
+
+# Builds relative URLs outside of a request context
+url_adapter = app.url_map.bind('')
+
+audio_files = AudioFileCache(ttl=AUDIO_STAT_TTL)
+if CONTENT_POLL_INTERVAL > 0:
+    content_store.start_polling(CONTENT_POLL_INTERVAL)
 
 @app.route('/')
 def index():
     logger.debug("Serving index page")
-    return render_template('index.html', languages=languages)
+    return render_template('index.html', languages=content_layout.languages())
 
 @app.route('/api/health')
 def health_check():
+    """Liveness: the server is up, reporting whether the model is still loading"""
     logger.debug("Health check endpoint called")
-    return jsonify({"status": "ok"})
+    status = startup.to_dict()
+    if startup.state == 'failed':
+        return jsonify(dict(status, status="error")), 500
+    return jsonify(dict(status, status="ok"))
+
+@app.route('/api/ready')
+def readiness_check():
+    """Readiness: 200 only once the model is loaded and warmed up, for load balancer checks"""
+    return jsonify(startup.to_dict()), 200 if startup.ready else 503
+
+@app.route('/api/models')
+def list_models():
+    return jsonify(models.to_dict())
+
+@app.route('/metrics')
+def metrics():
+    return Response(REGISTRY.render(), mimetype=CONTENT_TYPE)
 
 @socketio.on('connect')
-def handle_connect():
-    logger.info(f"Client connected: {request.sid}")
+def handle_connect(auth=None):
+    if not startup.ready:
+        raise ConnectionRefusedError('Server is starting, try again shortly')
+
+    auth = auth or {}
+    model_id = auth.get('model') or models.default
+    session = sessions.open(request.sid, model_pool(model_id))
+    if session is None:
+        raise ConnectionRefusedError('Server busy, try again later')
+
+    session.model_id = model_id
+
+    session.protocol = min(int(auth.get('protocol', 1)), PROTOCOL_VERSION)
+    if auth.get('language'):
+        session.language = content_layout.language_code(auth['language'])
+    if auth.get('format'):
+        try:
+            set_audio_format(session, auth['format'])
+        except ValueError as e:
+            sessions.close(request.sid)
+            raise ConnectionRefusedError(str(e))
+    if CAPTURE_DIR:
+        start_capture(session)
+    logger.info(f"Client connected: {request.sid} protocol {session.protocol} model {model_id} "
+                f"({len(sessions)} active sessions)")
+
+@socketio.on('audio_format')
+def handle_audio_format(data):
+    session = sessions.get(request.sid)
+    if session is None:
+        return {'status': 'error', 'message': 'Unknown session'}
+
+    try:
+        audio_format = set_audio_format(session, data)
+    except ValueError as e:
+        logger.warning(f"Session {session.sid} sent invalid audio format: {e}")
+        return {'status': 'error', 'message': str(e)}
+    return {'status': 'success', 'format': repr(audio_format)}
+
+def model_pool(model_id):
+    """Recognizer pool for the model a client asked for, loading the model if needed"""
+    if model_id == models.default:
+        return recognizer_pool
+    if DECODE_BACKEND == 'process':
+        # Worker processes only share the model loaded before they were forked
+        raise ConnectionRefusedError(f"Model {model_id} is not available with the process decode backend")
+    try:
+        return models.pool(model_id, execute=tpool.execute)
+    except KeyError:
+        raise ConnectionRefusedError(f"Unknown model: {model_id}")
+    except ModelBudgetExceeded as e:
+        logger.warning(f"Refusing model {model_id}: {e}")
+        raise ConnectionRefusedError('Model unavailable, server at memory capacity')
+
+def set_audio_format(session, data):
+    """Switch the session to the sample format the client declared"""
+    audio_format = AudioFormat.from_dict(data)
+    converter = SampleConverter(audio_format, SAMPLE_RATE)
+    with session.lock:
+        session.converter = None if converter.passthrough else converter
+        if session.capture is not None:
+            session.capture.record_format(audio_format)
+    logger.info(f"Session {session.sid} audio format: {audio_format!r}")
+    return audio_format
+
+def start_capture(session):
+    """Record the session's incoming audio, with everything needed to replay it"""
+    audio_format = session.converter.format if session.converter else AudioFormat('int16', SAMPLE_RATE)
+    header = {
+        'sid': session.sid,
+        'protocol': session.protocol,
+        'language': session.language,
+        'format': {'encoding': audio_format.encoding, 'sample_rate': audio_format.sample_rate},
+        'sample_rate': SAMPLE_RATE,
+        'chunk_size': CHUNK_SIZE,
+        'buffer_capacity': sessions.buffer_capacity,
+        'vad': {'threshold_db': VAD_THRESHOLD_DB, 'hangover_ms': VAD_HANGOVER_MS} if VAD_ENABLED else None,
+        'catalog_version': catalog.version,
+        'model': session.model_id,
+        'decode_backend': DECODE_BACKEND
+    }
+    try:
+        os.makedirs(CAPTURE_DIR, exist_ok=True)
+        session.capture = SessionCapture(capture_path(CAPTURE_DIR, session.sid), header, CAPTURE_FLUSH_BYTES)
+        logger.info(f"Capturing session {session.sid} to {session.capture.path}")
+    except OSError as e:
+        logger.error(f"Cannot capture session {session.sid}: {e}")
+
+@socketio.on('select_language')
+def handle_select_language(data):
+    session = sessions.get(request.sid)
+    language = content_layout.language_code((data or {}).get('language'))
+    if session is None or language is None:
+        return {'status': 'error'}
+
+    session.language = language
+    logger.info(f"Session {session.sid} language set to: {language}")
+    return {'status': 'success'}
 
 @socketio.on('disconnect')
 def handle_disconnect():
-    logger.info(f"Client disconnected: {request.sid}")
+    session = sessions.close(request.sid)
+    logger.info(f"Client disconnected: {request.sid} ({len(sessions)} active sessions)")
+    if session is not None and session.capture is not None:
+        session.capture.close()
+    if session is not None and session.vad is not None:
+        logger.info(f"Session {session.sid} skipped {session.vad.skipped_bytes} of "
+                    f"{session.vad.total_bytes} bytes as silence ({session.vad.skipped_ratio:.0%})")
+    if session is not None and session.converter is not None:
+        logger.info(f"Session {session.sid} sent {session.converter.input_bytes} bytes of "
+                    f"{session.converter.format!r}, converted to {session.converter.output_bytes} bytes")
+
+def update_lag(session):
+    """Log when a session's buffer crosses AUDIO_LAG_RATIO in either direction"""
+    buffer = session.audio_buffer
+    lagging = buffer.fill_ratio >= AUDIO_LAG_RATIO
+    if lagging != session.lagging:
+        session.lagging = lagging
+        logger.warning(f"Session {session.sid} {'is lagging' if lagging else 'caught up'}: "
+                       f"{buffer.fill} bytes buffered")
+
+def drain_audio(session):
+    """Decode a session's buffered chunks in order, until fewer than a chunk are left
+
+    Runs as one green thread per session at a time, so audio keeps arriving into
+    the buffer while a chunk decodes and a slow decoder shows up as buffer fill.
+    """
+    try:
+        with session.lock:
+            if session.recognizer is None:
+                return
+            for audio_chunk in session.audio_buffer.chunks():
+                if session.vad is None:
+                    DECODED_BYTES.inc(len(audio_chunk))
+                    decoder.feed(session, audio_chunk)
+                else:
+                    for voiced_chunk in session.vad.filter(audio_chunk):
+                        DECODED_BYTES.inc(len(voiced_chunk))
+                        decoder.feed(session, voiced_chunk)
+                if session.recognizer is None:
+                    return
+            update_lag(session)
+    except Exception as e:
+        logger.error(f"Audio processing error: {e}")
+        session.audio_buffer.clear()
+    finally:
+        session.draining = False
+
+    # Audio that arrived while the lock was being released
+    if session.recognizer is not None and session.audio_buffer.fill >= CHUNK_SIZE:
+        session.draining = True
+        eventlet.spawn(drain_audio, session)
 
 @socketio.on('audio_stream')
 def handle_audio_stream(data):
-    global audio_buffer, recognizer
+    session = sessions.get(request.sid)
+    if session is None:
+        logger.warning(f"Audio received for unknown session: {request.sid}")
+        return
+
     logger.debug(f"Received audio data: {len(data)} bytes")
+    session.received_at = time.monotonic()
+    RECEIVED_BYTES.inc(len(data))
 
-    try:
-        chunk_size = 4000
+    if session.recognizer is None:
+        return
 
-        if isinstance(data, memoryview):
-            audio_buffer.extend(data.tobytes())
-        else:
-            audio_buffer.extend(data)
+    # Nothing here yields to the hub, so writes never interleave with each other
+    # or with drain_audio advancing the buffer
+    try:
+        if session.capture is not None:
+            session.capture.record_audio(data)
+        if session.converter is not None:
+            data = session.converter.convert(data)
+
+        buffer = session.audio_buffer
+        accepted = buffer.write(data)
+        if accepted < len(data):
+            DROPPED_BYTES.inc(len(data) - accepted)
+            logger.warning(f"Audio buffer full for {session.sid}, dropped {buffer.dropped} bytes so far")
+        update_lag(session)
+    except Exception as e:
+        logger.error(f"Audio processing error: {e}")
+        return
 
-        while len(audio_buffer) >= chunk_size:
-            audio_chunk = bytes(audio_buffer[:chunk_size])
-            audio_buffer = audio_buffer[chunk_size:]
+    if not session.draining and buffer.fill >= CHUNK_SIZE:
+        session.draining = True
+        eventlet.spawn(drain_audio, session)
 
-            if recognizer.AcceptWaveform(audio_chunk):
-                result = json.loads(recognizer.Result())
-                process_recognition(result)
+def process_partial(session, result):
+    partial = result.get('partial', '').lower()
+    if not partial or partial == session.last_partial:
+        return
 
-    except Exception as e:
-        logger.error(f"Audio processing error: {e}")
-        audio_buffer = bytearray()
+    session.last_partial = partial
+    started = time.perf_counter()
+    socketio.emit('partial_transcription', {'transcription': partial}, to=session.sid)
+    EMIT_SECONDS.labels('partial_transcription').observe(time.perf_counter() - started)
 
-def process_recognition(result):
+def process_recognition(session, result):
+    session.last_partial = ""
     transcription = result.get('text', '').lower()
-    matched_sentence = next(
-        (sentence for sentence in predefined_sentences if sentence in transcription),
-        None
-    )
-
-    socketio.emit('transcription', {
+    started = time.perf_counter()
+    matches = catalog.matcher.find_all(transcription)
+    longest = longest_match(matches)
+    MATCH_SECONDS.observe(time.perf_counter() - started)
+    sentence_id = longest.key if longest else None
+
+    # matched_sentence(s) are the recognized phrases, as before the catalog;
+    # sentence_id(s) name the catalog sentences they belong to
+    payload = {
         'transcription': transcription,
-        'matched_sentence': matched_sentence
-    })
+        'matched_sentence': longest.phrase if longest else None,
+        'matched_sentences': list(dict.fromkeys(match.phrase for match in matches)),
+        'sentence_id': sentence_id,
+        'sentence_ids': list(dict.fromkeys(match.key for match in matches))
+    }
+
+    language = session.language or content_layout.language_code(selected_language)
+    if session.protocol >= 2:
+        payload['protocol'] = PROTOCOL_VERSION
+        payload['language'] = language
+        payload['text'] = None
+        payload['audio_url'] = None
+        if sentence_id and language:
+            payload['text'], payload['audio_url'] = resolve_translation(sentence_id, language)
+
+    if session.capture is not None:
+        session.capture.record_result({'transcription': transcription, 'matched_sentence': sentence_id})
+
+    started = time.perf_counter()
+    socketio.emit('transcription', payload, to=session.sid)
+    EMIT_SECONDS.labels('transcription').observe(time.perf_counter() - started)
     logger.debug(f"Emitted transcription: {transcription}")
 
-    if matched_sentence:
+    if sentence_id:
         global latest_transcription, text_content
         latest_transcription = transcription
-        text_content = read_text_file(matched_sentence)
-        logger.info(f"Recognized: {matched_sentence}")
+        text_content = read_text_file(sentence_id)
+        logger.info(f"Recognized: {sentence_id}")
+
+def resolve_translation(sentence, language):
+    """Text and versioned audio URL for a sentence, straight from the content store"""
+    entry = content_store.get(sentence, language)
+    audio_url = None
+    if entry.has_audio:
+        # Built without a request context, since results may arrive from a decode worker;
+        # the version changes whenever the file does, so the URL can be cached
+        audio_url = url_adapter.build('serve_audio', {
+            'sentence': sentence,
+            'language': language,
+            'v': audio_version(entry.audio_mtime)
+        })
+    return entry.text, audio_url
+
+def make_vad():
+    return VoiceActivityGate(
+        SAMPLE_RATE, CHUNK_SIZE,
+        threshold_db=VAD_THRESHOLD_DB,
+        hangover_ms=VAD_HANGOVER_MS
+    )
 
-def read_text_file(sentence):
-    if not selected_language:
-        return None
+# Per-connection sessions; recognizers are leased from the pool once startup is done
+sessions = SessionManager(
+    None,
+    lease_timeout=RECOGNIZER_LEASE_TIMEOUT,
+    buffer_capacity=int(AUDIO_BUFFER_SECONDS * SAMPLE_RATE * 2),
+    chunk_size=CHUNK_SIZE,
+    vad_factory=make_vad if VAD_ENABLED else None
+)
 
-    text_path = os.path.join(
-        sentences_directory,
-        sentence.replace(" ", "_"),
-        f"{languages[selected_language]}.txt"
-    )
-    logger.debug(f"Looking for text file at: {text_path}")
+# Vosk models by id; the bundled model is always available, alongside MODELS_DIR
+models = ModelRegistry(
+    MODELS_DIR, SAMPLE_RATE, DEFAULT_MODEL,
+    grammar=catalog.grammar,
+    grammar_version=catalog.version,
+    # Process decode workers warm their own recognizers
+    pool_size=RECOGNIZER_POOL_SIZE if DECODE_BACKEND != 'process' else 0,
+    pool_max=RECOGNIZER_POOL_MAX,
+    memory_budget=MODEL_MEMORY_BUDGET
+)
+models.register(os.path.basename(MODEL_PATH), MODEL_PATH)
+
+def load_model():
+    if DEFAULT_MODEL not in models.available():
+        raise FileNotFoundError(f"Model {DEFAULT_MODEL} not found in {MODELS_DIR} or at {MODEL_PATH}")
+    return models.load(DEFAULT_MODEL)
 
-    if os.path.exists(text_path):
+def start_decoding():
+    """Load and warm up the model, then start the decoding backend
+
+    Runs as a green thread so the server accepts requests (health checks
+    included) while the model loads; blocking steps run on a native thread.
+    """
+    global model, recognizer_pool, decoder
+    try:
+        loaded = startup.run_blocking('load_model', load_model)
+        model = loaded.model
+        if WARMUP_SECONDS > 0:
+            startup.run_blocking('warm_up', warm_up, model, SAMPLE_RATE, catalog.grammar, WARMUP_SECONDS, CHUNK_SIZE)
+
+        if DECODE_BACKEND == 'process':
+            # Forks from the hub, after the loading thread has finished
+            with startup.step('start_workers'):
+                decoder = ProcessDecoder(
+                    model, SAMPLE_RATE, catalog.grammar, process_recognition,
+                    processes=DECODE_PROCESSES,
+                    max_sessions=RECOGNIZER_POOL_MAX,
+                    pool_size=RECOGNIZER_POOL_SIZE,
+                    chunk_size=CHUNK_SIZE,
+                    on_partial=process_partial,
+                    partial_interval=PARTIAL_RESULT_INTERVAL,
+                    grammar_version=catalog.version
+                )
+            recognizer_pool = decoder
+        else:
+            # The default model's pool was warmed with RECOGNIZER_POOL_SIZE recognizers as it loaded
+            recognizer_pool = loaded.pool
+            decoder = ThreadDecoder(
+                process_recognition,
+                models,
+                workers=DECODE_WORKERS,
+                on_partial=process_partial,
+                partial_interval=PARTIAL_RESULT_INTERVAL
+            )
+
+        sessions.pool = recognizer_pool
+        startup.set_ready()
+    except Exception as e:
+        startup.set_failed(e)
+        return
+
+    if CATALOG_POLL_INTERVAL > 0:
+        eventlet.spawn(watch_catalog)
+
+ACTIVE_SESSIONS.set_function(lambda: len(sessions))
+LAGGING_SESSIONS.set_function(lambda: len(sessions.lagging()))
+BUFFERED_BYTES.set_function(sessions.buffered)
+CONTENT_LOOKUPS.labels('hit').set_function(lambda: content_store.hits)
+CONTENT_LOOKUPS.labels('miss').set_function(lambda: content_store.misses)
+READY.set_function(lambda: int(startup.ready))
+LOADED_MODELS.set_function(lambda: len(models.loaded()))
+MODEL_MEMORY.set_function(lambda: models.memory)
+MODEL_EVICTIONS.set_function(lambda: models.evictions)
+
+def watch_catalog():
+    """Rebuild the grammar in the background when the sentence catalog changes"""
+    global catalog
+    while True:
+        eventlet.sleep(CATALOG_POLL_INTERVAL)
         try:
-            with open(text_path, 'r', encoding='utf-8') as file:
-                return file.read()
+            version = tpool.execute(catalog_grammar.version)
+            if version == catalog.version:
+                continue
+
+            updated = tpool.execute(catalog_grammar.load, version)
+            catalog = updated
+            decoder.set_grammar(updated.grammar, updated.version)
         except Exception as e:
-            logger.error(f"Error reading text file: {e}")
-    return None
+            logger.error(f"Error reloading catalog: {e}")
+
+eventlet.spawn(start_decoding)
+
+def sentence_id_for(sentence):
+    """Catalog id for a sentence given by id or, as older clients send it, by matched phrase"""
+    return catalog.phrases.get(' '.join(tokenize(sentence)), sentence).replace(' ', '_')
+
+def is_valid_path_component(component):
+    """Check if a path component is valid (only letters, numbers, underscores, and hyphens)"""
+    return bool(re.match(r'^[a-zA-Z0-9_\-]+$', component))
+
+def read_text_file(sentence):
+    language = content_layout.language_code(selected_language)
+    if language is None:
+        return None
+
+    return content_store.text(sentence_id_for(sentence), language)
 
 @app.route('/select_language', methods=['POST'])
 def select_language():
@@ -171,23 +600,48 @@ def get_text_content():
 def get_audio_path():
     sentence = request.form['sentence']
     language = request.form['language']
-    audio_filename = f"{sentence.replace(' ', '_')}/{languages[language]}.mp3"
-    audio_path = os.path.join(audio_directory, audio_filename)
-
-    logger.debug(f"Requested audio path: {audio_path}")
-    if os.path.exists(audio_path):
-        return jsonify({'audioPath': url_for('serve_audio', filename=audio_filename, _external=True)})
+    sentence_id = sentence_id_for(sentence)
+    language = content_layout.language_code(language)
+    if language is None or not is_valid_path_component(sentence_id):
+        return jsonify({'audioPath': None})
+
+    logger.debug(f"Requested audio path: {sentence_id}/{language}")
+    entry = content_store.get(sentence_id, language)
+    if entry.has_audio:
+        return jsonify({'audioPath': url_for('serve_audio', sentence=sentence_id, language=language,
+                                             v=audio_version(entry.audio_mtime), _external=True)})
     return jsonify({'audioPath': None})
 
-@app.route('/audio/<path:filename>')
-def serve_audio(filename):
-    logger.debug(f"Serving audio file: {filename}")
-    return send_from_directory(audio_directory, filename, mimetype='audio/mpeg')
+def audio_accel_path(audio_path):
+    """X-Accel-Redirect path for an audio file, under the nginx location for its directory"""
+    for prefix, directory in ((CATALOG_AUDIO_ACCEL_PREFIX, SENTENCES_DIR), (AUDIO_ACCEL_PREFIX, audio_directory)):
+        if prefix and audio_path.startswith(directory + os.sep):
+            return prefix.rstrip('/') + '/' + os.path.relpath(audio_path, directory).replace(os.sep, '/')
+    return None
+
+# Also serves the URLs of clients from before the catalog, /audio/<sentence>/<Language>.mp3
+@app.route('/audio/<sentence>/<language>')
+def serve_audio(sentence, language):
+    logger.debug(f"Serving audio file: {sentence}/{language}")
+    started = time.perf_counter()
+    if language.endswith('.mp3'):
+        language = language[:-len('.mp3')]
+    language = content_layout.language_code(language)
+    audio_path = None
+    if language is not None and is_valid_path_component(sentence):
+        audio_path = content_layout.audio_path(sentence, language)
+    info = audio_files.get(audio_path) if audio_path else None
+    if info is None:
+        response = app.make_response((jsonify({'error': 'Audio file not found'}), 404))
+    else:
+        response = send_audio(audio_path, info, audio_accel_path(audio_path))
+
+    AUDIO_REQUEST_SECONDS.labels(response.status_code).observe(time.perf_counter() - started)
+    return response
 
 if __name__ == '__main__':
     # Create directories if they don't exist
-    os.makedirs(audio_directory, exist_ok=True)
-    os.makedirs(sentences_directory, exist_ok=True)
+    os.makedirs(SENTENCES_DIR, exist_ok=True)
 
     logger.info("Starting server on http://localhost:5000")
     socketio.run(
@@ -0,0 +1,389 @@
+"""Socket.IO load generator and end-to-end latency benchmark for app.py
+
+Spawns simulated speakers that stream a recorded WAV over audio_stream at
+real-time pace, in the chunk sizes the browser AudioWorklet sends, and
+measures the time from each utterance's last speech chunk to its
+transcription event. Server CPU and RSS are sampled from /proc.
+
+    python benchmark.py speech.wav --clients 8 --spawn --output report.json
+    python benchmark.py speech.wav --clients 16 --url http://host:5000 --server-pid 1234 --baseline report.json
+
+The Socket.IO and HTTP clients are not in requirements.txt; install them with
+
+    pip install -r requirements-bench.txt
+"""
+import os
+import sys
+import json
+import time
+import wave
+import argparse
+import logging
+import platform
+import threading
+import subprocess
+import numpy as np
+import requests
+import socketio
+from translator.audio_format import AudioFormat, StreamResampler, decode_samples, mulaw_encode, to_int16
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(levelname)s:%(name)s:%(message)s')
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Samples per audio_stream message, matching the AudioWorklet in templates/index.html
+WORKLET_BUFFER_SIZE = 16000
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('wav', help='Mono 16-bit PCM recording of one utterance')
+    parser.add_argument('--clients', type=int, default=4, help='Concurrent simulated speakers')
+    parser.add_argument('--utterances', type=int, default=5, help='Utterances each client speaks')
+    parser.add_argument('--ramp', type=float, default=2.0, help='Seconds over which clients connect')
+    parser.add_argument('--encoding', choices=['mulaw', 'int16', 'float32'], default='mulaw')
+    parser.add_argument('--rate', type=int, default=48000, help='Client sample rate (AudioContext rate)')
+    parser.add_argument('--silence', type=float, default=1.5,
+                        help='Seconds of silence streamed after each utterance so the recognizer can endpoint')
+    parser.add_argument('--timeout', type=float, default=5.0,
+                        help='Seconds after the last speech chunk before an utterance counts as dropped')
+    parser.add_argument('--late', type=float, default=1.0, help='Latency above which a result counts as late')
+    parser.add_argument('--language', default='fr', help='Catalog language code the clients ask for')
+    parser.add_argument('--url', default='http://127.0.0.1:5000')
+    parser.add_argument('--spawn', action='store_true', help='Start app.py for the run and stop it afterwards')
+    parser.add_argument('--server-pid', type=int, help='PID of an already running server to sample')
+    parser.add_argument('--output', '-o', help='Write the JSON report here')
+    parser.add_argument('--baseline', help='Earlier report to compare against')
+    return parser.parse_args(argv)
+
+
+def load_utterance(path, audio_format):
+    """Read a WAV file and encode it as the worklet would send it: a list of messages"""
+    with wave.open(path, 'rb') as wf:
+        if wf.getnchannels() != 1 or wf.getsampwidth() != 2:
+            raise ValueError('Audio file must be WAV format mono PCM.')
+        rate = wf.getframerate()
+        samples = decode_samples(wf.readframes(wf.getnframes()), 'int16')
+
+    if rate != audio_format.sample_rate:
+        resampler = StreamResampler(rate, audio_format.sample_rate)
+        samples = np.concatenate((resampler.process(samples), resampler.process(np.zeros(64, np.float32))))
+
+    messages = []
+    for start in range(0, len(samples), WORKLET_BUFFER_SIZE):
+        block = samples[start:start + WORKLET_BUFFER_SIZE]
+        if len(block) < WORKLET_BUFFER_SIZE:
+            block = np.concatenate((block, np.zeros(WORKLET_BUFFER_SIZE - len(block), np.float32)))
+        messages.append(encode(block, audio_format.encoding))
+    return messages
+
+
+def encode(samples, encoding):
+    if encoding == 'float32':
+        return samples.astype('<f4').tobytes()
+    pcm = to_int16(samples)
+    if encoding == 'mulaw':
+        return mulaw_encode(np.frombuffer(pcm, dtype='<i2'))
+    return pcm
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) if values else None
+
+
+class ProcessSampler:
+    """Samples CPU time and RSS of a process and its children from /proc"""
+
+    def __init__(self, pid, interval=0.5):
+        self.pid = pid
+        self.interval = interval
+        self.ticks = os.sysconf('SC_CLK_TCK')
+        self.samples = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='process-sampler', daemon=True)
+
+    def _pids(self):
+        """The process and all its descendants, e.g. forked decode workers"""
+        children = {}
+        for entry in os.listdir('/proc'):
+            if entry.isdigit():
+                try:
+                    with open(f'/proc/{entry}/stat') as f:
+                        parent = int(f.read().rsplit(')', 1)[1].split()[1])
+                except (OSError, IndexError, ValueError):
+                    continue
+                children.setdefault(parent, []).append(int(entry))
+
+        pids = [self.pid]
+        for pid in pids:
+            pids.extend(children.get(pid, []))
+        return pids
+
+    def _read(self):
+        cpu = 0.0
+        rss = 0
+        for pid in self._pids():
+            try:
+                with open(f'/proc/{pid}/stat') as f:
+                    fields = f.read().rsplit(')', 1)[1].split()
+                cpu += (int(fields[11]) + int(fields[12])) / self.ticks
+                with open(f'/proc/{pid}/status') as f:
+                    for line in f:
+                        if line.startswith('VmRSS:'):
+                            rss += int(line.split()[1]) * 1024
+            except (OSError, IndexError, ValueError):
+                continue
+        return cpu, rss
+
+    def _run(self):
+        previous_time, previous_cpu = time.monotonic(), self._read()[0]
+        while not self._stop.wait(self.interval):
+            now = time.monotonic()
+            cpu, rss = self._read()
+            self.samples.append(((cpu - previous_cpu) / (now - previous_time) * 100, rss))
+            previous_time, previous_cpu = now, cpu
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        cpu = [sample[0] for sample in self.samples]
+        rss = [sample[1] for sample in self.samples]
+        return {
+            'cpu_percent_mean': float(np.mean(cpu)) if cpu else None,
+            'cpu_percent_max': max(cpu) if cpu else None,
+            'rss_bytes_max': max(rss) if rss else None,
+            'samples': len(self.samples)
+        }
+
+
+class SimulatedClient:
+    """One speaker streaming an utterance repeatedly at real-time pace"""
+
+    def __init__(self, index, args, audio_format, messages):
+        self.index = index
+        self.args = args
+        self.audio_format = audio_format
+        self.messages = messages
+        self.message_seconds = WORKLET_BUFFER_SIZE / audio_format.sample_rate
+        self.silence = encode(np.zeros(WORKLET_BUFFER_SIZE, np.float32), audio_format.encoding)
+        self.latencies = []
+        self.dropped = 0
+        self.late = 0
+        self.late_sends = 0
+        self.transcriptions = 0
+        self.error = None
+        # Arrival times of transcription events not yet attributed to an utterance
+        self._events = []
+        self._lock = threading.Lock()
+
+    def _on_transcription(self, data):
+        with self._lock:
+            self._events.append(time.perf_counter())
+            self.transcriptions += 1
+
+    def _latency_since(self, last_speech):
+        """Seconds from last_speech to the first transcription after it, if one arrived"""
+        with self._lock:
+            for received_at in self._events:
+                if received_at > last_speech:
+                    return received_at - last_speech
+        return None
+
+    def _stream(self, sio, message, due):
+        """Send message at its real-time slot, returning the next slot"""
+        delay = due - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        elif delay < -self.message_seconds:
+            self.late_sends += 1
+        sio.emit('audio_stream', message)
+        return due + self.message_seconds
+
+    def run(self):
+        sio = socketio.Client(reconnection=False)
+        sio.on('transcription', self._on_transcription)
+        auth = {
+            'protocol': 2,
+            'language': self.args.language,
+            'format': {'encoding': self.audio_format.encoding, 'sample_rate': self.audio_format.sample_rate}
+        }
+        try:
+            sio.connect(self.args.url, auth=auth, transports=['websocket'])
+        except Exception as e:
+            self.error = f"connect failed: {e}"
+            return
+
+        try:
+            silence_messages = max(1, round(self.args.silence / self.message_seconds))
+            due = time.perf_counter()
+            for _ in range(self.args.utterances):
+                for message in self.messages:
+                    due = self._stream(sio, message, due)
+                last_speech = time.perf_counter()
+
+                # Keep streaming silence, as a live microphone would, until the result arrives
+                deadline = last_speech + self.args.timeout
+                latency = None
+                sent = 0
+                while latency is None and time.perf_counter() < deadline:
+                    due = self._stream(sio, self.silence, due)
+                    sent += 1
+                    latency = self._latency_since(last_speech)
+
+                if latency is None:
+                    self.dropped += 1
+                else:
+                    self.latencies.append(latency)
+                    if latency > self.args.late:
+                        self.late += 1
+                with self._lock:
+                    self._events.clear()
+                # Let the rest of the silence through so the next utterance starts clean
+                while sent < silence_messages:
+                    due = self._stream(sio, self.silence, due)
+                    sent += 1
+        except Exception as e:
+            self.error = str(e)
+        finally:
+            sio.disconnect()
+
+    def report(self):
+        return {
+            'client': self.index,
+            'latencies': self.latencies,
+            'transcriptions': self.transcriptions,
+            'dropped': self.dropped,
+            'late': self.late,
+            'late_sends': self.late_sends,
+            'error': self.error
+        }
+
+
+def wait_for_server(url, timeout=60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(f"{url}/api/ready", timeout=1).ok:
+                return True
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    return False
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def summarize(clients):
+    reports = [client.report() for client in clients]
+    latencies = [latency for report in reports for latency in report['latencies']]
+    expected = sum(len(report['latencies']) + report['dropped'] for report in reports)
+    return {
+        'utterances': expected,
+        'results': len(latencies),
+        'dropped': sum(report['dropped'] for report in reports),
+        'late': sum(report['late'] for report in reports),
+        'late_sends': sum(report['late_sends'] for report in reports),
+        'failed_clients': sum(1 for report in reports if report['error']),
+        'latency_mean': float(np.mean(latencies)) if latencies else None,
+        'latency_p50': percentile(latencies, 50),
+        'latency_p90': percentile(latencies, 90),
+        'latency_p99': percentile(latencies, 99),
+        'latency_max': max(latencies) if latencies else None
+    }, reports
+
+
+def compare(current, previous):
+    """Log each metric's change against the same section of an earlier report"""
+    for key, value in current.items():
+        before = previous.get(key)
+        if isinstance(value, (int, float)) and isinstance(before, (int, float)):
+            change = f" ({(value - before) / before:+.0%})" if before else ''
+            logger.info(f"  {key}: {before:.4g} -> {value:.4g}{change}")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    audio_format = AudioFormat(args.encoding, args.rate)
+    messages = load_utterance(args.wav, audio_format)
+
+    server = None
+    pid = args.server_pid
+    if args.spawn:
+        server = subprocess.Popen([sys.executable, os.path.join(BASE_DIR, 'app.py')], cwd=BASE_DIR,
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        pid = server.pid
+    try:
+        if not wait_for_server(args.url):
+            logger.error(f"Server at {args.url} is not responding")
+            return 1
+
+        sampler = ProcessSampler(pid) if pid and os.path.exists(f'/proc/{pid}') else None
+        if sampler:
+            sampler.start()
+
+        clients = [SimulatedClient(index, args, audio_format, messages) for index in range(args.clients)]
+        threads = []
+        started = time.perf_counter()
+        for client in clients:
+            thread = threading.Thread(target=client.run, name=f"client-{client.index}", daemon=True)
+            thread.start()
+            threads.append(thread)
+            time.sleep(args.ramp / max(1, args.clients))
+        for thread in threads:
+            thread.join()
+        duration = time.perf_counter() - started
+
+        summary, reports = summarize(clients)
+        server_stats = sampler.stop() if sampler else None
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    report = {
+        'commit': git_commit(),
+        'timestamp': time.time(),
+        'host': {'platform': platform.platform(), 'cpus': os.cpu_count()},
+        'config': {key: value for key, value in vars(args).items() if key not in ('output', 'baseline')},
+        'duration': duration,
+        'summary': summary,
+        'server': server_stats,
+        'clients': reports
+    }
+
+    logger.info(f"{args.clients} clients, {summary['results']}/{summary['utterances']} utterances transcribed, "
+                f"{summary['dropped']} dropped, {summary['late']} late, {summary['failed_clients']} clients failed")
+    if summary['results']:
+        logger.info(f"Latency p50 {summary['latency_p50']:.3f}s p90 {summary['latency_p90']:.3f}s "
+                    f"p99 {summary['latency_p99']:.3f}s max {summary['latency_max']:.3f}s")
+    if server_stats and server_stats['samples']:
+        logger.info(f"Server CPU mean {server_stats['cpu_percent_mean']:.0f}% max {server_stats['cpu_percent_max']:.0f}%, "
+                    f"RSS max {server_stats['rss_bytes_max'] / 2**20:.0f} MiB")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        logger.info(f"Compared with {baseline.get('commit')} ({baseline['config']['clients']} clients):")
+        compare(summary, baseline['summary'])
+        if server_stats and baseline.get('server'):
+            compare(server_stats, baseline['server'])
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,39 @@
+"""Pack the local_data catalog into a single memory-mapped content bundle
+
+The app serves texts and audio from the bundle when it exists instead of
+opening thousands of small files. Run this after local_data changes (the
+Docker entrypoint does after each git pull); the app maps the new file
+without a restart.
+
+    python build_bundle.py
+    python build_bundle.py --local-data /app/local_data -o /app/content.bundle
+"""
+import os
+import sys
+import argparse
+import logging
+from translator.bundle import BUNDLE_NAME, build_bundle
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(levelname)s:%(name)s:%(message)s')
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--local-data', default=os.environ.get('LOCAL_DATA', os.path.join(BASE_DIR, 'local_data')))
+    parser.add_argument('-o', '--output', default=os.environ.get('CONTENT_BUNDLE'),
+                        help=f'Bundle file (default: <local-data>/{BUNDLE_NAME})')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    build_bundle(args.local_data, args.output or os.path.join(args.local_data, BUNDLE_NAME))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,197 @@
+"""Offline bulk transcription and recognition speed benchmark
+
+Decodes every WAV file in a directory with the same model, catalog grammar,
+voice activity gate and sentence matching as app.py, and reports per-file
+transcriptions, matched sentence ids, wall time and real-time factor.
+
+    python bulk_transcribe.py recordings/ --workers 4 --output results.csv
+"""
+import os
+import csv
+import sys
+import json
+import time
+import argparse
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from vosk import Model, SetLogLevel
+from translator.sessions import RecognizerPool
+from translator.grammar import CatalogGrammar
+from translator.matcher import longest_match
+from translator.vad import VoiceActivityGate
+from translator.jobs import check_wav, decode_wav
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(levelname)s:%(name)s:%(message)s')
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Same audio settings and fallback sentences as app.py
+SAMPLE_RATE = 16000
+CHUNK_SIZE = 4000
+predefined_sentences = [
+    "hello", "goodbye", "how are you", "good wishes",
+    "i will drink water", "i will have food", "my name is",
+    "thank you", "will you drink water", "will you have food"
+]
+
+CSV_FIELDS = ['file', 'duration', 'wall_time', 'rtf', 'transcription', 'matched_sentences', 'error']
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('directory', help='Directory of mono 16-bit PCM WAV files')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='Files decoded in parallel (default: CPU count)')
+    parser.add_argument('--output', '-o', help='Write results here instead of stdout')
+    parser.add_argument('--format', choices=['json', 'csv'],
+                        help='Output format (default: from --output extension, else json)')
+    parser.add_argument('--recursive', '-r', action='store_true', help='Include subdirectories')
+    parser.add_argument('--model', default=os.path.join(BASE_DIR, 'vosk-model-small-en-us-0.15'))
+    parser.add_argument('--local-data', default=os.environ.get('LOCAL_DATA', os.path.join(BASE_DIR, 'local_data')),
+                        help='Sentence catalog the grammar and matcher are built from')
+    parser.add_argument('--no-grammar', action='store_true', help='Decode with the full model vocabulary')
+    parser.add_argument('--no-vad', action='store_true', help='Decode silence too, like VAD_ENABLED=0')
+    parser.add_argument('--vad-threshold-db', type=float, default=float(os.environ.get('VAD_THRESHOLD_DB', -45)))
+    parser.add_argument('--vad-hangover-ms', type=int, default=int(os.environ.get('VAD_HANGOVER_MS', 1000)))
+    return parser.parse_args(argv)
+
+
+def find_wav_files(directory, recursive=False):
+    if not recursive:
+        return sorted(entry.path for entry in os.scandir(directory)
+                      if entry.is_file() and entry.name.lower().endswith('.wav'))
+
+    paths = []
+    for root, _, names in os.walk(directory):
+        paths.extend(os.path.join(root, name) for name in names if name.lower().endswith('.wav'))
+    return sorted(paths)
+
+
+def match_utterance(catalog, result):
+    """Match one final result against the catalog, as app.process_recognition does"""
+    transcription = result.get('text', '').lower()
+    matches = catalog.matcher.find_all(transcription)
+    longest = longest_match(matches)
+    return {
+        'transcription': transcription,
+        'matched_sentence': longest.key if longest else None,
+        'matched_sentences': list(dict.fromkeys(match.key for match in matches))
+    }
+
+
+def transcribe_file(path, pool, catalog, args):
+    record = {'file': os.path.relpath(path, args.directory), 'duration': None, 'wall_time': None, 'rtf': None}
+    vad = None
+    if not args.no_vad:
+        vad = VoiceActivityGate(SAMPLE_RATE, CHUNK_SIZE, threshold_db=args.vad_threshold_db,
+                                hangover_ms=args.vad_hangover_ms)
+
+    try:
+        check_wav(path)
+        recognizer = pool.acquire()
+        started = time.perf_counter()
+        try:
+            results, duration = decode_wav(recognizer, path, SAMPLE_RATE, CHUNK_SIZE, vad)
+        finally:
+            wall_time = time.perf_counter() - started
+            pool.release(recognizer)
+    except Exception as e:
+        logger.error(f"Error transcribing {path}: {e}")
+        record['error'] = str(e)
+        return record
+
+    utterances = [match_utterance(catalog, result) for result in results if result.get('text')]
+    record.update({
+        'duration': duration,
+        'wall_time': wall_time,
+        'rtf': wall_time / duration if duration else None,
+        'transcription': ' '.join(utterance['transcription'] for utterance in utterances),
+        'matched_sentences': [utterance['matched_sentence'] for utterance in utterances
+                              if utterance['matched_sentence']],
+        'utterances': utterances,
+        'skipped_ratio': vad.skipped_ratio if vad else 0.0,
+        'error': None
+    })
+    return record
+
+
+def summarize(records, wall_time, workers):
+    decoded = [record for record in records if record.get('error') is None]
+    audio = sum(record['duration'] for record in decoded)
+    decode_time = sum(record['wall_time'] for record in decoded)
+    return {
+        'files': len(records),
+        'failed': len(records) - len(decoded),
+        'workers': workers,
+        'audio_seconds': audio,
+        'wall_time': wall_time,
+        # Per-stream speed (decode time / audio) and whole-run speed across workers
+        'rtf': decode_time / audio if audio else None,
+        'aggregate_rtf': wall_time / audio if audio else None,
+        'times_real_time': audio / wall_time if wall_time else None
+    }
+
+
+def write_json(out, records, summary):
+    json.dump({'summary': summary, 'files': records}, out, indent=2, ensure_ascii=False)
+    out.write('\n')
+
+
+def write_csv(out, records):
+    writer = csv.DictWriter(out, fieldnames=CSV_FIELDS, extrasaction='ignore')
+    writer.writeheader()
+    for record in records:
+        row = dict(record)
+        row['matched_sentences'] = ';'.join(record.get('matched_sentences') or [])
+        writer.writerow(row)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    SetLogLevel(-1)
+
+    paths = find_wav_files(args.directory, args.recursive)
+    if not paths:
+        logger.error(f"No WAV files found in {args.directory}")
+        return 1
+
+    catalog = CatalogGrammar(args.local_data, fallback_phrases=predefined_sentences).load()
+    model = Model(args.model)
+    workers = max(1, min(args.workers, len(paths)))
+    pool = RecognizerPool(model, SAMPLE_RATE, None if args.no_grammar else catalog.grammar,
+                          size=workers, max_size=workers)
+
+    records = [None] * len(paths)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(transcribe_file, path, pool, catalog, args): index
+                   for index, path in enumerate(paths)}
+        for future, index in futures.items():
+            records[index] = future.result()
+            record = records[index]
+            if record.get('error') is None:
+                logger.info(f"{record['file']}: {record['duration']:.1f}s audio, RTF {record['rtf'] or 0:.3f}, "
+                            f"matched {record['matched_sentences']}")
+    wall_time = time.perf_counter() - started
+
+    summary = summarize(records, wall_time, workers)
+    logger.info(f"Decoded {summary['audio_seconds']:.1f}s of audio in {wall_time:.2f}s with {workers} workers "
+                f"(RTF {summary['rtf'] or 0:.3f}, {summary['times_real_time'] or 0:.1f}x real time)")
+
+    output_format = args.format or ('csv' if args.output and args.output.lower().endswith('.csv') else 'json')
+    out = open(args.output, 'w', newline='', encoding='utf-8') if args.output else sys.stdout
+    try:
+        if output_format == 'csv':
+            write_csv(out, records)
+        else:
+            write_json(out, records, summary)
+    finally:
+        if args.output:
+            out.close()
+    return 1 if summary['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
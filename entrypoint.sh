@@ -78,6 +78,14 @@ else
     echo "[$(date)] Failed to fetch from GitHub" >&2
 fi
 
+# Pack the synced catalog into one bundle file; the app serves from the sentence
+# directories if this fails
+if python /app/build_bundle.py --local-data "$REPO_DIR"; then
+    echo "[$(date)] Content bundle built"
+else
+    echo "[$(date)] Failed to build content bundle, serving from sentence directories" >&2
+fi
+
 # Execute the main application
 echo "[$(date)] Starting application..."
 exec "$@"
@@ -0,0 +1,62 @@
+"""Bulk import sentences, translations and audio into the catalog
+
+Accepts a ZIP archive or directory in the local_data layout
+(<sentence>/text/<lang>.txt, <sentence>/audio/<lang>.mp3), or a CSV with a
+sentence_id column followed by one column per language code, optionally
+with an audio folder laid out as <sentence>/<lang>.mp3. Entries are
+streamed to disk and committed to the index together at the end.
+
+    python import_catalog.py phrasebook.zip
+    python import_catalog.py phrasebook.csv --audio-dir phrasebook_audio --add-languages
+"""
+import os
+import sys
+import json
+import argparse
+import logging
+from translator.catalog_db import open_catalog
+from translator.catalog_import import CatalogImporter, CatalogImportError, open_source
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(levelname)s:%(name)s:%(message)s')
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('source', help='ZIP archive, directory or CSV file')
+    parser.add_argument('--audio-dir', help='Audio folder for a CSV source')
+    parser.add_argument('--local-data', default=os.environ.get('LOCAL_DATA', os.path.join(BASE_DIR, 'local_data')))
+    parser.add_argument('--db', default=os.environ.get('CATALOG_DB'),
+                        help='Database file (default: <local-data>/catalog.sqlite3)')
+    parser.add_argument('--workers', type=int, default=4, help='Threads copying files')
+    parser.add_argument('--add-languages', action='store_true',
+                        help='Create languages that are not in the catalog yet instead of skipping them')
+    parser.add_argument('--output', '-o', help='Write the JSON report here')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    db = open_catalog(args.local_data, args.db)
+    try:
+        source = open_source(args.source, args.audio_dir)
+    except (CatalogImportError, OSError) as e:
+        logger.error(str(e))
+        return 2
+
+    importer = CatalogImporter(db, args.local_data, workers=args.workers, add_languages=args.add_languages)
+    report = importer.run(source).to_dict()
+    for skipped in report['skipped']:
+        logger.warning(f"Skipped {skipped['file']}: {skipped['reason']}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
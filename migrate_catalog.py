@@ -0,0 +1,46 @@
+"""Import the local_data JSON/directory catalog into the SQLite catalog database
+
+The admin panel does this automatically on first start and whenever
+languages.json or index_path.json were changed outside it (e.g. by a git
+pull); run this to re-import on demand or to write the JSON back out.
+
+    python migrate_catalog.py
+    python migrate_catalog.py --local-data /app/local_data --export
+"""
+import os
+import sys
+import argparse
+import logging
+from translator.catalog_db import CatalogDB
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(levelname)s:%(name)s:%(message)s')
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--local-data', default=os.environ.get('LOCAL_DATA', os.path.join(BASE_DIR, 'local_data')))
+    parser.add_argument('--db', default=os.environ.get('CATALOG_DB'),
+                        help='Database file (default: <local-data>/catalog.sqlite3)')
+    parser.add_argument('--export', action='store_true',
+                        help='Write languages.json and index_path.json from the database instead of importing')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    db = CatalogDB(args.db or os.path.join(args.local_data, 'catalog.sqlite3'))
+    if args.export:
+        db.export_files(args.local_data)
+        logger.info(f"Exported {len(db.sentence_ids())} sentences and {len(db.languages())} languages "
+                    f"to {args.local_data}")
+    else:
+        db.import_files(args.local_data)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,195 @@
+"""Replay captured sessions through the recognition pipeline
+
+Feeds a capture written with CAPTURE_DIR back through the same conversion,
+buffering, voice activity gate, recognizer and sentence matching as
+app.py, either at the original message timing or as fast as possible, and
+reports per-utterance decode latency and differences from the results the
+user originally received.
+
+    python replay.py captures/20260101-120000-abc.vcap
+    python replay.py captures/*.vcap --fast --output replay.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import logging
+import numpy as np
+from vosk import KaldiRecognizer, SetLogLevel
+from translator.audio_format import AudioFormat, SampleConverter
+from translator.capture import FORMAT, RESULT, read_capture
+from translator.grammar import CatalogGrammar
+from translator.matcher import longest_match
+from translator.models import ModelRegistry
+from translator.ringbuffer import RingBuffer
+from translator.vad import VoiceActivityGate
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(levelname)s:%(name)s:%(message)s')
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Same fallback sentences as app.py
+predefined_sentences = [
+    "hello", "goodbye", "how are you", "good wishes",
+    "i will drink water", "i will have food", "my name is",
+    "thank you", "will you drink water", "will you have food"
+]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('captures', nargs='+', help='Capture files (.vcap)')
+    parser.add_argument('--fast', action='store_true', help='Ignore the original timing and decode flat out')
+    parser.add_argument('--speed', type=float, default=1.0, help='Timing multiplier when not --fast')
+    parser.add_argument('--model', default=os.path.join(BASE_DIR, 'vosk-model-small-en-us-0.15'),
+                        help='Default model, for captures that name none or one not in --models-dir')
+    parser.add_argument('--models-dir', default=os.environ.get('MODELS_DIR', os.path.join(BASE_DIR, 'models')),
+                        help='Further models by id, as app.py finds them')
+    parser.add_argument('--local-data', default=os.environ.get('LOCAL_DATA', os.path.join(BASE_DIR, 'local_data')))
+    parser.add_argument('--output', '-o', help='Write the JSON report here')
+    return parser.parse_args(argv)
+
+
+def match(catalog, result):
+    """Match a final result against the catalog, as app.process_recognition does"""
+    transcription = result.get('text', '').lower()
+    longest = longest_match(catalog.matcher.find_all(transcription))
+    return {'transcription': transcription, 'matched_sentence': longest.key if longest else None}
+
+
+def load_model(models, model_id, path):
+    """The LoadedModel a capture was decoded with, or the default if it is not available"""
+    try:
+        return models.load(model_id)
+    except KeyError:
+        logger.warning(f"{path} was captured with model {model_id}, which is not available; "
+                       f"replaying with {models.default}")
+        return models.load()
+
+
+def replay(path, models, catalog, fast=False, speed=1.0):
+    """Push one capture through the pipeline and return its report"""
+    header, records = read_capture(path)
+    sample_rate = header['sample_rate']
+    chunk_size = header['chunk_size']
+    loaded = load_model(models, header.get('model') or models.default, path)
+
+    if header.get('catalog_version') != catalog.version:
+        logger.warning(f"{path} was captured with catalog {header.get('catalog_version')}, "
+                       f"replaying with {catalog.version}")
+
+    if loaded.uses_grammar:
+        recognizer = KaldiRecognizer(loaded.model, sample_rate, catalog.grammar)
+    else:
+        recognizer = KaldiRecognizer(loaded.model, sample_rate)
+    buffer = RingBuffer(header['buffer_capacity'], chunk_size)
+    vad = None
+    if header.get('vad'):
+        vad = VoiceActivityGate(sample_rate, chunk_size, threshold_db=header['vad']['threshold_db'],
+                                hangover_ms=header['vad']['hangover_ms'])
+
+    def make_converter(audio_format):
+        converter = SampleConverter(AudioFormat.from_dict(audio_format), sample_rate)
+        return None if converter.passthrough else converter
+
+    converter = make_converter(header['format'])
+    utterances = []
+    original = []
+    decode_seconds = []
+    audio_seconds = 0.0
+    dropped = 0
+    started = time.perf_counter()
+
+    for kind, offset, payload in records:
+        if kind == RESULT:
+            original.append(payload)
+            continue
+        if kind == FORMAT:
+            converter = make_converter(payload)
+            continue
+
+        if not fast:
+            delay = started + offset / speed - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        received_at = time.perf_counter()
+
+        data = converter.convert(payload) if converter else payload
+        audio_seconds += len(data) / 2 / sample_rate
+        accepted = buffer.write(data)
+        dropped += len(data) - accepted
+
+        for chunk in buffer.chunks():
+            for voiced_chunk in vad.filter(chunk) if vad else (chunk,):
+                chunk_started = time.perf_counter()
+                final = recognizer.AcceptWaveform(bytes(voiced_chunk))
+                decode_seconds.append(time.perf_counter() - chunk_started)
+                if final:
+                    result = json.loads(recognizer.Result())
+                    utterance = match(catalog, result)
+                    utterance['latency'] = time.perf_counter() - received_at
+                    utterance['at'] = offset
+                    utterances.append(utterance)
+
+    wall_time = time.perf_counter() - started
+    diffs = []
+    for index in range(max(len(utterances), len(original))):
+        replayed = utterances[index] if index < len(utterances) else None
+        captured = original[index] if index < len(original) else None
+        if (replayed and replayed['transcription']) != (captured and captured['transcription']) \
+                or (replayed and replayed['matched_sentence']) != (captured and captured['matched_sentence']):
+            diffs.append({'index': index, 'captured': captured, 'replayed': replayed})
+
+    latencies = [utterance['latency'] for utterance in utterances]
+    return {
+        'capture': path,
+        'sid': header.get('sid'),
+        'model': loaded.model_id,
+        'format': header['format'],
+        'mode': 'fast' if fast else f"realtime x{speed:g}",
+        'audio_seconds': audio_seconds,
+        'wall_time': wall_time,
+        'rtf': sum(decode_seconds) / audio_seconds if audio_seconds else None,
+        'dropped_bytes': dropped,
+        'utterances': utterances,
+        'latency_p50': float(np.percentile(latencies, 50)) if latencies else None,
+        'latency_max': max(latencies) if latencies else None,
+        'accept_waveform_max': max(decode_seconds) if decode_seconds else None,
+        'captured_results': len(original),
+        'diffs': diffs
+    }
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    SetLogLevel(-1)
+    catalog = CatalogGrammar(args.local_data, fallback_phrases=predefined_sentences).load()
+    # Replay builds its own recognizers, so the registry's pools stay empty
+    default = os.path.basename(os.path.normpath(args.model))
+    models = ModelRegistry(args.models_dir, 16000, default, pool_size=0, pool_max=1)
+    models.register(default, args.model)
+
+    reports = []
+    for path in args.captures:
+        report = replay(path, models, catalog, args.fast, args.speed)
+        reports.append(report)
+        for index, utterance in enumerate(report['utterances']):
+            logger.info(f"  [{index}] {utterance['at']:7.2f}s latency {utterance['latency'] * 1000:6.1f}ms "
+                        f"{utterance['transcription']!r} -> {utterance['matched_sentence']}")
+        logger.info(f"{path}: {len(report['utterances'])} utterances from {report['audio_seconds']:.1f}s of audio, "
+                    f"RTF {report['rtf'] or 0:.3f}, {len(report['diffs'])} differ from the "
+                    f"{report['captured_results']} captured results")
+        for diff in report['diffs']:
+            logger.warning(f"  [{diff['index']}] captured {diff['captured']} replayed {diff['replayed']}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(reports, f, indent=2, ensure_ascii=False)
+    return 1 if any(report['diffs'] for report in reports) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,22 +1,29 @@
 from flask import Flask, render_template, request, jsonify, send_from_directory, url_for
-from vosk import Model, KaldiRecognizer
-from flask_socketio import SocketIO
-import json
+from vosk import Model
+from flask_socketio import SocketIO, join_room
 import os
-import wave
-import io
+import tempfile
+from translator.grammar import CatalogGrammar
+from translator.content import ContentLayout, ContentStore
+from translator.matcher import longest_match, tokenize
+from translator.jobs import JobQueue, JobQueueFull, check_wav
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 MODEL_PATH = os.path.join(BASE_DIR, "vosk-model-small-en-us-0.15")
+LOCAL_DATA_DIR = os.environ.get('LOCAL_DATA', os.path.join(BASE_DIR, 'local_data'))
+
+# Batch transcription - decode threads, queue limit, and how long finished jobs are kept
+TRANSCRIBE_WORKERS = int(os.environ.get('TRANSCRIBE_WORKERS', 2))
+TRANSCRIBE_MAX_PENDING = int(os.environ.get('TRANSCRIBE_MAX_PENDING', 100))
+TRANSCRIBE_JOB_RETENTION = float(os.environ.get('TRANSCRIBE_JOB_RETENTION', 3600))
+# Seconds /transcribe holds its request open before returning the job id to poll;
+# longer files should go through /api/jobs
+TRANSCRIBE_WAIT_TIMEOUT = float(os.environ.get('TRANSCRIBE_WAIT_TIMEOUT', 10))
 
 model = Model(model_path=MODEL_PATH)
 app = Flask(__name__)
-socketio = SocketIO(app)
-
-# Global variables
-latest_transcription = ""
-selected_language = None
-text_content = ""
+# Jobs are decoded on native threads, so Socket.IO runs in threading mode too
+socketio = SocketIO(app, async_mode='threading')
 
 # Predefined sentences
 predefined_sentences = [
@@ -25,85 +32,157 @@ predefined_sentences = [
     "thank you", "will you drink water", "will you have food"
 ]
 
-# Supported languages with their IDs
-languages = {
-    "Apatani": "Apatani",
-    "Bhutanese": "Bhutanese",
-    "French": "French",
-    "Hindi": "Hindi",
-    "Monpa": "Monpa"
-}
-
-# Path to the directory containing audio and text files
-audio_directory = os.path.join(BASE_DIR, "audio")
-sentences_directory = os.path.join(BASE_DIR, "sentences")
-
-def display_text(sentence):
-    global selected_language
-    text_path = os.path.join(sentences_directory, sentence.replace(" ", "_"), f"{languages[selected_language]}.txt")
-    
-    if os.path.exists(text_path):
-        with open(text_path, 'r', encoding='utf-8') as file:
-            text_content = file.read()
-            return text_content
-    else:
-        print(f"Text file '{text_path}' not found.")
-        return None
+# Languages served before the catalog, named as in the audio/ and sentences/ layout
+LEGACY_LANGUAGES = ["Apatani", "Bhutanese", "French", "Hindi", "Monpa"]
+
+# Path to the directory containing audio and text files; the audio/ and sentences/
+# directories next to this file are still read for anything the catalog lacks
+SENTENCES_DIR = os.path.join(LOCAL_DATA_DIR, 'sentences')
+
+# Catalog phrases matched against transcriptions, and the texts shown for them,
+# keyed by the catalog's sentence ids and language codes
+catalog = CatalogGrammar(LOCAL_DATA_DIR, fallback_phrases=predefined_sentences).load()
+content_layout = ContentLayout(SENTENCES_DIR, lambda: catalog.languages,
+                               legacy_dir=BASE_DIR, legacy_languages=LEGACY_LANGUAGES)
+content_store = ContentStore(
+    text_path=content_layout.text_path,
+    audio_path=content_layout.audio_path,
+    list_sentences=lambda: catalog.phrases.values(),
+    list_languages=lambda: content_layout.languages().keys()
+)
 
 @app.route('/')
 def index():
-    return render_template('testing.html', languages=languages)
+    return render_template('testing.html', languages=content_layout.languages())
+
+def annotate_transcription(job, transcription):
+    """Catalog matches for a decoded file, with the matched text in the job's language"""
+    matches = catalog.matcher.find_all(transcription)
+    longest = longest_match(matches)
+    matched_sentence = longest.key if longest else None
+    text = None
+    language = content_layout.language_code(job.language)
+    if matched_sentence and language:
+        text = content_store.text(matched_sentence, language)
+    return {
+        'matched_sentence': matched_sentence,
+        'matched_sentences': list(dict.fromkeys(match.key for match in matches)),
+        'text_content': text
+    }
+
+def report_job_update(job, result):
+    room = f"job:{job.id}"
+    socketio.emit('job_result', {'job_id': job.id, 'result': result}, to=room)
+    if job.finished_at:
+        socketio.emit('job_done', job.to_dict(), to=room)
+
+jobs = JobQueue(
+    model,
+    grammar=catalog.grammar,
+    grammar_version=catalog.version,
+    workers=TRANSCRIBE_WORKERS,
+    max_pending=TRANSCRIBE_MAX_PENDING,
+    retention=TRANSCRIBE_JOB_RETENTION,
+    annotate=annotate_transcription,
+    on_update=report_job_update
+)
+
+def submit_uploads():
+    """Save the request's 'audio' uploads to disk and queue them as one job"""
+    uploads = request.files.getlist('audio')
+    if not uploads:
+        raise ValueError('No audio files uploaded.')
+
+    files = []
+    try:
+        for upload in uploads:
+            fd, path = tempfile.mkstemp(suffix='.wav')
+            os.close(fd)
+            files.append((upload.filename, path))
+            upload.save(path)
+            check_wav(path)
+        return jobs.submit(files, request.form.get('language_id'))
+    except Exception:
+        for _, path in files:
+            os.remove(path)
+        raise
+
+@app.route('/api/jobs', methods=['POST'])
+def create_job():
+    try:
+        job = submit_uploads()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except JobQueueFull as e:
+        return jsonify({'error': f"Transcription queue is full: {e}"}), 503
+
+    response = jsonify({'job_id': job.id, 'status': job.status, 'status_url': url_for('get_job', job_id=job.id)})
+    return response, 202
+
+@app.route('/api/jobs/<job_id>')
+def get_job(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job.to_dict())
+
+@socketio.on('subscribe_job')
+def subscribe_job(data):
+    """Join a job's room to receive job_result/job_done events"""
+    job = jobs.get((data or {}).get('job_id'))
+    if job is None:
+        return {'status': 'error', 'message': 'Job not found'}
+
+    join_room(f"job:{job.id}")
+    # Results that finished before subscribing are in the snapshot
+    return {'status': 'success', 'job': job.to_dict()}
 
 @app.route('/transcribe', methods=['POST'])
 def transcribe():
-    global latest_transcription, text_content, selected_language
-
-    audio_data = request.files['audio'].read()
-    selected_language = request.form['language_id']
-    
-    wf = wave.open(io.BytesIO(audio_data), 'rb')
-    
-    if wf.getnchannels() != 1 or wf.getsampwidth() != 2 or wf.getcomptype() != 'NONE':
-        return jsonify({'error': 'Audio file must be WAV format mono PCM.'})
-
-    recognizer = KaldiRecognizer(model, wf.getframerate())
-    
-    while True:
-        data = wf.readframes(4000)
-        if len(data) == 0:
-            break
-        if recognizer.AcceptWaveform(data):
-            result = json.loads(recognizer.Result())
-            latest_transcription = result['text']
-            
-            matched_sentence = None
-            for sentence in predefined_sentences:
-                if sentence in latest_transcription.lower():
-                    matched_sentence = sentence
-                    break
-                    
-            if matched_sentence:
-                text_content = display_text(matched_sentence)
-
-    return jsonify({'transcription': latest_transcription, 'text_content': text_content})
+    """Synchronous wrapper around the job API for a single file"""
+    try:
+        job = submit_uploads()
+    except ValueError as e:
+        return jsonify({'error': str(e)})
+    except JobQueueFull as e:
+        return jsonify({'error': f"Transcription queue is full: {e}"}), 503
+
+    if not job.done.wait(TRANSCRIBE_WAIT_TIMEOUT):
+        return jsonify({'job_id': job.id, 'status': job.status,
+                        'status_url': url_for('get_job', job_id=job.id)}), 202
+
+    result = job.results[0]
+    return jsonify({
+        'job_id': job.id,
+        'transcription': result.get('transcription', ''),
+        'text_content': result.get('text_content'),
+        'error': result.get('error')
+    })
 
 @app.route('/get_audio_path', methods=['POST'])
 def get_audio_path():
     sentence = request.form['sentence']
     language = request.form['language']
 
-    audio_filename = f"{sentence.replace(' ', '_')}/{languages[language]}.mp3"
-    audio_path = os.path.join(audio_directory, audio_filename)
-
-    if os.path.exists(audio_path):
-        audio_url = url_for('serve_audio', filename=audio_filename)
+    # Older clients send the matched phrase and the language name
+    sentence_id = catalog.phrases.get(' '.join(tokenize(sentence)), sentence).replace(' ', '_')
+    language = content_layout.language_code(language)
+    if language and content_store.has_audio(sentence_id, language):
+        audio_url = url_for('serve_audio', sentence=sentence_id, language=language)
         return jsonify({'audioPath': audio_url})
     else:
         return jsonify({'audioPath': None})
 
-@app.route('/audio/<path:filename>')
-def serve_audio(filename):
-    return send_from_directory(audio_directory, filename)
+# Also serves the URLs of clients from before the catalog, /audio/<sentence>/<Language>.mp3
+@app.route('/audio/<sentence>/<language>')
+def serve_audio(sentence, language):
+    if language.endswith('.mp3'):
+        language = language[:-len('.mp3')]
+    language = content_layout.language_code(language)
+    if language is None or not sentence.replace('_', '').replace('-', '').isalnum():
+        return jsonify({'error': 'Audio file not found'}), 404
+    audio_path = content_layout.audio_path(sentence, language)
+    return send_from_directory(os.path.dirname(audio_path), os.path.basename(audio_path))
 
 if __name__ == '__main__':
-    app.run(debug=True)
+    socketio.run(app, debug=True)
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The translator package lives at the repository root, which has no packaging
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,52 @@
+import numpy as np
+
+from translator.audio_format import AudioFormat, SampleConverter, mulaw_encode
+
+
+def split_at(data, sizes):
+    parts, start = [], 0
+    for size in sizes:
+        parts.append(data[start:start + size])
+        start += size
+    parts.append(data[start:])
+    return parts
+
+
+def test_int16_at_target_rate_passes_through():
+    converter = SampleConverter(AudioFormat('int16', 16000), 16000)
+    assert converter.passthrough
+    data = b'\x01\x02\x03\x04'
+    assert converter.convert(data) is data
+
+
+def test_float32_remainder_is_carried_across_messages():
+    samples = np.linspace(-0.5, 0.5, 100, dtype='<f4')
+    data = samples.tobytes()
+    whole = SampleConverter(AudioFormat('float32', 16000), 16000).convert(data)
+
+    converter = SampleConverter(AudioFormat('float32', 16000), 16000)
+    # Split inside samples, so each message ends with a partial float
+    pieces = [converter.convert(part) for part in split_at(data, [5, 130, 3, 1])]
+    assert b''.join(pieces) == whole
+    assert len(whole) == 200
+    assert converter.input_bytes == len(data)
+    assert converter.output_bytes == len(whole)
+
+
+def test_resampled_stream_does_not_depend_on_message_boundaries():
+    rate = 48000
+    t = np.arange(rate // 10) / rate
+    pcm = (8000 * np.sin(2 * np.pi * 440 * t)).astype('<i2').tobytes()
+    whole = SampleConverter(AudioFormat('int16', rate), 16000).convert(pcm)
+
+    converter = SampleConverter(AudioFormat('int16', rate), 16000)
+    pieces = [converter.convert(part) for part in split_at(pcm, [1001, 777, 2, 3333])]
+    assert b''.join(pieces) == whole
+
+
+def test_mulaw_round_trip_is_close():
+    samples = np.linspace(-0.9, 0.9, 64, dtype=np.float32)
+    encoded = mulaw_encode(samples * 32767)
+    pcm = SampleConverter(AudioFormat('mulaw', 16000), 16000).convert(encoded)
+    decoded = np.frombuffer(pcm, '<i2') / 32768.0
+    assert np.max(np.abs(decoded - samples)) < 0.05
@@ -0,0 +1,76 @@
+import os
+import json
+import hashlib
+
+import pytest
+
+from translator.bundle import build_bundle, open_bundle
+
+
+def write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    mode = 'wb' if isinstance(data, bytes) else 'w'
+    with open(path, mode) as f:
+        f.write(data)
+
+
+@pytest.fixture
+def local_data(tmp_path):
+    root = tmp_path / 'local_data'
+    write(str(root / 'languages.json'), json.dumps({'en': 'English', 'fr': 'French'}))
+    write(str(root / 'index_path.json'), json.dumps({'sentences': ['Hello', 'Bye', 'Hello']}))
+    write(str(root / 'sentences/Hello/text/en.txt'), 'Hello')
+    write(str(root / 'sentences/Hello/text/fr.txt'), 'Bonjour é')
+    write(str(root / 'sentences/Hello/audio/fr.mp3'), b'ID3 fake mp3 data')
+    write(str(root / 'sentences/Bye/text/en.txt'), '')
+    write(str(root / 'sentences/Bye/text/fr.txt'), '')
+    return str(root)
+
+
+def test_round_trip(local_data):
+    stats = build_bundle(local_data)
+    bundle = open_bundle(os.path.join(local_data, 'content.bundle'))
+
+    assert bundle.languages == {'en': 'English', 'fr': 'French'}
+    assert bundle.sentences == ['Hello', 'Bye']
+    assert bundle.text('Hello', 'fr') == 'Bonjour é'
+    assert bundle.text('Bye', 'en') == ''
+    assert bundle.text('Bye', 'de') is None
+
+    entry = bundle.entry('Hello', 'fr')
+    assert entry.text == 'Bonjour é'
+    assert entry.has_audio
+    assert not bundle.entry('Hello', 'en').has_audio
+    assert bundle.entry('Missing', 'en') is None
+
+    info, data = bundle.audio('Hello', 'fr')
+    assert bytes(data) == b'ID3 fake mp3 data'
+    assert info.size == len(data)
+    assert info.etag == hashlib.sha1(b'ID3 fake mp3 data').hexdigest()
+    assert bundle.audio('Hello', 'en') is None
+
+    assert stats['texts'] == 4
+    assert stats['audio'] == 1
+    # The two empty texts are stored once
+    assert stats['bytes'] == len('Hello') + len('Bonjour é'.encode('utf-8')) + len(b'ID3 fake mp3 data')
+
+
+def test_changed_after_rebuild(local_data):
+    build_bundle(local_data)
+    bundle = open_bundle(os.path.join(local_data, 'content.bundle'))
+    assert not bundle.changed()
+
+    write(os.path.join(local_data, 'sentences/Bye/text/fr.txt'), 'Au revoir')
+    build_bundle(local_data)
+    assert bundle.changed()
+    # The old mapping stays readable until it is replaced
+    assert bundle.text('Hello', 'fr') == 'Bonjour é'
+    assert open_bundle(bundle.path).text('Bye', 'fr') == 'Au revoir'
+
+
+def test_missing_or_unreadable_bundle(tmp_path):
+    path = str(tmp_path / 'content.bundle')
+    assert open_bundle(path) is None
+
+    write(path, b'not a bundle at all, just some bytes')
+    assert open_bundle(path) is None
@@ -0,0 +1,148 @@
+import pytest
+
+from translator.catalog_db import CatalogDB
+from translator.catalog_jobs import JobRunner
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = CatalogDB(str(tmp_path / 'catalog.sqlite3'))
+    db.replace_languages({'en': 'English', 'fr': 'French'})
+    db.add_sentence('Hello', ['en', 'fr'])
+    db.add_sentence('Bye', ['en', 'fr'])
+    db.set_translation('Hello', 'fr', 'Bonjour')
+    yield db
+    db.close()
+
+
+def sentence_ids(rows):
+    return [row[0] for row in rows]
+
+
+def test_full_language_without_since(db):
+    version, complete, rows, removed = db.language_entries('fr')
+    assert complete
+    assert rows == [('Hello', 'Bonjour', None, None), ('Bye', '', None, None)]
+    assert removed == []
+    assert version == db.language_version('fr')
+
+
+def test_since_returns_only_changes_after_that_version(db):
+    since = db.language_version('fr')
+    db.set_translation('Bye', 'fr', 'Au revoir')
+    db.set_audio('Hello', 'fr', 1234, 42)
+    # Other languages do not show up in this language's delta
+    db.set_translation('Hello', 'en', 'Hello')
+
+    version, complete, rows, removed = db.language_entries('fr', since)
+    assert not complete
+    assert version > since
+    assert rows == [('Hello', 'Bonjour', 1234, 42), ('Bye', 'Au revoir', None, None)]
+    assert removed == []
+
+    assert db.language_entries('fr', version)[2] == []
+
+
+def test_rewriting_the_same_text_is_not_a_change(db):
+    since = db.language_version('fr')
+    db.set_translation('Hello', 'fr', 'Bonjour')
+    assert db.language_version('fr') == since
+
+
+def test_deleted_sentences_are_listed_as_removed(db):
+    since = db.language_version('fr')
+    db.delete_sentence('Bye')
+    version, complete, rows, removed = db.language_entries('fr', since)
+    assert not complete
+    assert rows == []
+    assert removed == ['Bye']
+
+
+def test_since_older_than_the_change_log_gets_everything(db):
+    since = db.language_version('fr')
+    db.set_translation('Bye', 'fr', 'Salut')
+    db.set_translation('Hello', 'fr', 'Coucou')
+    db.trim_changes(keep=1)
+
+    version, complete, rows, removed = db.language_entries('fr', since)
+    assert complete
+    assert sentence_ids(rows) == ['Hello', 'Bye']
+    # A client ahead of the server (e.g. after a restore) is also sent everything
+    assert db.language_entries('fr', version + 100)[1]
+
+
+def test_on_commit_runs_after_commit_and_not_on_rollback(db):
+    called = []
+    with pytest.raises(RuntimeError):
+        with db.transaction():
+            db.on_commit(lambda: called.append('rolled back'))
+            raise RuntimeError
+    assert called == []
+
+    with db.transaction():
+        with db.transaction():
+            db.on_commit(lambda: called.append('committed'))
+        assert called == []
+    assert called == ['committed']
+
+    db.on_commit(lambda: called.append('now'))
+    assert called == ['committed', 'now']
+
+
+def test_interrupted_job_resumes_after_its_last_batch(db):
+    for index in range(5):
+        db.add_sentence(f"S{index}")
+    seen = []
+
+    def handler(params, cursor, limit):
+        ids = db.sentence_ids_after(cursor, limit)
+        seen.extend(ids)
+        return len(ids), (ids[-1] if len(ids) == limit else None)
+
+    first = JobRunner(db, batch_size=3)
+    first.register('walk', handler)
+    job_id = first.submit('walk', {}, total=len(db.sentence_ids()))
+
+    # Stop the first runner after one batch, as if the server shut down
+    def stop_after_one_batch(params, cursor, limit):
+        result = handler(params, cursor, limit)
+        first._stop.set()
+        return result
+
+    first.register('walk', stop_after_one_batch)
+    first.run(db.claim_job(first.owner, first.lease_seconds))
+    job = db.job(job_id)
+    assert job['state'] == 'pending'
+    assert job['done'] == 3
+
+    second = JobRunner(db, batch_size=3)
+    second.register('walk', handler)
+    assert second.run_pending() == 1
+
+    job = db.job(job_id)
+    assert job['state'] == 'done'
+    assert job['done'] == job['total'] == 7
+    assert job['attempts'] == 2
+    assert sorted(seen) == sorted(db.sentence_ids())
+
+
+def test_failed_job_can_be_retried_from_its_cursor(db):
+    calls = []
+
+    def flaky(params, cursor, limit):
+        calls.append(cursor)
+        if len(calls) == 2:
+            raise OSError('disk full')
+        return 1, None if cursor == 'b' else ('a' if cursor is None else 'b')
+
+    runner = JobRunner(db, batch_size=1)
+    runner.register('flaky', flaky)
+    job_id = runner.submit('flaky', {})
+    runner.run_pending()
+    assert db.job(job_id)['state'] == 'failed'
+    assert db.job(job_id)['error'] == 'disk full'
+
+    assert db.retry_job(job_id)
+    runner.run_pending()
+    assert db.job(job_id)['state'] == 'done'
+    assert calls == [None, 'a', 'a', 'b']
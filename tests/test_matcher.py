@@ -0,0 +1,45 @@
+from translator.matcher import PhraseMatcher, longest_match, tokenize
+
+
+PHRASES = {
+    "hello": "Hello",
+    "hello world": "Hello_world",
+    "how are you": "How_are_you",
+    "are you": "Are_you",
+    "thank you": "Thank_you",
+}
+
+
+def test_tokenize_lowercases_and_drops_punctuation():
+    assert tokenize("Hello, World! It's me") == ["hello", "world", "it's", "me"]
+
+
+def test_finds_every_phrase_including_overlaps():
+    matcher = PhraseMatcher(PHRASES)
+    matches = matcher.find_all("hello world how are you")
+    assert [(m.start, m.end, m.key) for m in matches] == [
+        (0, 1, "Hello"),
+        (0, 2, "Hello_world"),
+        (2, 5, "How_are_you"),
+        (3, 5, "Are_you"),
+    ]
+
+
+def test_failure_links_recover_after_a_partial_match():
+    matcher = PhraseMatcher(PHRASES)
+    # "how are" is a dead end for "how are you" but must still find "thank you"
+    assert [m.key for m in matcher.find_all("how are thank you")] == ["Thank_you"]
+
+
+def test_longest_prefers_length_then_earliest():
+    matcher = PhraseMatcher(PHRASES)
+    assert matcher.longest("hello world how are you").key == "How_are_you"
+    assert matcher.longest("thank you hello world").key == "Thank_you"
+    assert longest_match([]) is None
+
+
+def test_no_match_and_empty_phrases():
+    matcher = PhraseMatcher({"": "Empty", "goodbye": "Goodbye"})
+    assert len(matcher) == 1
+    assert matcher.find_all("hello there") == []
+    assert matcher.find_all("") == []
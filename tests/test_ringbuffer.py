@@ -0,0 +1,42 @@
+from translator.ringbuffer import RingBuffer
+
+
+def test_capacity_is_rounded_up_to_whole_chunks():
+    assert RingBuffer(10, 4).capacity == 12
+
+
+def test_chunks_come_out_in_order_across_the_wrap():
+    buffer = RingBuffer(12, 4)
+    assert buffer.write(b'abcdefgh') == 8
+    assert [bytes(chunk) for chunk in buffer.chunks()] == [b'abcd', b'efgh']
+
+    # The write starts at offset 8 and wraps around the end of the buffer
+    assert buffer.write(b'ijklmnop') == 8
+    assert buffer.fill == 8
+    assert [bytes(chunk) for chunk in buffer.chunks()] == [b'ijkl', b'mnop']
+    assert buffer.fill == 0
+
+
+def test_partial_chunk_waits_for_more_data():
+    buffer = RingBuffer(8, 4)
+    buffer.write(b'abc')
+    assert list(buffer.chunks()) == []
+    buffer.write(b'd')
+    assert [bytes(chunk) for chunk in buffer.chunks()] == [b'abcd']
+
+
+def test_overflow_is_dropped_and_counted():
+    buffer = RingBuffer(8, 4)
+    assert buffer.write(b'0123456789') == 8
+    assert buffer.dropped == 2
+    assert buffer.fill_ratio == 1.0
+    assert [bytes(chunk) for chunk in buffer.chunks()] == [b'0123', b'4567']
+
+
+def test_flush_returns_the_wrapped_tail():
+    buffer = RingBuffer(8, 4)
+    buffer.write(b'abcdef')
+    list(buffer.chunks())
+    buffer.write(b'ghij')
+    assert buffer.flush() == b'efghij'
+    assert buffer.fill == 0
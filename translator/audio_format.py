@@ -0,0 +1,169 @@
+import math
+import numpy as np
+
+# Encodings a client may declare, with their bytes per sample
+ENCODINGS = {
+    'int16': 2,
+    'float32': 4,
+    'mulaw': 1
+}
+
+MIN_SAMPLE_RATE = 8000
+MAX_SAMPLE_RATE = 96000
+
+
+def _mulaw_table():
+    """G.711 mu-law byte -> int16 sample"""
+    codes = ~np.arange(256, dtype=np.int32) & 0xFF
+    exponent = (codes >> 4) & 0x07
+    mantissa = codes & 0x0F
+    magnitude = (((mantissa << 3) + 0x84) << exponent) - 0x84
+    return np.where(codes & 0x80, -magnitude, magnitude).astype(np.int16)
+
+
+MULAW_TABLE = _mulaw_table()
+
+
+def mulaw_encode(samples):
+    """Encode int16 samples as G.711 mu-law bytes"""
+    samples = np.asarray(samples, dtype=np.int32)
+    sign = np.where(samples < 0, 0x80, 0)
+    magnitude = np.minimum(np.abs(samples), 32635) + 0x84
+    exponent = np.floor(np.log2(magnitude)).astype(np.int32) - 7
+    mantissa = (magnitude >> (exponent + 3)) & 0x0F
+    return (~(sign | (exponent << 4) | mantissa) & 0xFF).astype(np.uint8).tobytes()
+
+
+def decode_samples(data, encoding):
+    """Decode raw little-endian samples to float32 in [-1, 1]"""
+    if encoding == 'int16':
+        return np.frombuffer(data, dtype='<i2').astype(np.float32) / 32768.0
+    if encoding == 'float32':
+        return np.clip(np.frombuffer(data, dtype='<f4'), -1.0, 1.0)
+    if encoding == 'mulaw':
+        return MULAW_TABLE[np.frombuffer(data, dtype=np.uint8)].astype(np.float32) / 32768.0
+    raise ValueError(f"Unsupported encoding: {encoding}")
+
+
+def to_int16(samples):
+    """float32 samples in [-1, 1] -> little-endian int16 PCM bytes"""
+    return np.clip(np.round(samples * 32767.0), -32768, 32767).astype('<i2').tobytes()
+
+
+class StreamResampler:
+    """Polyphase FIR resampler that keeps filter state across chunks
+
+    The rate ratio is reduced to up/down; a Kaiser-windowed sinc low-pass is
+    split into `up` phases of `taps` coefficients, so each output sample costs
+    one dot product of length taps regardless of the ratio.
+    """
+
+    def __init__(self, input_rate, output_rate, taps=16, beta=8.0):
+        divisor = math.gcd(input_rate, output_rate)
+        self.up = output_rate // divisor
+        self.down = input_rate // divisor
+        self.taps = taps
+
+        length = taps * self.up
+        cutoff = 0.5 / max(self.up, self.down)
+        n = np.arange(length) - (length - 1) / 2.0
+        h = 2 * cutoff * np.sinc(2 * cutoff * n) * np.kaiser(length, beta) * self.up
+        # phases[p, k] weights input sample j0 - k for output phase p
+        self.phases = h.reshape(taps, self.up).T.astype(np.float32)
+        self._offsets = np.arange(taps)
+
+        self._history = np.zeros(taps - 1, dtype=np.float32)
+        # Upsampled-domain time of the next output, relative to the start of history
+        self._time = (taps - 1) * self.up
+
+    def process(self, samples):
+        buffer = np.concatenate((self._history, samples))
+        times = np.arange(self._time, len(buffer) * self.up, self.down)
+
+        if len(times):
+            positions = times // self.up
+            indices = positions[:, None] - self._offsets
+            output = np.einsum('ij,ij->i', buffer[indices], self.phases[times % self.up])
+            self._time = int(times[-1]) + self.down
+        else:
+            output = np.zeros(0, dtype=np.float32)
+
+        keep = self.taps - 1
+        self._time -= (len(buffer) - keep) * self.up
+        self._history = buffer[len(buffer) - keep:]
+        return output
+
+    def reset(self):
+        self._history[:] = 0
+        self._time = (self.taps - 1) * self.up
+
+
+class AudioFormat:
+    """Sample format declared by a client for its audio_stream messages"""
+
+    def __init__(self, encoding='int16', sample_rate=16000):
+        if encoding not in ENCODINGS:
+            raise ValueError(f"Unsupported encoding: {encoding}")
+        if not MIN_SAMPLE_RATE <= sample_rate <= MAX_SAMPLE_RATE:
+            raise ValueError(f"Unsupported sample rate: {sample_rate}")
+        self.encoding = encoding
+        self.sample_rate = sample_rate
+
+    @classmethod
+    def from_dict(cls, data):
+        """Parse {'encoding': ..., 'sample_rate': ...} as sent by a client"""
+        data = data or {}
+        try:
+            sample_rate = int(data.get('sample_rate', 16000))
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid sample rate: {data.get('sample_rate')}")
+        return cls(data.get('encoding', 'int16'), sample_rate)
+
+    @property
+    def sample_width(self):
+        return ENCODINGS[self.encoding]
+
+    def __repr__(self):
+        return f"{self.encoding}@{self.sample_rate}"
+
+
+class SampleConverter:
+    """Converts a client's audio stream to int16 PCM at the recognizer's rate
+
+    Bytes that do not make up a whole sample are carried over to the next
+    message, and the resampler keeps its filter history, so arbitrarily
+    split messages convert to the same stream.
+    """
+
+    def __init__(self, audio_format, target_rate=16000):
+        self.format = audio_format
+        self.target_rate = target_rate
+        self._remainder = b''
+        self._resampler = None
+        if audio_format.sample_rate != target_rate:
+            self._resampler = StreamResampler(audio_format.sample_rate, target_rate)
+        self.input_bytes = 0
+        self.output_bytes = 0
+
+    @property
+    def passthrough(self):
+        return self.format.encoding == 'int16' and self._resampler is None
+
+    def convert(self, data):
+        self.input_bytes += len(data)
+        if self.passthrough:
+            self.output_bytes += len(data)
+            return data
+
+        if self._remainder:
+            data = self._remainder + bytes(data)
+        usable = len(data) - len(data) % self.format.sample_width
+        self._remainder = bytes(data[usable:])
+
+        samples = decode_samples(data[:usable], self.format.encoding)
+        if self._resampler is not None:
+            samples = self._resampler.process(samples)
+
+        pcm = to_int16(samples)
+        self.output_bytes += len(pcm)
+        return pcm
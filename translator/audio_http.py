@@ -0,0 +1,166 @@
+import os
+import stat
+import time
+import hashlib
+import threading
+from flask import request, Response
+from werkzeug.wsgi import wrap_file
+
+# Versioned URLs never change content, so browsers may keep them for a year
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+# Bytes per chunk when sending audio held in memory
+MEMORY_CHUNK = 65536
+
+
+def audio_version(mtime_ns):
+    """URL version token for an audio file; changes whenever the file does"""
+    return format(mtime_ns, 'x')
+
+
+class AudioFileInfo:
+    """Cached stat and content hash of one audio file"""
+
+    __slots__ = ('mtime_ns', 'size', 'etag', 'checked_at')
+
+    def __init__(self, mtime_ns, size, etag, checked_at):
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.etag = etag
+        self.checked_at = checked_at
+
+    @property
+    def version(self):
+        return audio_version(self.mtime_ns)
+
+
+class AudioFileCache:
+    """Stat cache for served audio files, with strong ETags from their content hash
+
+    Files are re-stat'ed at most once per ttl seconds and rehashed only when
+    their size or mtime changes.
+    """
+
+    def __init__(self, ttl=5.0):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        """Info for path, or None if it is not a regular file"""
+        now = time.monotonic()
+        info = self._entries.get(path)
+        if info is not None and now - info.checked_at < self.ttl:
+            return info
+
+        try:
+            st = os.stat(path)
+        except OSError:
+            st = None
+        if st is None or not stat.S_ISREG(st.st_mode):
+            with self._lock:
+                self._entries.pop(path, None)
+            return None
+
+        if info is not None and info.mtime_ns == st.st_mtime_ns and info.size == st.st_size:
+            info.checked_at = now
+            return info
+
+        digest = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(65536), b''):
+                digest.update(block)
+
+        info = AudioFileInfo(st.st_mtime_ns, st.st_size, digest.hexdigest(), now)
+        with self._lock:
+            self._entries[path] = info
+        return info
+
+    def invalidate(self, path=None):
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(path, None)
+
+
+class MemoryFile:
+    """Seekable file-like view of a buffer (e.g. a memory-mapped bundle slice)
+
+    Lets Werkzeug answer Range requests for in-memory audio by seeking. WSGI
+    servers only accept bytes, so each read copies just the chunk being sent.
+    """
+
+    def __init__(self, buffer, chunk_size=MEMORY_CHUNK):
+        self._view = memoryview(buffer)
+        self._position = 0
+        self.chunk_size = chunk_size
+
+    def read(self, size=-1):
+        end = len(self._view) if size is None or size < 0 else min(len(self._view), self._position + size)
+        chunk = bytes(self._view[self._position:end])
+        self._position = max(self._position, end)
+        return chunk
+
+    def seekable(self):
+        return True
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        base = {os.SEEK_SET: 0, os.SEEK_CUR: self._position, os.SEEK_END: len(self._view)}[whence]
+        self._position = max(0, base + offset)
+        return self._position
+
+    def tell(self):
+        return self._position
+
+    # Iterates over itself, so the range wrapper's seek moves the iteration too
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        chunk = self.read(self.chunk_size)
+        if not chunk:
+            raise StopIteration()
+        return chunk
+
+    def close(self):
+        self._view.release()
+
+
+def send_audio(path, info, accel_path=None, body=None):
+    """Serve an audio file with ETag/Last-Modified validation, Range support and cache headers
+
+    Requests carrying the file's current version (?v=...) are marked immutable;
+    anything else must revalidate, which costs a 304 once the browser has the file.
+    If accel_path is given, the body is left to nginx via X-Accel-Redirect. If
+    body is given (e.g. a slice of a memory-mapped bundle), it is sent instead
+    of the file at path.
+    """
+    if request.args.get('v') == info.version:
+        cache_control = f"public, max-age={IMMUTABLE_MAX_AGE}, immutable"
+    else:
+        cache_control = "no-cache"
+
+    # Answer revalidation from the cache without touching the file
+    if request.if_none_match.contains(info.etag):
+        rv = Response(status=304)
+        rv.set_etag(info.etag)
+        rv.headers['Cache-Control'] = cache_control
+        return rv
+
+    if accel_path:
+        rv = Response(mimetype='audio/mpeg')
+        rv.headers['X-Accel-Redirect'] = accel_path
+    elif body is not None:
+        rv = Response(MemoryFile(body), mimetype='audio/mpeg', direct_passthrough=True)
+        rv.content_length = info.size
+    else:
+        rv = Response(wrap_file(request.environ, open(path, 'rb')), mimetype='audio/mpeg', direct_passthrough=True)
+        rv.content_length = info.size
+
+    rv.set_etag(info.etag)
+    rv.last_modified = info.mtime_ns // 1_000_000_000
+    rv.headers['Cache-Control'] = cache_control
+    if accel_path:
+        return rv
+    return rv.make_conditional(request.environ, accept_ranges=True, complete_length=info.size)
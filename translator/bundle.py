@@ -0,0 +1,284 @@
+import os
+import json
+import mmap
+import time
+import struct
+import hashlib
+import logging
+from eventlet import patcher
+from translator.content import ContentEntry, start_poller
+from translator.audio_http import AudioFileInfo
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# The lock is shared with the native polling thread, so it must not be a green one
+_threading = patcher.original('threading')
+
+BUNDLE_NAME = 'content.bundle'
+BUNDLE_VERSION = 1
+
+# Magic, then the offset and length of the JSON index written after the data
+MAGIC = b'STBUNDL1'
+HEADER = struct.Struct('<8sQQ')
+
+
+class BundleError(Exception):
+    """The file is not a readable content bundle"""
+
+
+def _read_json(path, default):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+
+
+def _files(directory, suffix):
+    """language -> DirEntry for the files in directory ending in suffix"""
+    try:
+        with os.scandir(directory) as entries:
+            return {entry.name[:-len(suffix)]: entry for entry in entries
+                    if entry.name.endswith(suffix) and entry.is_file()}
+    except FileNotFoundError:
+        return {}
+
+
+def build_bundle(local_data_dir, path=None):
+    """Pack local_data's languages, sentence list, texts and MP3s into one bundle file
+
+    Data is written first and the index last, to a temporary file renamed over
+    path, so a running reader keeps its mapping of the previous bundle.
+    Identical files (e.g. the many empty texts) are stored once. Returns
+    counts of what was packed.
+    """
+    started = time.time()
+    path = path or os.path.join(local_data_dir, BUNDLE_NAME)
+    sentences_dir = os.path.join(local_data_dir, 'sentences')
+    languages = _read_json(os.path.join(local_data_dir, 'languages.json'), {})
+    sentences = list(dict.fromkeys(_read_json(os.path.join(local_data_dir, 'index_path.json'), {})
+                                   .get('sentences', [])))
+
+    entries = {}
+    blobs = {}
+    stats = {'sentences': len(sentences), 'languages': len(languages), 'texts': 0, 'audio': 0, 'bytes': 0}
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as out:
+            out.write(HEADER.pack(MAGIC, 0, 0))
+
+            def add_blob(entry):
+                with open(entry.path, 'rb') as f:
+                    data = f.read()
+                digest = hashlib.sha1(data).hexdigest()
+                if digest not in blobs:
+                    blobs[digest] = out.tell()
+                    out.write(data)
+                    stats['bytes'] += len(data)
+                return [blobs[digest], len(data), entry.stat().st_mtime_ns, digest]
+
+            for sentence_id in sentences:
+                texts = _files(os.path.join(sentences_dir, sentence_id, 'text'), '.txt')
+                audio = _files(os.path.join(sentences_dir, sentence_id, 'audio'), '.mp3')
+                sentence_entries = {}
+                for language in languages:
+                    text = add_blob(texts[language]) if language in texts else None
+                    sound = add_blob(audio[language]) if language in audio else None
+                    if text or sound:
+                        sentence_entries[language] = {'text': text, 'audio': sound}
+                        stats['texts'] += text is not None
+                        stats['audio'] += sound is not None
+                entries[sentence_id] = sentence_entries
+
+            index = json.dumps({
+                'version': BUNDLE_VERSION,
+                'built_at': started,
+                'languages': languages,
+                'sentences': sentences,
+                'entries': entries
+            }, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+            index_offset = out.tell()
+            out.write(index)
+            out.seek(0)
+            out.write(HEADER.pack(MAGIC, index_offset, len(index)))
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    stats['size'] = os.path.getsize(path)
+    logger.info(f"Built {path}: {stats['texts']} texts and {stats['audio']} audio files for "
+                f"{stats['sentences']} sentences ({stats['size']} bytes) in {time.time() - started:.2f}s")
+    return stats
+
+
+class ContentBundle:
+    """Read-only, memory-mapped view of a bundle built by build_bundle()
+
+    Audio is returned as memoryview slices of the mapping, which are only
+    copied a chunk at a time as they are sent; the OS page cache holds the
+    data once for every process mapping the file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            st = os.fstat(f.fileno())
+            if st.st_size < HEADER.size:
+                raise BundleError(f"{path} is too short to be a content bundle")
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.identity = (st.st_ino, st.st_mtime_ns, st.st_size)
+
+        magic, index_offset, index_length = HEADER.unpack_from(self._map)
+        if magic != MAGIC or index_offset + index_length > len(self._map):
+            raise BundleError(f"{path} is not a content bundle")
+        index = json.loads(self._map[index_offset:index_offset + index_length])
+        if index.get('version') != BUNDLE_VERSION:
+            raise BundleError(f"{path} has unsupported bundle version {index.get('version')}")
+
+        self.built_at = index['built_at']
+        self.languages = index['languages']
+        self.sentences = index['sentences']
+        self._entries = index['entries']
+        self._view = memoryview(self._map)
+
+    def _slot(self, sentence, language, kind):
+        entry = self._entries.get(sentence, {}).get(language)
+        return entry[kind] if entry else None
+
+    def entry(self, sentence, language):
+        """ContentEntry for a pair, or None if the bundle has neither text nor audio for it"""
+        entry = self._entries.get(sentence, {}).get(language)
+        if entry is None:
+            return None
+        text = entry['text']
+        audio = entry['audio']
+        return ContentEntry(
+            str(self._view[text[0]:text[0] + text[1]], 'utf-8') if text else None,
+            text[2] if text else None,
+            audio[2] if audio else None
+        )
+
+    def text(self, sentence, language):
+        slot = self._slot(sentence, language, 'text')
+        return str(self._view[slot[0]:slot[0] + slot[1]], 'utf-8') if slot else None
+
+    def audio(self, sentence, language):
+        """(AudioFileInfo, memoryview of the MP3 bytes) for a pair, or None"""
+        slot = self._slot(sentence, language, 'audio')
+        if slot is None:
+            return None
+        offset, size, mtime_ns, digest = slot
+        return AudioFileInfo(mtime_ns, size, digest, 0.0), self._view[offset:offset + size]
+
+    def changed(self):
+        """Whether the file at path was replaced or removed since it was mapped"""
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return True
+        return (st.st_ino, st.st_mtime_ns, st.st_size) != self.identity
+
+
+def open_bundle(path):
+    """Map the bundle at path, or return None if there is none or it cannot be read"""
+    try:
+        return ContentBundle(path)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError, BundleError) as e:
+        logger.error(f"Ignoring unreadable content bundle {path}: {e}")
+        return None
+
+
+class BundledContentStore:
+    """Content served from a packed bundle, falling back to a directory ContentStore
+
+    Pairs invalidated after the bundle was built (e.g. by admin edits) are
+    served from the directory store until a newer bundle is built. Without a
+    bundle file everything comes from the directory store, as in development.
+    refresh() maps a rebuilt bundle in place of the old one.
+    """
+
+    def __init__(self, path, fallback):
+        self.path = path
+        self.fallback = fallback
+        self.bundle = None
+        # (sentence or None, language or None) -> time the pairs it matches were changed
+        self._changed = {}
+        self._lock = _threading.Lock()
+        self.hits = 0
+
+    def _open(self):
+        bundle = open_bundle(self.path)
+        with self._lock:
+            self.bundle = bundle
+            if bundle is not None:
+                self._changed = {key: at for key, at in self._changed.items() if at >= bundle.built_at}
+        return bundle
+
+    def load_all(self):
+        bundle = self._open()
+        if bundle is None:
+            logger.info(f"No content bundle at {self.path}, serving content from the sentence directories")
+            self.fallback.load_all()
+        else:
+            logger.info(f"Serving content from bundle {self.path} "
+                        f"({len(bundle.sentences)} sentences, {len(bundle.languages)} languages)")
+
+    def _bundled(self, sentence, language):
+        """The current bundle if it is authoritative for the pair, else None"""
+        bundle = self.bundle
+        if bundle is None or not self._changed:
+            return bundle
+        changed = self._changed
+        if ((sentence, language) in changed or (sentence, None) in changed
+                or (None, language) in changed or (None, None) in changed):
+            return None
+        return bundle
+
+    def get(self, sentence, language):
+        bundle = self._bundled(sentence, language)
+        entry = bundle.entry(sentence, language) if bundle is not None else None
+        if entry is None:
+            return self.fallback.get(sentence, language)
+        self.hits += 1
+        return entry
+
+    def text(self, sentence, language):
+        return self.get(sentence, language).text
+
+    def has_audio(self, sentence, language):
+        return self.get(sentence, language).has_audio
+
+    def audio(self, sentence, language):
+        """(AudioFileInfo, memoryview) from the bundle, or None to serve the audio file"""
+        bundle = self._bundled(sentence, language)
+        return bundle.audio(sentence, language) if bundle is not None else None
+
+    def invalidate(self, sentence=None, language=None):
+        """Serve matching pairs from their files until the bundle is rebuilt"""
+        with self._lock:
+            self._changed[(sentence, language)] = time.time()
+        return self.fallback.invalidate(sentence, language)
+
+    def refresh(self):
+        """Map the bundle again if it was rebuilt; without one, refresh the directory store"""
+        if self.bundle is None or self.bundle.changed():
+            if self._open() is not None:
+                logger.info(f"Reloaded content bundle {self.path}")
+                return 1
+        if self.bundle is None:
+            return self.fallback.refresh()
+        return 0
+
+    def start_polling(self, interval):
+        """Run refresh() every interval seconds on a native daemon thread"""
+        return start_poller(self.refresh, interval, 'content-bundle-poll')
+
+    def stats(self):
+        return dict(self.fallback.stats(), bundle=self.bundle is not None, bundle_hits=self.hits)
@@ -0,0 +1,107 @@
+import os
+import json
+import time
+import struct
+import logging
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+MAGIC = b'VCAP1\n'
+
+# Record types: raw audio_stream message, declared sample format, emitted result
+AUDIO = b'A'
+FORMAT = b'F'
+RESULT = b'R'
+
+# type, seconds since the capture started, payload length
+_RECORD = struct.Struct('<cdI')
+
+
+class SessionCapture:
+    """Append-only recording of one session's incoming audio with arrival times
+
+    Records are buffered in memory and appended to the file in batches of at
+    least flush_bytes, so capturing costs one write per batch rather than per
+    audio message. Results emitted to the client are recorded too, so a replay
+    can be compared against what the user actually saw.
+    """
+
+    def __init__(self, path, header, flush_bytes=256 * 1024):
+        self.path = path
+        self.flush_bytes = flush_bytes
+        self.started = time.monotonic()
+        self.bytes_written = 0
+        self._pending = bytearray()
+        self._file = open(path, 'ab')
+        header = dict(header, started_at=time.time())
+        self._file.write(MAGIC + json.dumps(header).encode('utf-8') + b'\n')
+
+    def _append(self, kind, payload):
+        if self._file is None:
+            return
+        self._pending += _RECORD.pack(kind, time.monotonic() - self.started, len(payload))
+        self._pending += payload
+        if len(self._pending) >= self.flush_bytes:
+            self.flush()
+
+    def record_audio(self, data):
+        self._append(AUDIO, data)
+
+    def record_format(self, audio_format):
+        self._append(FORMAT, json.dumps({
+            'encoding': audio_format.encoding,
+            'sample_rate': audio_format.sample_rate
+        }).encode('utf-8'))
+
+    def record_result(self, result):
+        self._append(RESULT, json.dumps(result).encode('utf-8'))
+
+    def flush(self):
+        if self._file is None or not self._pending:
+            return
+        try:
+            self._file.write(self._pending)
+            self._file.flush()
+            self.bytes_written += len(self._pending)
+        except OSError as e:
+            logger.error(f"Stopping capture {self.path}: {e}")
+            self._file.close()
+            self._file = None
+        self._pending.clear()
+
+    def close(self):
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def capture_path(capture_dir, sid):
+    return os.path.join(capture_dir, f"{time.strftime('%Y%m%d-%H%M%S')}-{sid}.vcap")
+
+
+def read_capture(path):
+    """Return (header, records) where records are (type, seconds, payload) tuples
+
+    A truncated final record (e.g. after a crash) is ignored.
+    """
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"Not a capture file: {path}")
+        header = json.loads(f.readline())
+        data = f.read()
+
+    records = []
+    offset = 0
+    while offset + _RECORD.size <= len(data):
+        kind, seconds, length = _RECORD.unpack_from(data, offset)
+        offset += _RECORD.size
+        if offset + length > len(data):
+            break
+        payload = data[offset:offset + length]
+        offset += length
+        if kind != AUDIO:
+            payload = json.loads(payload)
+        records.append((kind, seconds, payload))
+    return header, records
@@ -0,0 +1,616 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS languages (
+    code TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    position INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sentences (
+    id TEXT PRIMARY KEY,
+    position INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sentences_position ON sentences(position);
+CREATE TABLE IF NOT EXISTS translations (
+    sentence_id TEXT NOT NULL REFERENCES sentences(id) ON DELETE CASCADE,
+    language TEXT NOT NULL REFERENCES languages(code) ON DELETE CASCADE,
+    text TEXT NOT NULL DEFAULT '',
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (sentence_id, language)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS translations_language ON translations(language);
+CREATE TABLE IF NOT EXISTS audio (
+    sentence_id TEXT NOT NULL REFERENCES sentences(id) ON DELETE CASCADE,
+    language TEXT NOT NULL REFERENCES languages(code) ON DELETE CASCADE,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (sentence_id, language)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS audio_language ON audio(language);
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    params TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    total INTEGER NOT NULL DEFAULT 0,
+    done INTEGER NOT NULL DEFAULT 0,
+    cursor TEXT,
+    owner TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs(state, id);
+CREATE TABLE IF NOT EXISTS changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    sentence_id TEXT NOT NULL,
+    language TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS changes_language ON changes(language, seq);
+CREATE TRIGGER IF NOT EXISTS translations_inserted AFTER INSERT ON translations BEGIN
+    INSERT INTO changes (sentence_id, language) VALUES (NEW.sentence_id, NEW.language);
+END;
+CREATE TRIGGER IF NOT EXISTS translations_updated AFTER UPDATE ON translations WHEN OLD.text IS NOT NEW.text BEGIN
+    INSERT INTO changes (sentence_id, language) VALUES (NEW.sentence_id, NEW.language);
+END;
+CREATE TRIGGER IF NOT EXISTS translations_deleted AFTER DELETE ON translations BEGIN
+    INSERT INTO changes (sentence_id, language) VALUES (OLD.sentence_id, OLD.language);
+END;
+CREATE TRIGGER IF NOT EXISTS audio_inserted AFTER INSERT ON audio BEGIN
+    INSERT INTO changes (sentence_id, language) VALUES (NEW.sentence_id, NEW.language);
+END;
+CREATE TRIGGER IF NOT EXISTS audio_deleted AFTER DELETE ON audio BEGIN
+    INSERT INTO changes (sentence_id, language) VALUES (OLD.sentence_id, OLD.language);
+END;
+"""
+
+# Change log entries kept for incremental catalog updates; clients further behind get everything
+CHANGE_LOG_LIMIT = 100000
+
+
+def file_digest(*paths):
+    """Hash of the given files' contents"""
+    digest = hashlib.sha1()
+    for path in paths:
+        try:
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+        except OSError:
+            digest.update(b'-')
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def catalog_digest(local_data_dir):
+    """Hash of the JSON index and the name, size and mtime of every sentence's texts and audio"""
+    index_file = os.path.join(local_data_dir, 'index_path.json')
+    digest = hashlib.sha1(file_digest(os.path.join(local_data_dir, 'languages.json'), index_file).encode('utf-8'))
+    sentences_dir = os.path.join(local_data_dir, 'sentences')
+    try:
+        sentences = _read_json(index_file, {}).get('sentences', [])
+    except ValueError:
+        sentences = []
+    for sentence_id in sentences:
+        for kind, suffix in (('text', '.txt'), ('audio', '.mp3')):
+            for name, entry in sorted(_scan(os.path.join(sentences_dir, sentence_id, kind), suffix)):
+                st = entry.stat()
+                digest.update(f"{sentence_id}/{kind}/{name}:{st.st_size}:{st.st_mtime_ns};".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def write_json_atomic(path, data):
+    """Write JSON to a temporary file and rename it over path, so readers never see a partial file"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class CatalogDB:
+    """SQLite store of sentences, languages, translation texts and audio metadata
+
+    Each thread gets its own connection; writes run in IMMEDIATE transactions
+    so concurrent admins serialize instead of overwriting each other. The
+    database runs in WAL mode, so readers are never blocked by a writer.
+    """
+
+    def __init__(self, path, timeout=10.0):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        self.connection.executescript(SCHEMA)
+        with self.transaction() as conn:
+            conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('schema_version', ?)",
+                         (str(SCHEMA_VERSION),))
+
+    @property
+    def connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+            self._local.depth = 0
+        return conn
+
+    @contextmanager
+    def snapshot(self):
+        """Read transaction, so several queries see one consistent state; joins an open transaction"""
+        conn = self.connection
+        if self._local.depth:
+            yield conn
+            return
+
+        conn.execute("BEGIN")
+        self._local.depth = 1
+        try:
+            yield conn
+        finally:
+            self._local.depth = 0
+            conn.execute("COMMIT")
+
+    @contextmanager
+    def transaction(self):
+        """Write transaction; nested uses join the outermost one"""
+        conn = self.connection
+        if self._local.depth:
+            self._local.depth += 1
+            try:
+                yield conn
+            finally:
+                self._local.depth -= 1
+            return
+
+        conn.execute("BEGIN IMMEDIATE")
+        self._local.depth = 1
+        callbacks = self._local.on_commit = []
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        else:
+            conn.execute("COMMIT")
+        finally:
+            self._local.depth = 0
+            self._local.on_commit = None
+        for callback in callbacks:
+            callback()
+
+    def on_commit(self, callback):
+        """Call callback once the current transaction commits, or now outside one"""
+        if getattr(self._local, 'on_commit', None) is not None:
+            self._local.on_commit.append(callback)
+        else:
+            callback()
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    # Metadata
+
+    def get_meta(self, key, default=None):
+        row = self.connection.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, key, value):
+        with self.transaction() as conn:
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    def is_empty(self):
+        conn = self.connection
+        return conn.execute("SELECT 1 FROM languages LIMIT 1").fetchone() is None \
+            and conn.execute("SELECT 1 FROM sentences LIMIT 1").fetchone() is None
+
+    # Languages
+
+    def languages(self):
+        """Language code -> display name, in catalog order"""
+        rows = self.connection.execute("SELECT code, name FROM languages ORDER BY position")
+        return dict(rows.fetchall())
+
+    def add_language(self, code, name):
+        """Add a language with an empty translation for every sentence lacking one
+
+        Returns the sentence ids that got an empty translation, or None if the
+        language already exists.
+        """
+        with self.transaction() as conn:
+            if conn.execute("SELECT 1 FROM languages WHERE code = ?", (code,)).fetchone():
+                return None
+            conn.execute("INSERT INTO languages (code, name, position) "
+                         "VALUES (?, ?, (SELECT COALESCE(MAX(position), -1) + 1 FROM languages))", (code, name))
+            missing = self.missing_translations(code)
+            conn.executemany("INSERT INTO translations (sentence_id, language, text, updated_at) VALUES (?, ?, '', ?)",
+                             [(sentence_id, code, time.time()) for sentence_id in missing])
+            return missing
+
+    def rename_language(self, code, name):
+        with self.transaction() as conn:
+            return conn.execute("UPDATE languages SET name = ? WHERE code = ?", (name, code)).rowcount > 0
+
+    def delete_language(self, code):
+        """Remove a language and, by cascade, its translations and audio records"""
+        with self.transaction() as conn:
+            return conn.execute("DELETE FROM languages WHERE code = ?", (code,)).rowcount > 0
+
+    def replace_languages(self, languages):
+        """Make the language table match a code -> name dict, keeping surviving rows' data"""
+        with self.transaction() as conn:
+            conn.executemany("DELETE FROM languages WHERE code = ?",
+                             [(code,) for code in self.languages() if code not in languages])
+            conn.executemany("INSERT INTO languages (code, name, position) VALUES (?, ?, ?) "
+                             "ON CONFLICT(code) DO UPDATE SET name = excluded.name, position = excluded.position",
+                             [(code, name, position) for position, (code, name) in enumerate(languages.items())])
+
+    # Sentences
+
+    def sentence_ids(self):
+        return [row[0] for row in self.connection.execute("SELECT id FROM sentences ORDER BY position")]
+
+    def has_sentence(self, sentence_id):
+        return self.connection.execute("SELECT 1 FROM sentences WHERE id = ?", (sentence_id,)).fetchone() is not None
+
+    def add_sentence(self, sentence_id, languages=()):
+        """Append a sentence with empty translations in languages; False if it already exists"""
+        with self.transaction() as conn:
+            if conn.execute("SELECT 1 FROM sentences WHERE id = ?", (sentence_id,)).fetchone():
+                return False
+            conn.execute("INSERT INTO sentences (id, position) "
+                         "VALUES (?, (SELECT COALESCE(MAX(position), -1) + 1 FROM sentences))", (sentence_id,))
+            conn.executemany("INSERT INTO translations (sentence_id, language, text, updated_at) VALUES (?, ?, '', ?)",
+                             [(sentence_id, language, time.time()) for language in languages])
+            return True
+
+    def sentence_ids_after(self, after=None, limit=100):
+        """Up to limit sentence ids greater than after, in id order, for resumable batch work"""
+        rows = self.connection.execute("SELECT id FROM sentences WHERE id > ? ORDER BY id LIMIT ?",
+                                       (after or '', limit))
+        return [row[0] for row in rows]
+
+    def delete_sentence(self, sentence_id):
+        with self.transaction() as conn:
+            return conn.execute("DELETE FROM sentences WHERE id = ?", (sentence_id,)).rowcount > 0
+
+    def replace_sentences(self, sentences):
+        """Make the sentence table match an ordered list of ids, keeping surviving rows' data"""
+        with self.transaction() as conn:
+            wanted = set(sentences)
+            conn.executemany("DELETE FROM sentences WHERE id = ?",
+                             [(sentence_id,) for sentence_id in self.sentence_ids() if sentence_id not in wanted])
+            conn.executemany("INSERT INTO sentences (id, position) VALUES (?, ?) "
+                             "ON CONFLICT(id) DO UPDATE SET position = excluded.position",
+                             [(sentence_id, position) for position, sentence_id in enumerate(sentences)])
+
+    # Translations and audio
+
+    def set_translation(self, sentence_id, language, text):
+        """Insert or change a translation; rewriting the same text is not recorded as a change"""
+        with self.transaction() as conn:
+            conn.execute("INSERT INTO translations (sentence_id, language, text, updated_at) VALUES (?, ?, ?, ?) "
+                         "ON CONFLICT(sentence_id, language) DO UPDATE SET "
+                         "text = excluded.text, updated_at = excluded.updated_at WHERE text IS NOT excluded.text",
+                         (sentence_id, language, text, time.time()))
+
+    def set_audio(self, sentence_id, language, size, mtime_ns):
+        with self.transaction() as conn:
+            conn.execute("INSERT OR REPLACE INTO audio (sentence_id, language, size, mtime_ns, updated_at) "
+                         "VALUES (?, ?, ?, ?, ?)", (sentence_id, language, size, mtime_ns, time.time()))
+
+    def missing_translations(self, language):
+        """Sentence ids with no translation row for language"""
+        rows = self.connection.execute(
+            "SELECT id FROM sentences WHERE id NOT IN "
+            "(SELECT sentence_id FROM translations WHERE language = ?) ORDER BY position", (language,))
+        return [row[0] for row in rows]
+
+    def translations(self, sentence_id):
+        """Language -> {'text', 'has_audio'} for every language, or None for an unknown sentence"""
+        if not self.has_sentence(sentence_id):
+            return None
+        rows = self.connection.execute(
+            "SELECT l.code, t.text, a.sentence_id IS NOT NULL FROM languages l "
+            "LEFT JOIN translations t ON t.sentence_id = ? AND t.language = l.code "
+            "LEFT JOIN audio a ON a.sentence_id = ? AND a.language = l.code "
+            "ORDER BY l.position", (sentence_id, sentence_id))
+        return {code: {'text': text or "", 'has_audio': bool(has_audio)} for code, text, has_audio in rows}
+
+    def texts(self, language):
+        """(sentence id, text) for every sentence with a translation in language, in catalog order"""
+        rows = self.connection.execute(
+            "SELECT s.id, t.text FROM translations t JOIN sentences s ON s.id = t.sentence_id "
+            "WHERE t.language = ? ORDER BY s.position", (language,))
+        return rows.fetchall()
+
+    def sentence_page(self, offset=0, limit=None, language=None, missing_audio=False, empty_text=False):
+        """One page of sentences with their translations, as (total matching, sentences)
+
+        language restricts both the filters and the returned translations to
+        one language; otherwise missing_audio/empty_text match sentences
+        lacking audio or text in any language. Runs two queries however many
+        sentences and languages there are.
+        """
+        conditions = []
+        if missing_audio:
+            conditions.append(
+                "EXISTS (SELECT 1 FROM languages l WHERE (:language IS NULL OR l.code = :language) "
+                "AND NOT EXISTS (SELECT 1 FROM audio a WHERE a.sentence_id = s.id AND a.language = l.code))")
+        if empty_text:
+            conditions.append(
+                "EXISTS (SELECT 1 FROM languages l WHERE (:language IS NULL OR l.code = :language) "
+                "AND NOT EXISTS (SELECT 1 FROM translations t WHERE t.sentence_id = s.id "
+                "AND t.language = l.code AND trim(t.text) != ''))")
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        params = {
+            'language': language,
+            'offset': offset,
+            'limit': -1 if limit is None else limit
+        }
+
+        conn = self.connection
+        total = conn.execute(f"SELECT COUNT(*) FROM sentences s {where}", params).fetchone()[0]
+        rows = conn.execute(
+            f"WITH page AS (SELECT s.id, s.position FROM sentences s {where} "
+            "ORDER BY s.position LIMIT :limit OFFSET :offset) "
+            "SELECT page.id, l.code, t.text, a.sentence_id IS NOT NULL FROM page "
+            "LEFT JOIN languages l ON :language IS NULL OR l.code = :language "
+            "LEFT JOIN translations t ON t.sentence_id = page.id AND t.language = l.code "
+            "LEFT JOIN audio a ON a.sentence_id = page.id AND a.language = l.code "
+            "ORDER BY page.position, l.position", params)
+
+        sentences = {}
+        for sentence_id, code, text, has_audio in rows:
+            sentence = sentences.setdefault(sentence_id, {'id': sentence_id, 'translations': {}})
+            if code is not None:
+                sentence['translations'][code] = {'text': text or "", 'has_audio': bool(has_audio)}
+        return total, list(sentences.values())
+
+    # Versions and incremental changes
+
+    def _last_change(self):
+        row = self.connection.execute("SELECT seq FROM sqlite_sequence WHERE name = 'changes'").fetchone()
+        return row[0] if row else 0
+
+    def language_version(self, language):
+        """Catalog version of a language: the last change to its texts or audio
+
+        Never decreases; entries trimmed from the change log are covered by
+        the 'changes_floor' version.
+        """
+        floor = int(self.get_meta('changes_floor', 0))
+        row = self.connection.execute("SELECT MAX(seq) FROM changes WHERE language = ?", (language,)).fetchone()
+        return max(floor, row[0] or 0)
+
+    def language_entries(self, language, since=None):
+        """Sentences of a language, or only those changed after version since
+
+        Returns (version, complete, rows, removed): rows are (sentence id, text,
+        audio size or None, audio mtime_ns or None) in catalog order, removed
+        the changed sentences no longer in the language. complete is True when
+        rows are the whole language, i.e. since was None or older than the
+        change log reaches back.
+        """
+        with self.snapshot() as conn:
+            version = self.language_version(language)
+            complete = since is None or since < int(self.get_meta('changes_floor', 0)) or since > version
+            query = ("SELECT t.sentence_id, t.text, a.size, a.mtime_ns FROM translations t "
+                     "JOIN sentences s ON s.id = t.sentence_id "
+                     "LEFT JOIN audio a ON a.sentence_id = t.sentence_id AND a.language = t.language "
+                     "WHERE t.language = :language")
+            if complete:
+                rows = conn.execute(query + " ORDER BY s.position", {'language': language}).fetchall()
+                return version, True, rows, []
+
+            changed = [row[0] for row in conn.execute(
+                "SELECT DISTINCT sentence_id FROM changes WHERE language = ? AND seq > ?", (language, since))]
+            rows = conn.execute(
+                query + " AND t.sentence_id IN (SELECT sentence_id FROM changes WHERE language = :language "
+                "AND seq > :since) ORDER BY s.position", {'language': language, 'since': since}).fetchall()
+            present = {row[0] for row in rows}
+            return version, False, rows, [sentence_id for sentence_id in changed if sentence_id not in present]
+
+    def trim_changes(self, keep=CHANGE_LOG_LIMIT):
+        """Drop all but the last keep change log entries, raising the floor version to match"""
+        with self.transaction() as conn:
+            cutoff = self._last_change() - keep
+            if conn.execute("SELECT 1 FROM changes WHERE seq <= ? LIMIT 1", (cutoff,)).fetchone():
+                conn.execute("DELETE FROM changes WHERE seq <= ?", (cutoff,))
+                self.set_meta('changes_floor', cutoff)
+
+    # Background jobs
+
+    def add_job(self, kind, params, total=0):
+        """Queue a job and return its id"""
+        now = time.time()
+        with self.transaction() as conn:
+            return conn.execute("INSERT INTO jobs (kind, params, total, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                                (kind, json.dumps(params), total, now, now)).lastrowid
+
+    def job(self, job_id):
+        rows = self.connection.execute(f"SELECT {_JOB_COLUMNS} FROM jobs WHERE id = ?", (job_id,))
+        row = rows.fetchone()
+        return _job_dict(row) if row else None
+
+    def jobs(self, limit=50):
+        """The most recent jobs, newest first"""
+        rows = self.connection.execute(f"SELECT {_JOB_COLUMNS} FROM jobs ORDER BY id DESC LIMIT ?", (limit,))
+        return [_job_dict(row) for row in rows]
+
+    def claim_job(self, owner, lease_seconds):
+        """Take the oldest unfinished job for owner, or None
+
+        Jobs run one at a time, in order: nothing is claimed while the oldest
+        one is running under a live lease. A running job whose owner stopped
+        checkpointing for lease_seconds (e.g. the process died) is taken over
+        and resumes from its last cursor.
+        """
+        now = time.time()
+        with self.transaction() as conn:
+            row = conn.execute("SELECT id, state, updated_at FROM jobs WHERE state IN ('pending', 'running') "
+                               "ORDER BY id LIMIT 1").fetchone()
+            if row is None or (row[1] == 'running' and row[2] > now - lease_seconds):
+                return None
+            conn.execute("UPDATE jobs SET state = 'running', owner = ?, attempts = attempts + 1, updated_at = ? "
+                         "WHERE id = ?", (owner, now, row[0]))
+            return self.job(row[0])
+
+    def checkpoint_job(self, job_id, owner, cursor, processed, finished=False):
+        """Record a finished batch; False if owner no longer holds the job"""
+        with self.transaction() as conn:
+            return conn.execute("UPDATE jobs SET cursor = ?, done = done + ?, state = ?, updated_at = ? "
+                                "WHERE id = ? AND owner = ? AND state = 'running'",
+                                (cursor, processed, 'done' if finished else 'running', time.time(),
+                                 job_id, owner)).rowcount > 0
+
+    def release_job(self, job_id, owner, error=None):
+        """Hand a running job back: failed with error, or pending to be resumed later"""
+        with self.transaction() as conn:
+            conn.execute("UPDATE jobs SET state = ?, error = ?, owner = NULL, updated_at = ? "
+                         "WHERE id = ? AND owner = ? AND state = 'running'",
+                         ('failed' if error else 'pending', error, time.time(), job_id, owner))
+
+    def retry_job(self, job_id):
+        """Queue a failed job again, resuming from its last cursor; False if it had not failed"""
+        with self.transaction() as conn:
+            return conn.execute("UPDATE jobs SET state = 'pending', error = NULL, updated_at = ? "
+                                "WHERE id = ? AND state = 'failed'", (time.time(), job_id)).rowcount > 0
+
+    # Import and export of the JSON/directory layout
+
+    def import_files(self, local_data_dir):
+        """Make the database match local_data's JSON index and sentence directories
+
+        Only the texts and audio of known sentences and languages are imported;
+        each sentence directory is scanned once. Only rows that differ from the
+        files are written, so the change log records exactly what changed (e.g.
+        in a git pull) and clients' incremental updates stay valid.
+        """
+        started = time.time()
+        # Taken before scanning, so files changed during the import are picked up next time
+        digest = catalog_digest(local_data_dir)
+        sentences_dir = os.path.join(local_data_dir, 'sentences')
+        languages = _read_json(os.path.join(local_data_dir, 'languages.json'), {})
+        sentences = list(dict.fromkeys(_read_json(os.path.join(local_data_dir, 'index_path.json'), {})
+                                       .get('sentences', [])))
+        translations = {}
+        audio = {}
+        for sentence_id in sentences:
+            for language, entry in _scan(os.path.join(sentences_dir, sentence_id, 'text'), '.txt'):
+                if language in languages:
+                    try:
+                        with open(entry.path, 'r', encoding='utf-8') as f:
+                            translations[(sentence_id, language)] = f.read()
+                    except (OSError, UnicodeDecodeError) as e:
+                        logger.error(f"Skipping unreadable text {entry.path}: {e}")
+            for language, entry in _scan(os.path.join(sentences_dir, sentence_id, 'audio'), '.mp3'):
+                if language in languages:
+                    st = entry.stat()
+                    audio[(sentence_id, language)] = (st.st_size, st.st_mtime_ns)
+
+        now = time.time()
+        with self.transaction() as conn:
+            self.replace_languages(languages)
+            self.replace_sentences(sentences)
+
+            current = {(row[0], row[1]): row[2] for row in
+                       conn.execute("SELECT sentence_id, language, text FROM translations")}
+            conn.executemany("DELETE FROM translations WHERE sentence_id = ? AND language = ?",
+                             [key for key in current if key not in translations])
+            changed_texts = [(sentence_id, language, text, now) for (sentence_id, language), text in translations.items()
+                             if current.get((sentence_id, language)) != text]
+            conn.executemany("INSERT INTO translations (sentence_id, language, text, updated_at) VALUES (?, ?, ?, ?) "
+                             "ON CONFLICT(sentence_id, language) DO UPDATE SET "
+                             "text = excluded.text, updated_at = excluded.updated_at", changed_texts)
+
+            current = {(row[0], row[1]): (row[2], row[3]) for row in
+                       conn.execute("SELECT sentence_id, language, size, mtime_ns FROM audio")}
+            conn.executemany("DELETE FROM audio WHERE sentence_id = ? AND language = ?",
+                             [key for key in current if key not in audio])
+            changed_audio = [(sentence_id, language, size, mtime_ns, now)
+                             for (sentence_id, language), (size, mtime_ns) in audio.items()
+                             if current.get((sentence_id, language)) != (size, mtime_ns)]
+            conn.executemany("INSERT OR REPLACE INTO audio (sentence_id, language, size, mtime_ns, updated_at) "
+                             "VALUES (?, ?, ?, ?, ?)", changed_audio)
+            self.set_meta('files_digest', digest)
+            self.trim_changes()
+
+        logger.info(f"Imported {len(sentences)} sentences, {len(languages)} languages, "
+                    f"{len(translations)} texts and {len(audio)} audio files in {time.time() - started:.2f}s "
+                    f"({len(changed_texts)} texts and {len(changed_audio)} audio files changed)")
+
+    def export_files(self, local_data_dir):
+        """Write languages.json and index_path.json from the database, atomically"""
+        languages_file = os.path.join(local_data_dir, 'languages.json')
+        index_file = os.path.join(local_data_dir, 'index_path.json')
+        with self.transaction():
+            write_json_atomic(languages_file, self.languages())
+            write_json_atomic(index_file, {"sentences": self.sentence_ids()})
+            self.trim_changes()
+
+    def files_changed(self, local_data_dir):
+        """Whether local_data differs from what was last imported (e.g. after a git pull)
+
+        Admin writes also change the files, so the next check after them
+        re-imports too; that finds nothing to change and records no changes.
+        """
+        return catalog_digest(local_data_dir) != self.get_meta('files_digest')
+
+
+_JOB_COLUMNS = "id, kind, params, state, total, done, cursor, attempts, error, created_at, updated_at"
+
+
+def _job_dict(row):
+    job = dict(zip(_JOB_COLUMNS.split(', '), row))
+    job['params'] = json.loads(job['params'])
+    return job
+
+
+def _read_json(path, default):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+
+
+def _scan(directory, suffix):
+    """(name without suffix, DirEntry) for the files in directory ending in suffix"""
+    try:
+        with os.scandir(directory) as entries:
+            return [(entry.name[:-len(suffix)], entry) for entry in entries
+                    if entry.name.endswith(suffix) and entry.is_file()]
+    except FileNotFoundError:
+        return []
+
+
+def open_catalog(local_data_dir, path=None):
+    """Open the catalog database, importing local_data first if it is new or was changed outside the admin"""
+    db = CatalogDB(path or os.path.join(local_data_dir, 'catalog.sqlite3'))
+    if db.is_empty() or db.files_changed(local_data_dir):
+        db.import_files(local_data_dir)
+    return db
@@ -0,0 +1,405 @@
+import os
+import io
+import re
+import csv
+import time
+import zipfile
+import logging
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Same rules as the admin panel: sentence ids are letters, digits and underscores
+SENTENCE_ID = re.compile(r'^[A-Za-z0-9_]+$')
+LANGUAGE_CODE = re.compile(r'^[A-Za-z0-9_\-]+$')
+
+MAX_TEXT_BYTES = 64 * 1024
+MAX_AUDIO_BYTES = 20 * 1024 * 1024
+COPY_CHUNK = 64 * 1024
+
+# Temporary suffix for files written by an import that has not been committed yet
+TMP_SUFFIX = '.import-tmp'
+BACKUP_SUFFIX = '.import-bak'
+
+
+class CatalogImportError(Exception):
+    """The import source cannot be read at all"""
+
+
+def is_mp3(header):
+    """Whether the first bytes of a file look like MP3: an ID3 tag or an MPEG audio frame sync"""
+    return header[:3] == b'ID3' or (len(header) >= 2 and header[0] == 0xFF and header[1] & 0xE0 == 0xE0)
+
+
+class ZipSource:
+    """Members of a ZIP archive, read one at a time straight from the (seekable) file"""
+
+    def __init__(self, fileobj):
+        self.zip = zipfile.ZipFile(fileobj)
+
+    def files(self):
+        for info in self.zip.infolist():
+            if not info.is_dir():
+                yield info.filename, info.file_size, lambda info=info: self.zip.open(info)
+
+    def close(self):
+        self.zip.close()
+
+
+class DirectorySource:
+    """Files under a directory, e.g. a CSV next to an audio folder"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def files(self):
+        for root, _, names in os.walk(self.path):
+            for name in names:
+                path = os.path.join(root, name)
+                yield os.path.relpath(path, self.path).replace(os.sep, '/'), os.path.getsize(path), \
+                    lambda path=path: open(path, 'rb')
+
+    def close(self):
+        pass
+
+
+def classify(name):
+    """Map an archive path to (kind, sentence id, language), or None for files that are not content
+
+    Accepts the local_data layout (<sentence>/text/<lang>.txt, <sentence>/audio/<lang>.mp3),
+    an audio folder beside a CSV (<sentence>/<lang>.mp3), and CSV files.
+    """
+    parts = [part for part in name.split('/') if part]
+    if not parts or parts[-1].startswith('.') or '__MACOSX' in parts:
+        return None
+    stem, extension = os.path.splitext(parts[-1])
+    extension = extension.lower()
+    if extension == '.csv':
+        return 'csv', None, None
+    if len(parts) >= 3 and parts[-2] in ('text', 'audio'):
+        sentence_id = parts[-3]
+    elif len(parts) >= 2 and extension != '.txt':
+        sentence_id = parts[-2]
+    else:
+        return None
+    if extension == '.txt':
+        return 'text', sentence_id, stem
+    if extension in ('.mp3', '.wav', '.ogg', '.m4a', '.flac'):
+        return 'audio', sentence_id, stem
+    return None
+
+
+class ImportReport:
+    """Progress and outcome of one import"""
+
+    def __init__(self):
+        self.started = time.time()
+        self.stage = 'reading'
+        self.total = 0
+        self.done = 0
+        self.texts = 0
+        self.audio = 0
+        self.bytes_written = 0
+        self.new_sentences = []
+        self.new_languages = []
+        self.skipped = []
+        self.finished_at = None
+
+    def skip(self, name, reason):
+        self.skipped.append({'file': name, 'reason': reason})
+
+    def to_dict(self):
+        return {
+            'stage': self.stage,
+            'total': self.total,
+            'done': self.done,
+            'texts': self.texts,
+            'audio': self.audio,
+            'bytes_written': self.bytes_written,
+            'new_sentences': len(self.new_sentences),
+            'new_languages': self.new_languages,
+            'skipped': self.skipped,
+            'seconds': (self.finished_at or time.time()) - self.started
+        }
+
+
+class CatalogImporter:
+    """Streams texts and audio from a ZIP or directory into local_data and the catalog database
+
+    Files are copied in chunks by a thread pool into temporary names next to
+    their targets; nothing is visible until the end, when one database
+    transaction records every text and audio file, the temporary files are
+    renamed into place and the JSON index is exported once. An import that
+    fails before then leaves the catalog as it was.
+    """
+
+    def __init__(self, db, local_data_dir, workers=4, add_languages=False,
+                 max_audio_bytes=MAX_AUDIO_BYTES, on_progress=None):
+        self.db = db
+        self.local_data_dir = local_data_dir
+        self.sentences_dir = os.path.join(local_data_dir, 'sentences')
+        self.workers = workers
+        self.add_languages = add_languages
+        self.max_audio_bytes = max_audio_bytes
+        self.on_progress = on_progress
+        self.report = ImportReport()
+
+    def _target(self, kind, sentence_id, language):
+        if kind == 'text':
+            return os.path.join(self.sentences_dir, sentence_id, 'text', f"{language}.txt")
+        return os.path.join(self.sentences_dir, sentence_id, 'audio', f"{language}.mp3")
+
+    def _check(self, name, kind, sentence_id, language, size, languages):
+        """Reason to skip an entry, or None"""
+        if not SENTENCE_ID.match(sentence_id or ''):
+            return f"invalid sentence id {sentence_id!r}"
+        if not LANGUAGE_CODE.match(language or ''):
+            return f"invalid language code {language!r}"
+        if language not in languages and not self.add_languages:
+            return f"unknown language {language}"
+        if kind == 'text' and size > MAX_TEXT_BYTES:
+            return f"text larger than {MAX_TEXT_BYTES} bytes"
+        if kind == 'audio':
+            if not name.lower().endswith('.mp3'):
+                return "audio must be MP3"
+            if size > self.max_audio_bytes:
+                return f"audio larger than {self.max_audio_bytes} bytes"
+        return None
+
+    def _write(self, kind, sentence_id, language, opener=None, text=None):
+        """Copy one entry to a temporary file beside its target; returns (tmp path, size) or raises"""
+        target = self._target(kind, sentence_id, language)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        tmp_path = target + TMP_SUFFIX
+        if text is not None:
+            data = text.encode('utf-8')
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            return tmp_path, len(data)
+
+        limit = MAX_TEXT_BYTES if kind == 'text' else self.max_audio_bytes
+        with opener() as source, open(tmp_path, 'wb') as f:
+            header = source.read(COPY_CHUNK)
+            if kind == 'audio' and not is_mp3(header):
+                raise ValueError("not an MP3 file")
+            if kind == 'text':
+                # Texts are small; check the whole file decodes before accepting it
+                header += source.read(MAX_TEXT_BYTES)
+                header.decode('utf-8')
+            f.write(header)
+            size = len(header)
+            while True:
+                chunk = source.read(COPY_CHUNK)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > limit:
+                    raise ValueError(f"{kind} larger than {limit} bytes")
+                f.write(chunk)
+        return tmp_path, size
+
+    def _write_empty(self, sentence_id, language):
+        target = self._target('text', sentence_id, language)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.makedirs(os.path.dirname(self._target('audio', sentence_id, language)), exist_ok=True)
+        if not os.path.exists(target):
+            with open(target, 'w', encoding='utf-8') as f:
+                f.write("")
+
+    def _entries(self, source, languages):
+        """(name, kind, sentence id, language, opener, text) for everything importable in source"""
+        for name, size, opener in source.files():
+            classified = classify(name)
+            if classified is None:
+                continue
+            kind, sentence_id, language = classified
+            if kind == 'csv':
+                yield from self._csv_entries(name, opener, languages)
+                continue
+            reason = self._check(name, kind, sentence_id, language, size, languages)
+            if reason:
+                self.report.skip(name, reason)
+                continue
+            yield name, kind, sentence_id, language, opener, None
+
+    def _csv_entries(self, name, opener, languages):
+        """Text entries from a CSV whose header is sentence_id followed by language codes"""
+        with opener() as raw:
+            reader = csv.reader(io.TextIOWrapper(raw, encoding='utf-8-sig', newline=''))
+            header = next(reader, None)
+            if not header or header[0].strip() != 'sentence_id':
+                self.report.skip(name, "CSV header must start with sentence_id")
+                return
+            columns = [column.strip() for column in header[1:]]
+            for line_number, row in enumerate(reader, start=2):
+                if not row:
+                    continue
+                sentence_id = row[0].strip()
+                for language, text in zip(columns, row[1:]):
+                    entry_name = f"{name}:{line_number}:{language}"
+                    reason = self._check(entry_name, 'text', sentence_id, language,
+                                         len(text.encode('utf-8')), languages)
+                    if reason:
+                        self.report.skip(entry_name, reason)
+                        continue
+                    yield entry_name, 'text', sentence_id, language, None, text
+
+    def _progress(self):
+        if self.report.done % 500 == 0:
+            logger.info(f"Import: {self.report.done} files written, {len(self.report.skipped)} skipped")
+        if self.on_progress:
+            self.on_progress(self.report)
+
+    def run(self, source):
+        """Import everything in source; returns the ImportReport"""
+        report = self.report
+        languages = self.db.languages()
+        written = {}
+        pending = set()
+
+        def collect(done):
+            for future in done:
+                pending.discard(future)
+                name, kind, sentence_id, language = future.entry
+                try:
+                    tmp_path, size = future.result()
+                except Exception as e:
+                    report.skip(name, str(e))
+                    tmp_path = self._target(kind, sentence_id, language) + TMP_SUFFIX
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+                    # An earlier copy of the same file shared the temporary name
+                    if (kind, sentence_id, language) in written:
+                        report.skip(written.pop((kind, sentence_id, language))[0], "superseded by an invalid file")
+                    continue
+                key = (kind, sentence_id, language)
+                if key in written:
+                    # A later duplicate in the same archive wins
+                    report.skip(written[key][0], "superseded by a later file")
+                written[key] = (name, tmp_path, size)
+                report.done += 1
+                report.bytes_written += size
+                self._progress()
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='import') as executor:
+                for name, kind, sentence_id, language, opener, text in self._entries(source, languages):
+                    report.total += 1
+                    # Bounded window of in-flight writes, so large archives are never queued in memory
+                    if len(pending) >= self.workers * 4:
+                        collect(wait(pending, return_when=FIRST_COMPLETED).done)
+                    future = executor.submit(self._write, kind, sentence_id, language, opener, text)
+                    future.entry = (name, kind, sentence_id, language)
+                    pending.add(future)
+                    # Writes to the same target are serialized by waiting for the earlier one
+                    if any(other.entry[1:] == future.entry[1:] for other in pending if other is not future):
+                        collect(wait(pending).done)
+                collect(wait(pending).done)
+
+            report.stage = 'committing'
+            self._commit(written, languages)
+        except BaseException:
+            tmp_paths = [tmp_path for _, tmp_path, _ in written.values()]
+            tmp_paths += [self._target(*future.entry[1:]) + TMP_SUFFIX for future in pending]
+            for tmp_path in tmp_paths:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+            report.stage = 'failed'
+            raise
+        finally:
+            source.close()
+
+        report.stage = 'done'
+        report.finished_at = time.time()
+        logger.info(f"Imported {report.texts} texts and {report.audio} audio files "
+                    f"({len(report.new_sentences)} new sentences) in {report.finished_at - report.started:.2f}s, "
+                    f"{len(report.skipped)} files skipped")
+        return report
+
+    def _commit(self, written, languages):
+        """Record every written file in one transaction and move the files into place
+
+        Files being replaced are set aside first, so if any step fails the
+        transaction rolls back and the previous files are restored.
+        """
+        report = self.report
+        moved = []
+        try:
+            with self.db.transaction():
+                for (_, _, language) in list(written):
+                    if language not in languages:
+                        # Existing sentences get an empty text in the new language, as in the admin panel
+                        for sentence_id in self.db.add_language(language, language):
+                            if ('text', sentence_id, language) not in written:
+                                self._write_empty(sentence_id, language)
+                        languages[language] = language
+                        report.new_languages.append(language)
+
+                for (_, sentence_id, _) in written:
+                    if self.db.add_sentence(sentence_id):
+                        report.new_sentences.append(sentence_id)
+
+                for (kind, sentence_id, language), (_, tmp_path, size) in written.items():
+                    if kind == 'text':
+                        with open(tmp_path, 'r', encoding='utf-8') as f:
+                            self.db.set_translation(sentence_id, language, f.read())
+                        report.texts += 1
+                    else:
+                        self.db.set_audio(sentence_id, language, size, os.stat(tmp_path).st_mtime_ns)
+                        report.audio += 1
+
+                    target = self._target(kind, sentence_id, language)
+                    backup = target + BACKUP_SUFFIX if os.path.exists(target) else None
+                    if backup:
+                        os.replace(target, backup)
+                    moved.append((target, backup))
+                    os.replace(tmp_path, target)
+
+                # New sentences get an empty text in every language, as when added in the admin panel
+                for sentence_id in report.new_sentences:
+                    for language in languages:
+                        if ('text', sentence_id, language) not in written:
+                            self._write_empty(sentence_id, language)
+                            self.db.set_translation(sentence_id, language, "")
+
+                self.db.export_files(self.local_data_dir)
+        except BaseException:
+            for target, backup in reversed(moved):
+                if backup:
+                    os.replace(backup, target)
+                elif os.path.exists(target):
+                    os.remove(target)
+            raise
+
+        for _, backup in moved:
+            if backup:
+                os.remove(backup)
+
+
+def open_source(path, audio_dir=None):
+    """Source for a ZIP file, a directory, or a CSV (with an optional audio folder)"""
+    if os.path.isdir(path):
+        return DirectorySource(path)
+    if zipfile.is_zipfile(path):
+        return ZipSource(open(path, 'rb'))
+    if path.lower().endswith('.csv'):
+        return CsvSource(path, audio_dir)
+    raise CatalogImportError(f"Not a ZIP, CSV or directory: {path}")
+
+
+class CsvSource:
+    """A CSV of texts plus, optionally, an audio folder laid out as <sentence>/<lang>.mp3"""
+
+    def __init__(self, csv_path, audio_dir=None):
+        self.csv_path = csv_path
+        self.audio = DirectorySource(audio_dir) if audio_dir else None
+
+    def files(self):
+        yield os.path.basename(self.csv_path), os.path.getsize(self.csv_path), \
+            lambda: open(self.csv_path, 'rb')
+        if self.audio:
+            yield from self.audio.files()
+
+    def close(self):
+        pass
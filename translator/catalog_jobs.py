@@ -0,0 +1,114 @@
+import os
+import uuid
+import logging
+import threading
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+
+class LeaseLost(Exception):
+    """The job was taken over by another worker while a batch ran"""
+
+
+class JobRunner:
+    """Runs queued catalog jobs in batches on a background thread
+
+    Jobs live in the catalog database, so they survive restarts. A handler is
+    called as handler(params, cursor, batch_size) and returns (items processed,
+    next cursor), with a None cursor once the job is finished. Each batch runs
+    in one transaction together with its checkpoint, so an interrupted job
+    resumes after its last completed batch; handlers must be safe to repeat
+    for a batch whose checkpoint was lost.
+    """
+
+    def __init__(self, db, batch_size=200, poll_interval=2.0, lease_seconds=60.0):
+        self.db = db
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._handlers = {}
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def register(self, kind, handler):
+        self._handlers[kind] = handler
+
+    def submit(self, kind, params, total=0):
+        """Queue a job, joining the caller's transaction if there is one, and return its id
+
+        The worker is woken once that transaction commits, so it never looks
+        for the job before it is visible.
+        """
+        job_id = self.db.add_job(kind, params, total)
+        self.db.on_commit(self.wake)
+        return job_id
+
+    def wake(self):
+        """Look for queued jobs now rather than at the next poll"""
+        self._wake.set()
+
+    def start(self):
+        """Start the worker thread, which also picks up jobs left unfinished by a previous run"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name='catalog-jobs', daemon=True)
+            self._thread.start()
+        return self._thread
+
+    def stop(self, timeout=None):
+        """Stop after the current batch; an unfinished job is left pending for the next run"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self._wake.clear()
+            try:
+                self.run_pending()
+            except Exception as e:
+                logger.error(f"Job worker error: {e}")
+            self._wake.wait(self.poll_interval)
+
+    def run_pending(self):
+        """Run queued jobs until none is left to claim; returns how many were run"""
+        count = 0
+        while not self._stop.is_set():
+            job = self.db.claim_job(self.owner, self.lease_seconds)
+            if job is None:
+                break
+            self.run(job)
+            count += 1
+        return count
+
+    def run(self, job):
+        """Run a claimed job batch by batch from its last checkpoint"""
+        handler = self._handlers.get(job['kind'])
+        if handler is None:
+            self.db.release_job(job['id'], self.owner, f"Unknown job kind {job['kind']}")
+            return
+
+        cursor = job['cursor']
+        if job['attempts'] > 1:
+            logger.info(f"Resuming job {job['id']} ({job['kind']}) after {job['done']}/{job['total']} items")
+        try:
+            while True:
+                if self._stop.is_set():
+                    self.db.release_job(job['id'], self.owner)
+                    return
+                with self.db.transaction():
+                    processed, cursor = handler(job['params'], cursor, self.batch_size)
+                    if not self.db.checkpoint_job(job['id'], self.owner, cursor, processed, cursor is None):
+                        raise LeaseLost()
+                if cursor is None:
+                    logger.info(f"Job {job['id']} ({job['kind']}) finished")
+                    return
+        except LeaseLost:
+            logger.warning(f"Job {job['id']} was taken over by another worker")
+        except Exception as e:
+            logger.error(f"Job {job['id']} ({job['kind']}) failed: {e}")
+            self.db.release_job(job['id'], self.owner, str(e))
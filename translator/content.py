@@ -0,0 +1,205 @@
+import os
+import logging
+import time
+from eventlet import patcher
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Native threads and locks even where threading is monkey-patched, so polling's
+# file I/O runs beside the eventlet hub rather than on it
+_threading = patcher.original('threading')
+
+
+def start_poller(refresh, interval, name):
+    """Call refresh() every interval seconds on a native daemon thread"""
+    stopped = _threading.Event()
+
+    def poll():
+        while not stopped.wait(interval):
+            try:
+                refresh()
+            except Exception as e:
+                logger.error(f"Error refreshing content store: {e}")
+
+    thread = _threading.Thread(target=poll, name=name, daemon=True)
+    thread.start()
+    return thread
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+class ContentEntry:
+    """Cached text and audio availability for one sentence in one language"""
+
+    __slots__ = ('text', 'text_mtime', 'has_audio', 'audio_mtime')
+
+    def __init__(self, text, text_mtime, audio_mtime):
+        self.text = text
+        self.text_mtime = text_mtime
+        self.has_audio = audio_mtime is not None
+        self.audio_mtime = audio_mtime
+
+
+class ContentLayout:
+    """Where sentence texts and audio live, keyed by catalog sentence id and language code
+
+    The catalog layout is <sentences_dir>/<id>/text/<code>.txt and .../audio/<code>.mp3.
+    Deployments from before the catalog keep sentences/<id>/<Language>.txt and
+    audio/<id>/<Language>.mp3 under legacy_dir, named by language rather than
+    code; those files are used for any pair the catalog has no file for, and
+    legacy_languages stay selectable while that layout exists.
+    """
+
+    def __init__(self, sentences_dir, languages, legacy_dir=None, legacy_languages=()):
+        """languages() returns the catalog's language code -> name mapping"""
+        self.sentences_dir = sentences_dir
+        self.catalog_languages = languages
+        self.legacy_sentences_dir = os.path.join(legacy_dir, 'sentences') if legacy_dir else None
+        self.legacy_audio_dir = os.path.join(legacy_dir, 'audio') if legacy_dir else None
+        self.legacy_languages = list(legacy_languages)
+
+    def languages(self):
+        """Language code -> name, including languages only the legacy layout has"""
+        languages = dict(self.catalog_languages())
+        if self.legacy_sentences_dir and os.path.isdir(self.legacy_sentences_dir):
+            names = set(languages.values())
+            for name in self.legacy_languages:
+                if name not in languages and name not in names:
+                    languages[name] = name
+        return languages
+
+    def language_code(self, language):
+        """Code for a language given by code or, as older clients send it, by name; None if unknown"""
+        languages = self.languages()
+        if language in languages:
+            return language
+        return next((code for code, name in languages.items() if name == language), None)
+
+    def _pick(self, path, legacy_dir, sentence, language, extension):
+        if legacy_dir is None or os.path.exists(path):
+            return path
+        name = self.catalog_languages().get(language, language)
+        legacy = os.path.join(legacy_dir, sentence, f"{name}{extension}")
+        return legacy if os.path.exists(legacy) else path
+
+    def text_path(self, sentence, language):
+        return self._pick(os.path.join(self.sentences_dir, sentence, 'text', f"{language}.txt"),
+                          self.legacy_sentences_dir, sentence, language, '.txt')
+
+    def audio_path(self, sentence, language):
+        return self._pick(os.path.join(self.sentences_dir, sentence, 'audio', f"{language}.mp3"),
+                          self.legacy_audio_dir, sentence, language, '.mp3')
+
+
+class ContentStore:
+    """Process-wide in-memory store of sentence texts and audio availability
+
+    Every sentence x language pair is loaded up front and served from memory.
+    Entries are invalidated explicitly (e.g. after admin writes) or when
+    refresh() sees a file's mtime change, which start_polling() runs periodically.
+    invalidate() only reaches this process's store: other processes serving the
+    same files (app.py next to the admin app) see edits at their next poll.
+    """
+
+    def __init__(self, text_path, audio_path, list_sentences, list_languages):
+        """text_path/audio_path map (sentence, language) to a file path; the list_* callables enumerate the catalog"""
+        self.text_path = text_path
+        self.audio_path = audio_path
+        self.list_sentences = list_sentences
+        self.list_languages = list_languages
+        self._entries = {}
+        self._lock = _threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _load(self, sentence, language, cache_missing=True):
+        text_path = self.text_path(sentence, language)
+        text_mtime = _mtime(text_path)
+        text = None
+        if text_mtime is not None:
+            try:
+                with open(text_path, 'r', encoding='utf-8') as f:
+                    text = f.read()
+            except Exception as e:
+                logger.error(f"Error reading text file {text_path}: {e}")
+
+        entry = ContentEntry(text, text_mtime, _mtime(self.audio_path(sentence, language)))
+        if not cache_missing and entry.text_mtime is None and not entry.has_audio:
+            return entry
+        with self._lock:
+            self._entries[(sentence, language)] = entry
+        return entry
+
+    def load_all(self):
+        """Load every sentence x language pair in the catalog"""
+        started = time.time()
+        languages = list(self.list_languages())
+        for sentence in self.list_sentences():
+            for language in languages:
+                self._load(sentence, language)
+        logger.info(f"Content store loaded {len(self._entries)} entries in {time.time() - started:.2f}s")
+
+    def get(self, sentence, language):
+        entry = self._entries.get((sentence, language))
+        if entry is not None:
+            self.hits += 1
+            return entry
+        self.misses += 1
+        # Pairs outside the catalog are only cached if they exist, so lookups
+        # for arbitrary names cannot grow the store
+        return self._load(sentence, language, cache_missing=False)
+
+    def text(self, sentence, language):
+        """Text for sentence in language, or None if there is no text file"""
+        return self.get(sentence, language).text
+
+    def has_audio(self, sentence, language):
+        return self.get(sentence, language).has_audio
+
+    def invalidate(self, sentence=None, language=None):
+        """Drop cached entries matching sentence and/or language (None matches all)"""
+        with self._lock:
+            keys = [key for key in self._entries
+                    if (sentence is None or key[0] == sentence) and (language is None or key[1] == language)]
+            for key in keys:
+                del self._entries[key]
+        return len(keys)
+
+    def refresh(self):
+        """Reload entries whose files changed on disk and load any new catalog pairs"""
+        changed = 0
+        for (sentence, language), entry in list(self._entries.items()):
+            if (_mtime(self.text_path(sentence, language)) != entry.text_mtime
+                    or _mtime(self.audio_path(sentence, language)) != entry.audio_mtime):
+                self._load(sentence, language)
+                changed += 1
+
+        languages = list(self.list_languages())
+        for sentence in self.list_sentences():
+            for language in languages:
+                if (sentence, language) not in self._entries:
+                    self._load(sentence, language)
+                    changed += 1
+
+        if changed:
+            logger.info(f"Content store reloaded {changed} changed entries")
+        return changed
+
+    def start_polling(self, interval):
+        """Run refresh() every interval seconds on a native daemon thread"""
+        return start_poller(self.refresh, interval, 'content-store-poll')
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
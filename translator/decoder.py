@@ -0,0 +1,93 @@
+import json
+import time
+import logging
+import cffi
+from eventlet import tpool
+from translator.metrics import Histogram
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Used only to wrap memoryview/bytearray chunks so Vosk reads them in place
+_ffi = cffi.FFI()
+
+ACCEPT_SECONDS = Histogram('translator_accept_waveform_seconds',
+                           'Time spent in AcceptWaveform (and PartialResult) per chunk')
+FINAL_RESULT_SECONDS = Histogram('translator_time_to_final_seconds',
+                                 'Time from receiving the audio that ended an utterance to dispatching its result')
+
+
+def accept_chunk(recognizer, chunk, want_partial=False):
+    """Feed one chunk to the recognizer
+
+    Returns (True, result JSON) when an utterance ended, (False, partial JSON) when
+    want_partial is set, and (False, None) otherwise.
+    """
+    if not isinstance(chunk, bytes):
+        chunk = _ffi.from_buffer(chunk)
+    if recognizer.AcceptWaveform(chunk):
+        return True, recognizer.Result()
+    if want_partial:
+        return False, recognizer.PartialResult()
+    return False, None
+
+
+def timed_accept_chunk(recognizer, chunk, want_partial=False):
+    """accept_chunk, also returning the seconds it took"""
+    started = time.perf_counter()
+    final, result = accept_chunk(recognizer, chunk, want_partial)
+    return final, result, time.perf_counter() - started
+
+
+def dispatch_result(session, final, result, on_result, on_partial, received_at=None):
+    """Decode a recognizer result and hand it to the final or partial callback
+
+    received_at is the monotonic time the decoded audio arrived, for the
+    time-to-final histogram.
+    """
+    if result is None:
+        return
+    if final:
+        session.at_boundary = True
+        if received_at is not None:
+            FINAL_RESULT_SECONDS.observe(time.monotonic() - received_at)
+        on_result(session, json.loads(result))
+    elif on_partial is not None:
+        on_partial(session, json.loads(result))
+
+
+class ThreadDecoder:
+    """Runs Vosk decoding on eventlet's native thread pool, off the hub"""
+
+    def __init__(self, on_result, pool, workers=4, on_partial=None, partial_interval=0.25):
+        self.on_result = on_result
+        self.pool = pool
+        self.on_partial = on_partial
+        self.partial_interval = partial_interval
+        self.workers = workers
+        # Must be set before the first tpool.execute call starts the threads
+        tpool.set_num_threads(workers)
+        logger.info(f"Decode executor using {workers} native threads")
+
+    def set_grammar(self, grammar, version):
+        """Use grammar for new sessions and switch idle pooled recognizers to it"""
+        self.pool.set_grammar(grammar, version)
+        refreshed = self.pool.refresh_idle(execute=tpool.execute)
+        logger.info(f"Switched to grammar {version} ({refreshed} idle recognizers updated)")
+
+    def refresh(self, session):
+        """Move a session that is between utterances onto the current grammar"""
+        pool = session.pool or self.pool
+        if session.at_boundary and session.grammar_version != pool.grammar_version:
+            grammar, version = pool.grammar, pool.grammar_version
+            tpool.execute(session.recognizer.SetGrammar, grammar)
+            session.grammar_version = version
+
+    def feed(self, session, chunk):
+        """Decode a chunk for session; the caller must hold session.lock"""
+        self.refresh(session)
+        session.at_boundary = False
+        want_partial = self.on_partial is not None and session.partial_due(self.partial_interval)
+        final, result, elapsed = tpool.execute(timed_accept_chunk, session.recognizer, chunk, want_partial)
+        ACCEPT_SECONDS.observe(elapsed)
+        dispatch_result(session, final, result, self.on_result, self.on_partial, session.received_at)
@@ -0,0 +1,111 @@
+import os
+import json
+import hashlib
+import logging
+from translator.matcher import PhraseMatcher, tokenize
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+
+class Catalog:
+    """One version of the sentence catalog as seen by the recognizer"""
+
+    def __init__(self, version, phrases, languages=None):
+        self.version = version
+        # Normalized phrase text -> sentence id
+        self.phrases = phrases
+        # Language code -> display name, as in languages.json; codes key the content files
+        self.languages = languages or {}
+        self.grammar = json.dumps(["[unk]"] + sorted(phrases))
+        self.matcher = PhraseMatcher(phrases, version=version)
+
+
+class CatalogGrammar:
+    """Derives recognizer grammar and phrase matcher from local_data/index_path.json
+
+    Each sentence is recognized by its reference-language text, falling back to its
+    id with underscores as spaces. The catalog also carries languages.json, so texts
+    and audio are looked up with the same sentence ids and language codes. Catalogs
+    are cached by a version hash of those files, so nothing is rebuilt unless the
+    catalog changed.
+    """
+
+    def __init__(self, local_data_dir, reference_language='English', fallback_phrases=(), cache_size=4):
+        self.sentences_dir = os.path.join(local_data_dir, 'sentences')
+        self.index_path_file = os.path.join(local_data_dir, 'index_path.json')
+        self.languages_file = os.path.join(local_data_dir, 'languages.json')
+        self.reference_language = reference_language
+        self.fallback_phrases = list(fallback_phrases)
+        self.cache_size = cache_size
+        self._cache = {}
+
+    def _reference_path(self, sentence_id):
+        return os.path.join(self.sentences_dir, sentence_id, 'text', f"{self.reference_language}.txt")
+
+    def _load_sentences(self):
+        try:
+            with open(self.index_path_file, 'rb') as f:
+                raw = f.read()
+            return raw, json.loads(raw).get('sentences', [])
+        except Exception as e:
+            logger.error(f"Error loading catalog index: {e}")
+            return b'', []
+
+    def _load_languages(self):
+        try:
+            with open(self.languages_file, 'rb') as f:
+                raw = f.read()
+            return raw, json.loads(raw)
+        except Exception as e:
+            logger.error(f"Error loading catalog languages: {e}")
+            return b'', {}
+
+    def version(self):
+        """Hash of the index, the languages and the reference text files' size and mtime"""
+        raw, sentences = self._load_sentences()
+        digest = hashlib.sha1(raw)
+        digest.update(self._load_languages()[0])
+        for sentence_id in sentences:
+            try:
+                st = os.stat(self._reference_path(sentence_id))
+                digest.update(f"{sentence_id}:{st.st_mtime_ns}:{st.st_size};".encode('utf-8'))
+            except OSError:
+                digest.update(f"{sentence_id}:-;".encode('utf-8'))
+        return digest.hexdigest()[:16]
+
+    def _phrase_for(self, sentence_id):
+        try:
+            with open(self._reference_path(sentence_id), 'r', encoding='utf-8-sig') as f:
+                words = tokenize(f.read())
+            if words:
+                return ' '.join(words)
+        except OSError:
+            pass
+        return ' '.join(tokenize(sentence_id.replace('_', ' ')))
+
+    def load(self, version=None):
+        """Return the Catalog for the current (or given) version, building it on a cache miss"""
+        version = version or self.version()
+        catalog = self._cache.get(version)
+        if catalog is not None:
+            return catalog
+
+        _, sentences = self._load_sentences()
+        phrases = {}
+        for sentence_id in sentences:
+            phrase = self._phrase_for(sentence_id)
+            if phrase:
+                phrases.setdefault(phrase, sentence_id)
+
+        if not phrases:
+            logger.warning("Catalog has no sentences, using built-in phrases")
+            phrases = {phrase: phrase for phrase in self.fallback_phrases}
+
+        catalog = Catalog(version, phrases, self._load_languages()[1])
+        self._cache[version] = catalog
+        while len(self._cache) > self.cache_size:
+            self._cache.pop(next(iter(self._cache)))
+
+        logger.info(f"Built grammar for catalog {version} with {len(phrases)} phrases")
+        return catalog
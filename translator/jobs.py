@@ -0,0 +1,227 @@
+import os
+import json
+import time
+import uuid
+import wave
+import queue
+import logging
+import threading
+from translator.sessions import RecognizerPool
+from translator.ringbuffer import RingBuffer
+from translator.audio_format import AudioFormat, SampleConverter
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Frames read from a WAV file per AcceptWaveform call
+FRAMES_PER_READ = 4000
+
+
+class JobQueueFull(Exception):
+    """Raised when a submission would exceed the queue's pending file limit"""
+
+
+def check_wav(path):
+    """Raise ValueError unless path is a mono 16-bit PCM WAV at a supported rate"""
+    try:
+        with wave.open(path, 'rb') as wf:
+            if wf.getnchannels() != 1 or wf.getsampwidth() != 2 or wf.getcomptype() != 'NONE':
+                raise ValueError('Audio file must be WAV format mono PCM.')
+            AudioFormat('int16', wf.getframerate())
+    except (wave.Error, EOFError) as e:
+        raise ValueError(f"Invalid WAV file: {e}" if str(e) else "Invalid WAV file")
+
+
+def decode_wav(recognizer, path, sample_rate=16000, chunk_size=4000, vad=None):
+    """Decode a WAV file the way live audio is decoded
+
+    Audio is converted to sample_rate, cut into chunk_size byte chunks and,
+    if vad is given, gated like a live session. Returns the recognizer's
+    final results in order and the file's duration in seconds.
+    """
+    results = []
+    with wave.open(path, 'rb') as wf:
+        rate = wf.getframerate()
+        converter = SampleConverter(AudioFormat('int16', rate), sample_rate)
+        buffer = RingBuffer(chunk_size * 4, chunk_size)
+        while True:
+            data = wf.readframes(FRAMES_PER_READ)
+            if not data:
+                break
+            data = memoryview(converter.convert(data))
+            while data:
+                accepted = buffer.write(data)
+                data = data[accepted:]
+                for chunk in buffer.chunks():
+                    for voiced_chunk in vad.filter(chunk) if vad else (chunk,):
+                        if recognizer.AcceptWaveform(bytes(voiced_chunk)):
+                            results.append(json.loads(recognizer.Result()))
+        duration = wf.getnframes() / rate
+
+    rest = buffer.flush()
+    if rest:
+        recognizer.AcceptWaveform(rest)
+    results.append(json.loads(recognizer.FinalResult()))
+    return results, duration
+
+
+class TranscriptionJob:
+    """One submission of one or more WAV files, decoded file by file"""
+
+    def __init__(self, job_id, files, language=None):
+        self.id = job_id
+        # (original filename, path of the uploaded copy)
+        self.files = files
+        self.language = language
+        self.results = [None] * len(files)
+        self.status = 'queued'
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.done = threading.Event()
+        self._remaining = len(files)
+
+    @property
+    def completed(self):
+        return len(self.files) - self._remaining
+
+    def to_dict(self):
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'language': self.language,
+            'files': len(self.files),
+            'completed': self.completed,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'results': [result for result in self.results if result is not None]
+        }
+
+
+class JobQueue:
+    """Bounded pool of worker threads decoding uploaded WAV files
+
+    Each worker leases a recognizer from its own RecognizerPool, so recognizers
+    are reused across jobs and batch work never competes with live sessions
+    for theirs. Audio is streamed from disk and resampled to sample_rate, so
+    memory use does not grow with file length.
+    """
+
+    def __init__(self, model, sample_rate=16000, workers=2, max_pending=100, retention=3600,
+                 annotate=None, on_update=None, grammar=None, grammar_version=None):
+        """annotate(job, text) returns extra result fields (e.g. catalog matches);
+        on_update(job, result) is called from a worker thread after each file;
+        grammar restricts decoding to the catalog phrases, as in live sessions"""
+        self.sample_rate = sample_rate
+        self.max_pending = max_pending
+        self.retention = retention
+        self.annotate = annotate
+        self.on_update = on_update
+        self.pool = RecognizerPool(model, sample_rate, grammar, size=workers, max_size=workers,
+                                   grammar_version=grammar_version)
+        self._jobs = {}
+        self._tasks = queue.Queue()
+        self._pending = 0
+        self._lock = threading.Lock()
+
+        self._workers = []
+        for index in range(workers):
+            thread = threading.Thread(target=self._work, name=f"transcribe-{index}", daemon=True)
+            thread.start()
+            self._workers.append(thread)
+
+    def submit(self, files, language=None):
+        """Queue (filename, path) pairs for decoding; paths are deleted once decoded"""
+        with self._lock:
+            if self._pending + len(files) > self.max_pending:
+                raise JobQueueFull(f"{self._pending} files already pending")
+            self._pending += len(files)
+            self._prune()
+            job = TranscriptionJob(uuid.uuid4().hex, files, language)
+            self._jobs[job.id] = job
+
+        for index in range(len(files)):
+            self._tasks.put((job, index))
+        logger.info(f"Queued job {job.id} with {len(files)} files ({self._pending} files pending)")
+        return job
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def _prune(self):
+        """Forget finished jobs older than retention seconds"""
+        cutoff = time.time() - self.retention
+        for job_id in [job.id for job in self._jobs.values() if job.finished_at and job.finished_at < cutoff]:
+            del self._jobs[job_id]
+
+    def _work(self):
+        while True:
+            job, index = self._tasks.get()
+            if job.started_at is None:
+                job.started_at = time.time()
+                job.status = 'running'
+
+            filename, path = job.files[index]
+            started = time.time()
+            try:
+                result = self._transcribe(path)
+                result['status'] = 'done'
+                if self.annotate:
+                    result.update(self.annotate(job, result['transcription']))
+            except Exception as e:
+                logger.error(f"Error transcribing {filename} for job {job.id}: {e}")
+                result = {'status': 'failed', 'error': str(e)}
+            finally:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+            result['index'] = index
+            result['filename'] = filename
+            result['elapsed'] = time.time() - started
+            self._finish(job, index, result)
+
+    def _finish(self, job, index, result):
+        with self._lock:
+            job.results[index] = result
+            job._remaining -= 1
+            self._pending -= 1
+            if job._remaining == 0:
+                failed = all(r['status'] == 'failed' for r in job.results)
+                job.status = 'failed' if failed else 'done'
+                job.finished_at = time.time()
+
+        if self.on_update:
+            try:
+                self.on_update(job, result)
+            except Exception as e:
+                logger.error(f"Error reporting job {job.id} progress: {e}")
+        if job.finished_at:
+            job.done.set()
+            logger.info(f"Job {job.id} {job.status} in {job.finished_at - job.created_at:.1f}s")
+
+    def _transcribe(self, path):
+        check_wav(path)
+        version = self.pool.grammar_version
+        recognizer = self.pool.acquire()
+        try:
+            results, duration = decode_wav(recognizer, path, self.sample_rate)
+        finally:
+            self.pool.release(recognizer, version)
+
+        segments = [result['text'] for result in results if result.get('text')]
+        return {
+            'transcription': ' '.join(segments),
+            'segments': segments,
+            'duration': duration
+        }
+
+    def stats(self):
+        return {
+            'jobs': len(self._jobs),
+            'pending_files': self._pending,
+            'workers': len(self._workers),
+            'idle_recognizers': self.pool.idle
+        }
@@ -0,0 +1,104 @@
+import re
+from collections import deque
+
+WORD_PATTERN = re.compile(r"[a-z0-9']+")
+
+
+def tokenize(text):
+    """Lowercase text and split it into words"""
+    return WORD_PATTERN.findall(text.lower())
+
+
+def longest_match(matches):
+    """The longest of matches, preferring the earliest on ties"""
+    best = None
+    for match in matches:
+        if best is None or len(match) > len(best) or (len(match) == len(best) and match.start < best.start):
+            best = match
+    return best
+
+
+class Match:
+    """A phrase found in a transcription, spanning words [start, end)"""
+
+    def __init__(self, start, end, phrase, key):
+        self.start = start
+        self.end = end
+        self.phrase = phrase
+        self.key = key
+
+    def __len__(self):
+        return self.end - self.start
+
+    def __repr__(self):
+        return f"Match({self.start}, {self.end}, {self.phrase!r})"
+
+
+class PhraseMatcher:
+    """Word-level Aho-Corasick automaton over a phrase catalog
+
+    Built once per catalog version; a single left-to-right pass over a
+    transcription finds every catalog phrase it contains.
+    """
+
+    def __init__(self, phrases, version=None):
+        """phrases maps phrase text to a key (e.g. sentence id) returned with matches"""
+        self.version = version
+        self._goto = [{}]
+        self._fail = [0]
+        # Per state: (word count, phrase, key) for every phrase ending here
+        self._output = [[]]
+        self.size = 0
+
+        for phrase, key in phrases.items():
+            words = tokenize(phrase)
+            if words:
+                self._insert(words, phrase, key)
+        self._link()
+
+    def _insert(self, words, phrase, key):
+        state = 0
+        for word in words:
+            next_state = self._goto[state].get(word)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][word] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append((len(words), phrase, key))
+        self.size += 1
+
+    def _link(self):
+        """Compute failure links breadth-first and merge outputs along them"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for word, child in self._goto[state].items():
+                queue.append(child)
+                fallback = self._fail[state]
+                while fallback and word not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(word, 0)
+                self._fail[child] = target if target != child else 0
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+    def find_all(self, text):
+        """Every phrase occurrence in text, in order of where it ends"""
+        matches = []
+        state = 0
+        for position, word in enumerate(tokenize(text)):
+            while state and word not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(word, 0)
+            for length, phrase, key in self._output[state]:
+                matches.append(Match(position + 1 - length, position + 1, phrase, key))
+        return matches
+
+    def longest(self, text):
+        """The longest phrase in text, preferring the earliest on ties"""
+        return longest_match(self.find_all(text))
+
+    def __len__(self):
+        return self.size
@@ -0,0 +1,204 @@
+import bisect
+
+# Prometheus text exposition format
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Seconds; spans sub-millisecond decoder calls up to multi-second stalls
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Registry:
+    """Collection of metrics rendered together for a /metrics scrape"""
+
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Duplicate metric: {metric.name}")
+        self._metrics[metric.name] = metric
+
+    def unregister(self, name):
+        self._metrics.pop(name, None)
+
+    def get(self, name):
+        return self._metrics.get(name)
+
+    def render(self):
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {_escape(metric.documentation)}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for suffix, labels, value in metric.samples():
+                lines.append(f"{metric.name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+class _Metric:
+    """Base for metrics with optional labels; unlabeled metrics are their own only child
+
+    Updates are plain attribute arithmetic with no locking: metrics are only
+    updated from the eventlet hub, so they cost about as much as a dict lookup.
+    """
+
+    type = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        if not self.labelnames:
+            self._children[()] = self._child()
+        if registry is not None:
+            registry.register(self)
+
+    def _child(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        values = tuple(str(value) for value in values)
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = self._child()
+        return child
+
+    def _items(self):
+        for values, child in list(self._children.items()):
+            yield list(zip(self.labelnames, values)), child
+
+    def __getattr__(self, name):
+        # Unlabeled metrics forward inc/set/observe to their single child
+        children = self.__dict__.get('_children')
+        if children is not None and () in children:
+            return getattr(children[()], name)
+        raise AttributeError(name)
+
+
+class _CounterValue:
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+
+class Counter(_Metric):
+    """Monotonically increasing total"""
+
+    type = 'counter'
+
+    def _child(self):
+        return _CounterValue()
+
+    def samples(self):
+        for labels, child in self._items():
+            yield '', labels, child.value
+
+
+class _GaugeValue:
+    __slots__ = ('value', 'function')
+
+    def __init__(self):
+        self.value = 0
+        self.function = None
+
+    def set(self, value):
+        self.value = value
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def dec(self, amount=1):
+        self.value -= amount
+
+    def set_function(self, function):
+        """Compute the value at scrape time instead of tracking it"""
+        self.function = function
+
+    def get(self):
+        return self.function() if self.function is not None else self.value
+
+
+class Gauge(_Metric):
+    """Value that goes up and down, either set directly or computed at scrape time"""
+
+    type = 'gauge'
+
+    def _child(self):
+        return _GaugeValue()
+
+    def samples(self):
+        for labels, child in self._items():
+            yield '', labels, child.get()
+
+
+class CounterFunction(Counter):
+    """Counter read from an existing total at scrape time (e.g. a cache's hit count)"""
+
+    def _child(self):
+        return _GaugeValue()
+
+    def samples(self):
+        for labels, child in self._items():
+            yield '', labels, child.get()
+
+
+class _HistogramValue:
+    __slots__ = ('upper_bounds', 'counts', 'sum')
+
+    def __init__(self, upper_bounds):
+        self.upper_bounds = upper_bounds
+        self.counts = [0] * (len(upper_bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.upper_bounds, value)] += 1
+        self.sum += value
+
+
+class Histogram(_Metric):
+    """Distribution of observed values over fixed buckets"""
+
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS, registry=REGISTRY):
+        self.upper_bounds = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _child(self):
+        return _HistogramValue(self.upper_bounds)
+
+    def samples(self):
+        for labels, child in self._items():
+            cumulative = 0
+            for bound, count in zip(self.upper_bounds + (float('inf'),), child.counts):
+                cumulative += count
+                yield '_bucket', labels + [('le', _format_value(float(bound)))], cumulative
+            yield '_sum', labels, child.sum
+            yield '_count', labels, cumulative
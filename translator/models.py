@@ -0,0 +1,233 @@
+import os
+import json
+import time
+import logging
+import threading
+from vosk import Model
+from translator.sessions import RecognizerPool
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Optional per-model settings file, e.g. {"grammar": false} for free-form decoding
+MODEL_SETTINGS = 'model.json'
+
+
+class ModelBudgetExceeded(Exception):
+    """A model cannot be loaded without going over the memory budget"""
+
+
+def is_model_dir(path):
+    """Whether path looks like an unpacked Vosk model"""
+    return os.path.isdir(os.path.join(path, 'am')) or os.path.isdir(os.path.join(path, 'conf'))
+
+
+def directory_size(path):
+    """Bytes on disk under path, used as the memory estimate before a model is loaded"""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def resident_memory():
+    """Resident set size of this process in bytes, or None where /proc is unavailable"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class LoadedModel:
+    """A Model shared by every session using it, with its recognizer pool"""
+
+    def __init__(self, model_id, path, model, pool, memory, uses_grammar=True):
+        self.model_id = model_id
+        self.path = path
+        self.model = model
+        self.pool = pool
+        self.memory = memory
+        # False for models configured to decode free-form rather than to the catalog
+        self.uses_grammar = uses_grammar
+        self.loaded_at = time.time()
+        self.last_used = time.monotonic()
+
+    @property
+    def idle(self):
+        return self.pool.leased == 0
+
+    @property
+    def idle_since(self):
+        return max(self.last_used, self.pool.last_released)
+
+
+class ModelRegistry:
+    """Vosk models by id, loaded on first use and evicted least recently used first
+
+    Models are the directories under models_dir (plus any registered
+    explicitly); the directory name is the id. Each model is loaded once and
+    shared by all sessions through its own RecognizerPool. When loading a model
+    would take the total over memory_budget bytes (0 for no limit), idle
+    models other than the default are evicted oldest first; if that is not
+    enough, ModelBudgetExceeded is raised instead of loading.
+    """
+
+    def __init__(self, models_dir, sample_rate, default, grammar=None, grammar_version=None,
+                 pool_size=2, pool_max=16, memory_budget=0):
+        self.models_dir = models_dir
+        self.sample_rate = sample_rate
+        self.default = default
+        self.grammar = grammar
+        self.grammar_version = grammar_version
+        self.pool_size = pool_size
+        self.pool_max = pool_max
+        self.memory_budget = memory_budget
+        self.evictions = 0
+        self._paths = {}
+        self._loaded = {}
+        # Serializes loads, so two large models never load side by side and
+        # each one's resident memory can be measured
+        self._load_lock = threading.Lock()
+
+    def register(self, model_id, path):
+        """Make a model outside models_dir available under model_id"""
+        self._paths[model_id] = path
+
+    def available(self):
+        """Model ids and their directories"""
+        paths = {}
+        if self.models_dir and os.path.isdir(self.models_dir):
+            with os.scandir(self.models_dir) as entries:
+                for entry in entries:
+                    if entry.is_dir() and is_model_dir(entry.path):
+                        paths[entry.name] = entry.path
+        paths.update(self._paths)
+        return paths
+
+    def settings(self, path):
+        try:
+            with open(os.path.join(path, MODEL_SETTINGS), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable {MODEL_SETTINGS} in {path}: {e}")
+            return {}
+
+    def load(self, model_id=None, execute=None):
+        """Return the LoadedModel for model_id, loading it if needed
+
+        execute (e.g. tpool.execute) runs the blocking Model load; raises
+        KeyError for an unknown id and ModelBudgetExceeded if it does not fit.
+        """
+        model_id = model_id or self.default
+        loaded = self._loaded.get(model_id)
+        if loaded is not None:
+            loaded.last_used = time.monotonic()
+            return loaded
+
+        path = self.available().get(model_id)
+        if path is None:
+            raise KeyError(f"Unknown model: {model_id}")
+
+        with self._load_lock:
+            loaded = self._loaded.get(model_id)
+            if loaded is not None:
+                loaded.last_used = time.monotonic()
+                return loaded
+
+            estimate = directory_size(path)
+            self._make_room(estimate, model_id)
+
+            started = time.monotonic()
+            before = resident_memory()
+            model = execute(Model, path) if execute else Model(path)
+            after = resident_memory()
+            # Allocator reuse can hide part of a load from RSS, so never count less than the files
+            measured = after - before if before is not None and after is not None else 0
+            memory = max(measured, estimate)
+
+            uses_grammar = self.settings(path).get('grammar', True)
+            grammar, version = (self.grammar, self.grammar_version) if uses_grammar else (None, None)
+            pool = RecognizerPool(model, self.sample_rate, grammar,
+                                  self.pool_size if model_id == self.default else 0,
+                                  self.pool_max, version)
+            loaded = self._loaded[model_id] = LoadedModel(model_id, path, model, pool, memory, uses_grammar)
+            logger.info(f"Loaded model {model_id} in {time.monotonic() - started:.2f}s, "
+                        f"{memory / 2**20:.0f} MiB ({self.memory / 2**20:.0f} MiB in {len(self._loaded)} models)")
+            return loaded
+
+    def pool(self, model_id=None, execute=None):
+        return self.load(model_id, execute).pool
+
+    def _make_room(self, needed, model_id):
+        """Evict idle models, least recently used first, until needed bytes fit the budget"""
+        if not self.memory_budget:
+            return
+
+        candidates = sorted(
+            (loaded for loaded in self._loaded.values() if loaded.model_id != self.default),
+            key=lambda loaded: loaded.idle_since
+        )
+        for loaded in candidates:
+            if self.memory + needed <= self.memory_budget:
+                break
+            if loaded.idle:
+                self.evict(loaded.model_id)
+
+        if self.memory + needed > self.memory_budget:
+            raise ModelBudgetExceeded(
+                f"Model {model_id} needs about {needed / 2**20:.0f} MiB, "
+                f"{self.memory / 2**20:.0f} of {self.memory_budget / 2**20:.0f} MiB in use"
+            )
+
+    def evict(self, model_id):
+        """Drop a loaded model; its memory is freed once no recognizer references it"""
+        loaded = self._loaded.pop(model_id, None)
+        if loaded is None:
+            return False
+        self.evictions += 1
+        logger.info(f"Evicted model {model_id} ({loaded.memory / 2**20:.0f} MiB, "
+                    f"idle {time.monotonic() - loaded.idle_since:.0f}s)")
+        return True
+
+    def set_grammar(self, grammar, version):
+        """Switch loaded models that decode with the catalog grammar to a new one"""
+        self.grammar = grammar
+        self.grammar_version = version
+        for loaded in list(self._loaded.values()):
+            if loaded.uses_grammar:
+                loaded.pool.set_grammar(grammar, version)
+
+    def refresh_idle(self, execute=None):
+        return sum(loaded.pool.refresh_idle(execute) for loaded in list(self._loaded.values()))
+
+    @property
+    def memory(self):
+        return sum(loaded.memory for loaded in self._loaded.values())
+
+    def loaded(self):
+        return list(self._loaded.values())
+
+    def to_dict(self):
+        loaded = self._loaded
+        return {
+            'default': self.default,
+            'memory_budget': self.memory_budget,
+            'memory': self.memory,
+            'evictions': self.evictions,
+            'models': [
+                {
+                    'id': model_id,
+                    'loaded': model_id in loaded,
+                    'memory': loaded[model_id].memory if model_id in loaded else None,
+                    'sessions': loaded[model_id].pool.leased if model_id in loaded else 0
+                }
+                for model_id in sorted(self.available())
+            ]
+        }
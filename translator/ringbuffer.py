@@ -0,0 +1,66 @@
+class RingBuffer:
+    """Preallocated byte ring that hands out fixed-size chunks as memoryview slices
+
+    Capacity is rounded up to a whole number of chunks and reads always start on a
+    chunk boundary, so a chunk never wraps around the end of the buffer and can be
+    passed to the recognizer without copying.
+    """
+
+    def __init__(self, capacity, chunk_size):
+        self.chunk_size = chunk_size
+        self.capacity = -(-capacity // chunk_size) * chunk_size
+        self._buf = bytearray(self.capacity)
+        self._view = memoryview(self._buf)
+        self._read = 0
+        self._size = 0
+        # Bytes rejected because the buffer was full
+        self.dropped = 0
+
+    def write(self, data):
+        """Copy data into the ring, returning the number of bytes accepted"""
+        data = memoryview(data).cast('B')
+        n = min(len(data), self.capacity - self._size)
+        if n < len(data):
+            self.dropped += len(data) - n
+
+        start = (self._read + self._size) % self.capacity
+        first = min(n, self.capacity - start)
+        self._view[start:start + first] = data[:first]
+        if n > first:
+            self._view[:n - first] = data[first:n]
+
+        self._size += n
+        return n
+
+    def chunks(self):
+        """Yield each complete chunk, releasing it once the consumer asks for the next"""
+        while self._size >= self.chunk_size:
+            yield self._view[self._read:self._read + self.chunk_size]
+            self._read = (self._read + self.chunk_size) % self.capacity
+            self._size -= self.chunk_size
+
+    def flush(self):
+        """Return and discard whatever is left after the last complete chunk"""
+        start = self._read
+        end = start + self._size
+        rest = bytes(self._view[start:min(end, self.capacity)])
+        if end > self.capacity:
+            rest += bytes(self._view[:end - self.capacity])
+        self.clear()
+        return rest
+
+    def clear(self):
+        self._read = 0
+        self._size = 0
+
+    @property
+    def fill(self):
+        """Bytes currently buffered"""
+        return self._size
+
+    @property
+    def fill_ratio(self):
+        return self._size / self.capacity
+
+    def __len__(self):
+        return self._size
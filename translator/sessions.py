@@ -0,0 +1,207 @@
+import time
+import logging
+import threading
+from vosk import KaldiRecognizer
+from translator.ringbuffer import RingBuffer
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+
+class RecognizerPool:
+    """Pre-warmed pool of KaldiRecognizer instances leased to sessions"""
+
+    def __init__(self, model, sample_rate, grammar=None, size=2, max_size=16, grammar_version=None):
+        self.model = model
+        self.sample_rate = sample_rate
+        self.grammar = grammar
+        self.grammar_version = grammar_version
+        self.max_size = max(size, max_size)
+        self.created = 0
+        # Recognizers currently leased, and when one was last returned
+        self.leased = 0
+        self.last_released = time.monotonic()
+        # Idle (recognizer, grammar version) pairs
+        self._idle = []
+        self._lock = threading.Lock()
+        # Caps the number of recognizers leased at any one time
+        self._slots = threading.BoundedSemaphore(self.max_size)
+
+        for _ in range(size):
+            self._idle.append((self._create(), self.grammar_version))
+        logger.info(f"Recognizer pool warmed with {size} recognizers (max {self.max_size})")
+
+    def _create(self):
+        """Construct a new recognizer for the pool's model and grammar"""
+        self.created += 1
+        if self.grammar:
+            return KaldiRecognizer(self.model, self.sample_rate, self.grammar)
+        return KaldiRecognizer(self.model, self.sample_rate)
+
+    def acquire(self, timeout=None):
+        """Lease a recognizer, waiting up to timeout seconds for a free slot"""
+        if not self._slots.acquire(timeout=timeout):
+            return None
+
+        with self._lock:
+            recognizer, version = self._idle.pop() if self._idle else (None, None)
+            self.leased += 1
+
+        try:
+            if recognizer is None:
+                return self._create()
+            if version != self.grammar_version:
+                recognizer.SetGrammar(self.grammar)
+            return recognizer
+        except Exception:
+            with self._lock:
+                self.leased -= 1
+            self._slots.release()
+            raise
+
+    def release(self, recognizer, grammar_version=None):
+        """Reset a leased recognizer and return it to the pool"""
+        try:
+            recognizer.Reset()
+            with self._lock:
+                self._idle.append((recognizer, grammar_version))
+        except Exception as e:
+            logger.error(f"Discarding recognizer that failed to reset: {e}")
+        finally:
+            with self._lock:
+                self.leased -= 1
+                self.last_released = time.monotonic()
+            self._slots.release()
+
+    def set_grammar(self, grammar, version):
+        """Switch the grammar used for new recognizers; idle ones are updated by refresh_idle"""
+        self.grammar = grammar
+        self.grammar_version = version
+
+    def refresh_idle(self, execute=None):
+        """Apply the current grammar to idle recognizers still on an older one
+
+        Stale recognizers are taken out of the pool while SetGrammar runs; execute
+        (e.g. tpool.execute) runs each call, defaulting to calling it directly.
+        """
+        with self._lock:
+            stale = [item for item in self._idle if item[1] != self.grammar_version]
+            self._idle = [item for item in self._idle if item[1] == self.grammar_version]
+            grammar, version = self.grammar, self.grammar_version
+
+        for recognizer, _ in stale:
+            try:
+                if execute:
+                    execute(recognizer.SetGrammar, grammar)
+                else:
+                    recognizer.SetGrammar(grammar)
+            except Exception as e:
+                logger.error(f"Discarding recognizer that failed to switch grammar: {e}")
+                continue
+            with self._lock:
+                self._idle.append((recognizer, version))
+        return len(stale)
+
+    @property
+    def idle(self):
+        return len(self._idle)
+
+
+class Session:
+    """Per-connection recognition state"""
+
+    def __init__(self, sid, recognizer, audio_buffer, vad=None, pool=None):
+        self.sid = sid
+        self.recognizer = recognizer
+        # Pool the recognizer was leased from, and is returned to on close
+        self.pool = pool
+        self.audio_buffer = audio_buffer
+        self.vad = vad
+        self.connected_at = time.time()
+        self.lagging = False
+        # Whether a green thread is decoding the buffered audio, and when audio last arrived
+        self.draining = False
+        self.received_at = None
+        # Grammar the recognizer was built with, and whether it is between utterances
+        self.grammar_version = None
+        self.at_boundary = True
+        # Client protocol version, target language and model id, sent on connect
+        self.protocol = 1
+        self.language = None
+        self.model_id = None
+        # Converts the client's declared sample format to recognizer PCM (None if native)
+        self.converter = None
+        # SessionCapture recording this session's audio, if capturing is enabled
+        self.capture = None
+        # Last partial text sent to the client and when one was last requested
+        self.last_partial = ""
+        self.partial_requested_at = 0.0
+        # Held while decoding, and by anything that swaps the recognizer or converter
+        self.lock = threading.Lock()
+
+    def partial_due(self, interval):
+        """Whether enough time has passed to request another partial result"""
+        now = time.monotonic()
+        if now - self.partial_requested_at < interval:
+            return False
+        self.partial_requested_at = now
+        return True
+
+
+class SessionManager:
+    """Tracks sessions by Socket.IO sid and leases their recognizers"""
+
+    def __init__(self, pool, lease_timeout=5.0, buffer_capacity=320000, chunk_size=4000, vad_factory=None):
+        self.pool = pool
+        self.lease_timeout = lease_timeout
+        self.buffer_capacity = buffer_capacity
+        self.chunk_size = chunk_size
+        self.vad_factory = vad_factory
+        self._sessions = {}
+
+    def open(self, sid, pool=None):
+        """Create a session for sid, or return None if the pool is exhausted
+
+        pool overrides the default pool, e.g. for a session using another model.
+        """
+        pool = pool or self.pool
+        recognizer = pool.acquire(timeout=self.lease_timeout)
+        if recognizer is None:
+            logger.warning(f"No recognizer available for {sid} ({len(self._sessions)} active sessions)")
+            return None
+
+        session = Session(
+            sid, recognizer,
+            RingBuffer(self.buffer_capacity, self.chunk_size),
+            self.vad_factory() if self.vad_factory else None,
+            pool
+        )
+        session.grammar_version = pool.grammar_version
+        self._sessions[sid] = session
+        return session
+
+    def get(self, sid):
+        return self._sessions.get(sid)
+
+    def close(self, sid):
+        """Drop the session for sid and return its recognizer to the pool"""
+        session = self._sessions.pop(sid, None)
+        if session is None:
+            return None
+
+        # Wait for any in-flight decode before handing the recognizer back
+        with session.lock:
+            session.pool.release(session.recognizer, session.grammar_version)
+            session.recognizer = None
+        return session
+
+    def buffered(self):
+        """Audio bytes waiting in all session buffers"""
+        return sum(session.audio_buffer.fill for session in list(self._sessions.values()))
+
+    def lagging(self):
+        """Sessions whose audio buffer is filling faster than it is decoded"""
+        return [session for session in self._sessions.values() if session.lagging]
+
+    def __len__(self):
+        return len(self._sessions)
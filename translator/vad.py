@@ -0,0 +1,80 @@
+import numpy as np
+
+
+def frame_features(chunk, frame_samples):
+    """Per-frame energy (dBFS) and zero-crossing rate of an int16 PCM chunk"""
+    samples = np.frombuffer(chunk, dtype='<i2')
+    usable = len(samples) - len(samples) % frame_samples
+    frames = samples[:usable].reshape(-1, frame_samples).astype(np.float32) / 32768.0
+
+    power = np.mean(frames * frames, axis=1)
+    energy_db = 10.0 * np.log10(power + 1e-10)
+    signs = np.signbit(frames)
+    zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (frame_samples - 1)
+    return energy_db, zcr
+
+
+class VoiceActivityGate:
+    """Energy/zero-crossing voice activity gate placed in front of the recognizer
+
+    Speech chunks and the first hangover_ms of silence after them are passed
+    through so Vosk still sees enough trailing silence to endpoint an utterance.
+    Longer silent runs are dropped, keeping the last dropped chunk as pre-roll
+    for the next speech onset.
+    """
+
+    def __init__(self, sample_rate=16000, chunk_size=4000, threshold_db=-45.0, margin_db=6.0,
+                 zcr_threshold=0.25, hangover_ms=1000, frame_ms=20):
+        self.frame_samples = int(sample_rate * frame_ms / 1000)
+        self.chunk_ms = chunk_size / 2 / sample_rate * 1000
+        self.threshold_db = threshold_db
+        self.margin_db = margin_db
+        self.zcr_threshold = zcr_threshold
+        self.hangover_ms = hangover_ms
+        # Running estimate of the background level, updated from silent chunks
+        self.noise_floor_db = threshold_db - margin_db
+        self.silence_ms = hangover_ms
+        self._preroll = bytearray(chunk_size)
+        self._preroll_size = 0
+        self.total_bytes = 0
+        self.skipped_bytes = 0
+
+    def is_speech(self, chunk):
+        energy_db, zcr = frame_features(chunk, self.frame_samples)
+        if len(energy_db) == 0:
+            return False
+
+        threshold = max(self.threshold_db, self.noise_floor_db + self.margin_db)
+        # Quiet but noisy-textured frames (fricatives) count as speech a little below threshold
+        voiced = (energy_db > threshold) | ((energy_db > threshold - self.margin_db) & (zcr > self.zcr_threshold))
+        if voiced.any():
+            return True
+
+        self.noise_floor_db += 0.05 * (float(np.median(energy_db)) - self.noise_floor_db)
+        return False
+
+    def filter(self, chunk):
+        """Return the chunks that should be decoded in place of chunk"""
+        self.total_bytes += len(chunk)
+
+        if self.is_speech(chunk):
+            self.silence_ms = 0
+            if self._preroll_size:
+                preroll = memoryview(self._preroll)[:self._preroll_size]
+                self._preroll_size = 0
+                return [preroll, chunk]
+            return [chunk]
+
+        self.silence_ms += self.chunk_ms
+        if self.silence_ms <= self.hangover_ms:
+            return [chunk]
+
+        if self._preroll_size:
+            self.skipped_bytes += self._preroll_size
+        self._preroll[:len(chunk)] = chunk
+        self._preroll_size = len(chunk)
+        return []
+
+    @property
+    def skipped_ratio(self):
+        return self.skipped_bytes / self.total_bytes if self.total_bytes else 0.0
@@ -0,0 +1,269 @@
+import atexit
+import pickle
+import struct
+import logging
+import itertools
+import threading
+import multiprocessing
+from multiprocessing import shared_memory
+import eventlet
+from eventlet import patcher, tpool
+from translator.decoder import ACCEPT_SECONDS, timed_accept_chunk, dispatch_result
+from translator.sessions import RecognizerPool
+from translator.startup import call_in_native_thread
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+
+# Blocking os calls, so the worker processes and the collector's tpool thread
+# never go through an eventlet hub
+_os = patcher.original('os')
+_HEADER = struct.Struct('!I')
+
+
+class MessagePipe:
+    """One-way pipe of pickled messages, written and read with unpatched blocking calls
+
+    A send never yields to the hub, so green threads in the parent cannot
+    interleave their messages; lock, if given, serializes writers in different
+    processes. Sends can block the hub while the pipe is full, which only the
+    rare grammar broadcast is large enough to cause.
+    """
+
+    def __init__(self, lock=None):
+        self._read_fd, self._write_fd = _os.pipe()
+        self._lock = lock
+
+    def send(self, message):
+        data = pickle.dumps(message, pickle.HIGHEST_PROTOCOL)
+        view = memoryview(_HEADER.pack(len(data)) + data)
+        if self._lock is not None:
+            self._lock.acquire()
+        try:
+            while view:
+                view = view[_os.write(self._write_fd, view):]
+        finally:
+            if self._lock is not None:
+                self._lock.release()
+
+    def recv(self):
+        size, = _HEADER.unpack(self._read_exactly(_HEADER.size))
+        return pickle.loads(self._read_exactly(size))
+
+    def _read_exactly(self, size):
+        data = bytearray()
+        while len(data) < size:
+            chunk = _os.read(self._read_fd, size - len(data))
+            if not chunk:
+                raise EOFError("pipe closed")
+            data += chunk
+        return bytes(data)
+
+
+class RemoteRecognizer:
+    """Handle for a recognizer living inside a decode worker process"""
+
+    def __init__(self, worker, key):
+        self.worker = worker
+        self.key = key
+
+
+class _Worker:
+    """Parent-side bookkeeping for one decode worker process"""
+
+    def __init__(self, index, slots, chunk_size):
+        self.index = index
+        self.inbox = MessagePipe()
+        self.shm = shared_memory.SharedMemory(create=True, size=slots * chunk_size)
+        self.free_slots = list(range(slots))
+        self.slot_available = threading.Semaphore(slots)
+        self.sessions = 0
+        self.process = None
+
+
+def _worker_main(worker, model, sample_rate, grammar, grammar_version, pool_size, chunk_size, results):
+    """Decode loop run in each forked worker; the model is shared copy-on-write with the parent
+
+    The parent's modules are monkey-patched, so the loop only blocks on
+    MessagePipe and the recognizer, never on a green primitive needing a hub.
+    """
+    pool = RecognizerPool(model, sample_rate, grammar, size=pool_size, max_size=1 << 16,
+                          grammar_version=grammar_version)
+    recognizers = {}
+    versions = {}
+    buf = worker.shm.buf
+
+    while True:
+        message = worker.inbox.recv()
+        if message is None:
+            break
+
+        op, key = message[0], message[1]
+        try:
+            if op == 'audio':
+                slot, length, want_partial, received_at = message[2], message[3], message[4], message[5]
+                offset = slot * chunk_size
+                view = buf[offset:offset + length]
+                try:
+                    final, result, elapsed = timed_accept_chunk(recognizers[key], view, want_partial)
+                finally:
+                    view.release()
+                results.send((worker.index, slot, key, final, result, received_at, elapsed))
+            elif op == 'open':
+                recognizers[key] = pool.acquire()
+                versions[key] = pool.grammar_version
+            elif op == 'close':
+                recognizer = recognizers.pop(key, None)
+                if recognizer is not None:
+                    pool.release(recognizer, versions.pop(key))
+            elif op == 'refresh':
+                recognizers[key].SetGrammar(pool.grammar)
+                versions[key] = pool.grammar_version
+            elif op == 'grammar':
+                pool.set_grammar(message[2], message[3])
+                pool.refresh_idle()
+        except Exception as e:
+            logger.error(f"Decode worker {worker.index} failed on {op}: {e}")
+            if op == 'audio':
+                results.send((worker.index, message[2], key, False, None, None, None))
+
+
+class ProcessDecoder:
+    """Routes session audio to forked decode worker processes over shared memory
+
+    Each worker owns the recognizers for the sessions assigned to it, so all audio
+    for a session goes to the same process. Chunks are copied into fixed-size slots
+    of a per-worker shared memory block; only slot numbers travel over the pipes.
+    Doubles as the session manager's recognizer pool, handing out RemoteRecognizer
+    handles instead of KaldiRecognizer instances.
+    """
+
+    def __init__(self, model, sample_rate, grammar, on_result, processes=2,
+                 max_sessions=16, pool_size=2, slots=64, chunk_size=4000,
+                 on_partial=None, partial_interval=0.25, grammar_version=None):
+        self.on_result = on_result
+        self.grammar = grammar
+        self.grammar_version = grammar_version
+        self.on_partial = on_partial
+        self.partial_interval = partial_interval
+        self.chunk_size = chunk_size
+        self.max_size = max_sessions
+        self._keys = itertools.count()
+        self._sessions = {}
+        self._slots = threading.BoundedSemaphore(max_sessions)
+
+        # Fork so workers inherit the already-loaded model without reloading it
+        context = multiprocessing.get_context('fork')
+        self._results = MessagePipe(lock=context.Lock())
+        self._workers = [_Worker(i, slots, chunk_size) for i in range(processes)]
+        per_worker = max(1, -(-pool_size // processes))
+
+        for worker in self._workers:
+            worker.process = context.Process(
+                target=_worker_main,
+                args=(worker, model, sample_rate, grammar, grammar_version, per_worker, chunk_size, self._results),
+                name=f"decode-worker-{worker.index}",
+                daemon=True
+            )
+
+        # Fork from a one-off OS thread: each child then starts with only that thread,
+        # not the hub and whatever green threads the server is already running
+        call_in_native_thread(self._start_workers)
+
+        self._listener = eventlet.spawn(self._collect_results)
+        atexit.register(self.shutdown)
+        logger.info(f"Started {processes} decode worker processes")
+
+    def _start_workers(self):
+        for worker in self._workers:
+            worker.process.start()
+
+    def acquire(self, timeout=None):
+        """Assign a new session to the least loaded worker"""
+        if not self._slots.acquire(timeout=timeout):
+            return None
+
+        worker = min(self._workers, key=lambda w: w.sessions)
+        worker.sessions += 1
+        handle = RemoteRecognizer(worker, next(self._keys))
+        worker.inbox.send(('open', handle.key))
+        return handle
+
+    def release(self, handle, grammar_version=None):
+        """Free the worker-side recognizer behind handle"""
+        self._sessions.pop(handle.key, None)
+        handle.worker.sessions -= 1
+        handle.worker.inbox.send(('close', handle.key))
+        self._slots.release()
+
+    def set_grammar(self, grammar, version):
+        """Broadcast a new grammar; each worker switches its idle recognizers to it"""
+        self.grammar = grammar
+        self.grammar_version = version
+        for worker in self._workers:
+            worker.inbox.send(('grammar', None, grammar, version))
+        logger.info(f"Switched decode workers to grammar {version}")
+
+    def refresh(self, session):
+        """Move a session that is between utterances onto the current grammar"""
+        if session.at_boundary and session.grammar_version != self.grammar_version:
+            handle = session.recognizer
+            handle.worker.inbox.send(('refresh', handle.key))
+            session.grammar_version = self.grammar_version
+
+    def feed(self, session, chunk):
+        """Queue a chunk for the session's worker; results arrive via on_result"""
+        handle = session.recognizer
+        worker = handle.worker
+        self._sessions[handle.key] = session
+        self.refresh(session)
+        session.at_boundary = False
+
+        worker.slot_available.acquire()
+        slot = worker.free_slots.pop()
+        offset = slot * self.chunk_size
+        worker.shm.buf[offset:offset + len(chunk)] = chunk
+        want_partial = self.on_partial is not None and session.partial_due(self.partial_interval)
+        worker.inbox.send(('audio', handle.key, slot, len(chunk), want_partial, session.received_at))
+
+    def _collect_results(self):
+        """Green thread returning slots to the free lists and dispatching results
+
+        Each blocking read runs on a native tpool thread, so waiting for the
+        workers never holds up the hub.
+        """
+        while True:
+            try:
+                message = tpool.execute(self._results.recv)
+            except (OSError, EOFError):
+                # Queue torn down at interpreter exit
+                break
+            if message is None:
+                break
+
+            index, slot, key, final, result, received_at, elapsed = message
+            worker = self._workers[index]
+            worker.free_slots.append(slot)
+            worker.slot_available.release()
+            if elapsed is not None:
+                ACCEPT_SECONDS.observe(elapsed)
+
+            session = self._sessions.get(key)
+            if session is not None:
+                try:
+                    dispatch_result(session, final, result, self.on_result, self.on_partial, received_at)
+                except Exception as e:
+                    logger.error(f"Error handling result for {session.sid}: {e}")
+
+    def shutdown(self):
+        """Stop the workers and release their shared memory"""
+        for worker in self._workers:
+            if worker.process.is_alive():
+                worker.inbox.send(None)
+        for worker in self._workers:
+            worker.process.join(timeout=5)
+            worker.shm.close()
+            worker.shm.unlink()
+        self._results.send(None)
+        self._workers = []